@@ -11,11 +11,14 @@ CREATE TABLE IF NOT EXISTS provider (
     base_id INTEGER,
     schac_code VARCHAR,
     metadata JSONB,
+    metadata_hash VARCHAR(64),
     manifest_json JSONB,
     name_concat VARCHAR,
     provider_name VARCHAR,
     last_deqar_pull TIMESTAMP WITH TIME ZONE,
     last_manifest_pull TIMESTAMP WITH TIME ZONE,
+    has_sources BOOLEAN NOT NULL DEFAULT FALSE,
+    course_count INTEGER,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
@@ -66,9 +69,12 @@ CREATE TABLE IF NOT EXISTS transaction (
     started_at TIMESTAMP WITH TIME ZONE,
     finished_at TIMESTAMP WITH TIME ZONE,
     bronze_file_path VARCHAR,
+    bronze_encoding VARCHAR(10),
+    silver_file_path VARCHAR,
     log_file_path VARCHAR,
     course_count INTEGER,
     error_message TEXT,
+    archived_at TIMESTAMP WITH TIME ZONE,
     FOREIGN KEY (provider_uuid) REFERENCES provider(provider_uuid),
     FOREIGN KEY (source_version_uuid) REFERENCES source_version(source_version_uuid),
     FOREIGN KEY (source_uuid) REFERENCES source(source_uuid)
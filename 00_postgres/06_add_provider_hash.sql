@@ -0,0 +1,4 @@
+-- Canonical SHA-256 of provider.metadata (DEQAR JSON with sorted keys),
+-- used by the DEQAR refresh to skip unchanged providers without comparing
+-- the full JSONB document.
+ALTER TABLE provider ADD COLUMN IF NOT EXISTS metadata_hash VARCHAR(64);
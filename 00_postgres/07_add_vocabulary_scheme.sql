@@ -0,0 +1,11 @@
+-- One row per controlled-vocabulary scheme loaded into Fuseki. Each scheme
+-- lives in its own named graph; content_hash is the SHA-256 of its sorted
+-- N-Triples and lets a refresh skip schemes that did not change upstream.
+CREATE TABLE IF NOT EXISTS vocabulary_scheme (
+    scheme_uri VARCHAR PRIMARY KEY,
+    graph_uri VARCHAR NOT NULL,
+    content_hash VARCHAR(64) NOT NULL,
+    concept_count INTEGER,
+    extra_triple_count INTEGER,
+    refreshed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
@@ -0,0 +1,3 @@
+-- Compression of the run's bronze object (gzip, zstd; NULL = uncompressed).
+-- The object key carries the matching suffix (.gz / .zst) as well.
+ALTER TABLE transaction ADD COLUMN IF NOT EXISTS bronze_encoding VARCHAR(10);
@@ -0,0 +1,3 @@
+-- Set by the bronze retention job when a run's bronze file and log have
+-- been deleted from MinIO; the ledger row itself is kept.
+ALTER TABLE transaction ADD COLUMN IF NOT EXISTS archived_at TIMESTAMP WITH TIME ZONE;
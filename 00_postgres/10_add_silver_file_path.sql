@@ -0,0 +1,3 @@
+-- Enriched silver snapshot (sorted N-Triples per course) written next to
+-- the run's bronze file; lets silver be re-pushed without re-enriching.
+ALTER TABLE transaction ADD COLUMN IF NOT EXISTS silver_file_path VARCHAR;
@@ -0,0 +1,12 @@
+-- One row per course uploaded to Meilisearch by the gold stage, with the
+-- SHA-256 of the framed document as sent. Lets a fetch skip unchanged
+-- documents and delete courses that disappeared from their source.
+CREATE TABLE IF NOT EXISTS course_index (
+    course_uuid UUID PRIMARY KEY,
+    source_uuid UUID NOT NULL,
+    content_hash VARCHAR(64) NOT NULL,
+    indexed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    FOREIGN KEY (source_uuid) REFERENCES source(source_uuid) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_course_index_source_uuid ON course_index(source_uuid);
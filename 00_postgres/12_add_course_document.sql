@@ -0,0 +1,9 @@
+-- Full framed JSON-LD of each course, written by the gold stage and served
+-- by GET /courses/{course_uuid}. Meilisearch only holds the search
+-- projection (schema/search_projection.json) of these documents.
+CREATE TABLE IF NOT EXISTS course_document (
+    course_uuid UUID PRIMARY KEY,
+    course_uri VARCHAR,
+    document JSONB NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
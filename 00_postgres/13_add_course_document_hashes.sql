@@ -0,0 +1,5 @@
+-- course_document as a cache: content_hash is the document's ETag, and
+-- subgraph_hash the hash of the course's silver subgraph it was framed
+-- from. Silver drops cached documents whose subgraph hash changed.
+ALTER TABLE course_document ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+ALTER TABLE course_document ADD COLUMN IF NOT EXISTS subgraph_hash VARCHAR(64);
@@ -0,0 +1,22 @@
+-- One row per course, maintained by the silver stage from the subgraphs it
+-- pushes: identity (UUID <-> LOS URI), owning provider and source, and the
+-- fields the course listings show. Resolving and listing courses reads this
+-- table instead of scanning the Fuseki courses graph.
+CREATE TABLE IF NOT EXISTS course (
+    course_uuid UUID PRIMARY KEY,
+    course_uri VARCHAR NOT NULL,
+    provider_uuid UUID NOT NULL,
+    source_uuid UUID NOT NULL,
+    type_uri VARCHAR,
+    title VARCHAR,
+    title_lang VARCHAR(35),
+    instance_count INTEGER NOT NULL DEFAULT 0,
+    content_hash VARCHAR(64),
+    last_seen_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    FOREIGN KEY (provider_uuid) REFERENCES provider(provider_uuid) ON DELETE CASCADE,
+    FOREIGN KEY (source_uuid) REFERENCES source(source_uuid) ON DELETE CASCADE
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_course_course_uri ON course(course_uri);
+CREATE INDEX IF NOT EXISTS idx_course_provider_uuid ON course(provider_uuid, course_uuid);
+CREATE INDEX IF NOT EXISTS idx_course_source_uuid ON course(source_uuid);
@@ -0,0 +1,3 @@
+-- Number of the provider's courses in the course table, refreshed whenever
+-- silver registers courses; the total of the provider course listing.
+ALTER TABLE provider ADD COLUMN IF NOT EXISTS course_count INTEGER;
@@ -0,0 +1,22 @@
+-- Provider search: trigram index for the name filter (ILIKE '%term%' and the
+-- similarity ranking), pattern indexes for ETER/DEQAR id prefix matches, and
+-- the keyset order of the unfiltered listing.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_provider_name_concat_trgm ON provider USING gin (name_concat gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_provider_eter_id_pattern ON provider(eter_id varchar_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_provider_deqar_id_pattern ON provider(deqar_id varchar_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_provider_eter_id_uuid ON provider(eter_id, provider_uuid);
+
+-- Whether any of the provider's source versions has sources, set by the
+-- manifest pull; replaces the per-row EXISTS of the provider listing.
+ALTER TABLE provider ADD COLUMN IF NOT EXISTS has_sources BOOLEAN NOT NULL DEFAULT FALSE;
+
+UPDATE provider SET has_sources = TRUE
+WHERE EXISTS (
+    SELECT 1 FROM source_version sv
+    JOIN source s ON s.source_version_uuid = sv.source_version_uuid
+    WHERE sv.provider_uuid = provider.provider_uuid
+);
+
+CREATE INDEX IF NOT EXISTS idx_provider_has_sources ON provider(eter_id, provider_uuid) WHERE has_sources;
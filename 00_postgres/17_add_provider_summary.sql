@@ -0,0 +1,21 @@
+-- One row per provider with what the dashboard shows about its ingestion:
+-- the latest source version, its sources with their last run, last success
+-- and failure streak, and course totals. Recomputed for a provider whenever
+-- one of its runs starts or finishes and when a manifest pull creates a new
+-- version (see services.providers.refresh_provider_summary).
+CREATE TABLE IF NOT EXISTS provider_summary (
+    provider_uuid UUID PRIMARY KEY,
+    source_version_uuid UUID,
+    version_date DATE,
+    version_id INTEGER,
+    source_count INTEGER NOT NULL DEFAULT 0,
+    course_count INTEGER NOT NULL DEFAULT 0,
+    running_sources INTEGER NOT NULL DEFAULT 0,
+    failing_sources INTEGER NOT NULL DEFAULT 0,
+    max_failure_streak INTEGER NOT NULL DEFAULT 0,
+    last_run_at TIMESTAMP WITH TIME ZONE,
+    last_success_at TIMESTAMP WITH TIME ZONE,
+    sources JSONB NOT NULL DEFAULT '[]'::jsonb,
+    refreshed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    FOREIGN KEY (provider_uuid) REFERENCES provider(provider_uuid) ON DELETE CASCADE
+);
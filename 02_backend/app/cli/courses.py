@@ -1,29 +1,41 @@
-from typing import Optional
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
 from uuid import UUID
 
 import requests
 import typer
 from fastapi import HTTPException
 from rich.console import Console
+from rich.live import Live
 from rich.table import Table
 from sqlalchemy import text
 
-from database import SessionLocal
+from config import COURSE_FETCH_JOBS, COURSE_FETCH_PER_HOST
+from database import SessionLocal, dispose_inherited_engine
+from dependencies import get_minio_client
 from services.course_fetch.bronze import (
     latest_bronze_for_source,
     list_sources_with_bronze,
 )
-from services.course_fetch.gold import list_all_courses, reindex_course
-from services.course_fetch.main import run_course_fetch, run_silver_only
+from services.course_fetch.gold import list_all_courses, rebuild_search_index, reindex_course
+from services.course_fetch.main import run_provider_fetch, run_silver_only
+from services.course_fetch.rebuild import rebuild_courses_graph
 from services.courses import (
     CourseNotFound,
+    compile_frame,
+    course_ntriples,
     frame_course,
     list_provider_courses,
+    pyld_frame,
     resolve_course_uri,
     resolve_course_uuid,
 )
+from services.framer import UnsupportedFrame
 from services.datalake import queue_provider_data
 from services.providers import get_provider, resolve_provider_uuid
+from services.retention import RetentionPolicy, prune_bronze
 
 courses_app = typer.Typer(help="Courses operations", no_args_is_help=True)
 
@@ -47,16 +59,19 @@ def courses_list(
     provider: str = typer.Argument(..., help="Provider UUID, ETER id, or DEQAR id"),
     limit: int = typer.Option(50, "--limit", "-n", min=1, max=500, help="Page size"),
     offset: int = typer.Option(0, "--offset", min=0, help="Number of courses to skip"),
+    after: Optional[UUID] = typer.Option(
+        None, "--after", help="Start after this course UUID (the next-page cursor of a previous listing)",
+    ),
 ) -> None:
     """
-    List courses published by a provider (queried from the Fuseki courses graph).
+    List courses of a provider's sources (from the course table).
     """
     with SessionLocal() as db:
         provider_uuid = _resolve(db, provider)
         try:
             with console.status(f"Querying courses for {provider_uuid}..."):
                 result = list_provider_courses(
-                    db, provider_uuid, limit=limit, offset=offset
+                    db, provider_uuid, limit=limit, offset=offset, after=after,
                 )
         except HTTPException as e:
             _die(str(e.detail))
@@ -66,11 +81,13 @@ def courses_list(
     start = result["offset"] + 1 if courses else 0
     end = result["offset"] + len(courses)
     console.print(
-        f"Provider URI: [cyan]{result['provider_uri']}[/cyan]"
+        f"Provider URI: [cyan]{result['provider_uri'] or '-'}[/cyan]"
     )
 
     if not courses:
-        if total:
+        if total and after is not None:
+            console.print(f"[yellow]No courses after {after} ({total} total).[/yellow]")
+        elif total:
             console.print(
                 f"[yellow]Offset {result['offset']} is past the end "
                 f"({total} total).[/yellow]"
@@ -79,8 +96,9 @@ def courses_list(
             console.print("[yellow]No courses found for this provider.[/yellow]")
         return
 
+    shown = f"after {after}" if after is not None else f"showing {start}–{end}"
     table = Table(
-        title=f"Courses — {total} total (showing {start}–{end})"
+        title=f"Courses — {total} total ({shown})"
     )
     table.add_column("URI")
     table.add_column("Type")
@@ -95,10 +113,12 @@ def courses_list(
             c["uri"] or "-",
             c["type"] or "-",
             title or "[dim]—[/dim]",
-            c["instances"] or "-",
+            str(c["instances"] or "-"),
             c["course_uuid"] or "-",
         )
     console.print(table)
+    if result["next_cursor"]:
+        console.print(f"[dim]Next page: --after {result['next_cursor']}[/dim]")
 
 
 @courses_app.command("frame")
@@ -108,13 +128,14 @@ def courses_frame(
     """
     Show a single course in framed JSON-LD
     """
-    try:
-        UUID(course)
-        course_uuid = course
-        course_uri = resolve_course_uri(course)
-    except ValueError:
-        course_uri = course
-        course_uuid = resolve_course_uuid(course_uri)
+    with SessionLocal() as db:
+        try:
+            UUID(course)
+            course_uuid = course
+            course_uri = resolve_course_uri(course, db)
+        except ValueError:
+            course_uri = course
+            course_uuid = resolve_course_uuid(course_uri, db)
 
     console.print(
         f"Course URI: [cyan]{course_uri}[/cyan] [dim](UUID {course_uuid})[/dim]"
@@ -123,6 +144,54 @@ def courses_frame(
     console.print_json(data=frame_course(course_uri))
 
 
+@courses_app.command("frame-check")
+def courses_frame_check(
+    limit: Optional[int] = typer.Option(
+        None, "--limit", "-n", help="Check only the first N courses",
+    ),
+) -> None:
+    """
+    Frame courses with both the compiled framer and pyld and compare the
+    serialized documents byte for byte
+    """
+    try:
+        compiled = compile_frame()
+    except UnsupportedFrame as e:
+        _die(f"frame.json cannot be compiled: {e}")
+
+    with SessionLocal() as db:
+        courses = list_all_courses(db)
+    if limit is not None:
+        courses = courses[:limit]
+
+    same = unsupported = 0
+    differ: List[str] = []
+    for c in courses:
+        try:
+            nt = course_ntriples(c["uri"])
+        except CourseNotFound as e:
+            console.print(f"[yellow]{c['uuid']}: {e}[/yellow]")
+            continue
+        try:
+            document = compiled.frame(nt)
+        except UnsupportedFrame as e:
+            console.print(f"[yellow]{c['uuid']}: unsupported ({e}), framed with pyld[/yellow]")
+            unsupported += 1
+            continue
+        if json.dumps(document) == json.dumps(pyld_frame(nt)):
+            same += 1
+        else:
+            console.print(f"[red]{c['uuid']}: documents differ[/red] [dim]({c['uri']})[/dim]")
+            differ.append(c["uuid"])
+
+    console.print(
+        f"Frame check: [green]{same} identical[/green], "
+        f"[red]{len(differ)} different[/red], [yellow]{unsupported} unsupported[/yellow]"
+    )
+    if differ:
+        raise typer.Exit(code=1)
+
+
 @courses_app.command("fetch")
 def courses_fetch(
     provider: str = typer.Argument(..., help="Provider UUID, ETER id, or DEQAR id"),
@@ -131,8 +200,20 @@ def courses_fetch(
         "--source", "-s",
         help="Fetch a single source; default fetches every source of the latest version",
     ),
+    jobs: int = typer.Option(
+        COURSE_FETCH_JOBS, "--jobs", "-j", min=1, max=64,
+        help="Sources fetched concurrently",
+    ),
+    per_host: int = typer.Option(
+        COURSE_FETCH_PER_HOST, "--per-host", min=1,
+        help="Maximum concurrent fetches against the same source host",
+    ),
 ) -> None:
-    """Fetch provider data in-process (bronze → silver → gold)."""
+    """Fetch provider data in-process (bronze → silver → gold).
+
+    Sources are fetched concurrently, at most --jobs at once and --per-host
+    against the same host.
+    """
     with SessionLocal() as db:
         provider_uuid = _resolve(db, provider)
         try:
@@ -182,15 +263,74 @@ def courses_fetch(
             else:
                 console.print(f"[red]{label}: {check}[/red]")
 
-    fetched = 0
-    for s, label in validated:
-        console.print(f"[cyan]fetching[/cyan] {label} ({s['source_uuid']})...")
-        run_course_fetch(
-            provider_uuid, version_uuid, UUID(s["source_uuid"])
+    if not validated:
+        console.print(f"\nFetched 0/{len(sources)} source(s).")
+        return
+
+    def _on_source(source: dict, res: dict) -> None:
+        colour = {"success": "green", "busy": "yellow"}.get(res["status"], "red")
+        console.print(
+            f"[{colour}]{res['status']}[/{colour}] {source.get('source_name') or source['source_uuid']}"
+        )
+
+    targets = [s for s, _ in validated]
+    with console.status(f"Fetching {len(targets)} source(s) ({jobs} at a time)..."):
+        results = run_provider_fetch(
+            provider_uuid, version_uuid, targets,
+            jobs=jobs, per_host=per_host, on_source=_on_source,
+        )
+
+    table = Table(title=f"Course fetch — {len(targets)} source(s)")
+    table.add_column("Source")
+    table.add_column("Type")
+    table.add_column("Status")
+    table.add_column("Courses", justify="right")
+    table.add_column("Bronze file")
+    for (s, label), res in zip(validated, results):
+        if res["status"] == "success":
+            status_cell = "[green]success[/green]"
+        elif res["status"] == "busy":
+            status_cell = "[yellow]busy[/yellow]"
+        else:
+            status_cell = f"[red]{res.get('error') or 'failed'}[/red]"
+        table.add_row(
+            label,
+            s.get("source_type") or "-",
+            status_cell,
+            str(res.get("course_count") or 0),
+            res.get("bronze_file_path") or "-",
         )
-        fetched += 1
+    console.print(table)
+
+    fetched = sum(1 for res in results if res["status"] == "success")
+    courses = sum(res.get("course_count") or 0 for res in results)
+    console.print(f"\nFetched {fetched}/{len(sources)} source(s), {courses} course(s).")
 
-    console.print(f"\nFetched {fetched}/{len(sources)} source(s).")
+
+def _run_silver(
+    targets: List[dict], *, jobs: int, from_snapshot: bool,
+) -> Iterator[Tuple[str, dict]]:
+    """Yield (source_uuid, run_silver_only result) as sources finish."""
+    if jobs <= 1:
+        for t in targets:
+            yield t["source_uuid"], run_silver_only(UUID(t["source_uuid"]), from_snapshot=from_snapshot)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=dispose_inherited_engine) as pool:
+        futures = {
+            pool.submit(run_silver_only, UUID(t["source_uuid"]), from_snapshot=from_snapshot): t["source_uuid"]
+            for t in targets
+        }
+        for future in as_completed(futures):
+            source_uuid = futures[future]
+            try:
+                yield source_uuid, future.result()
+            except Exception as e:
+                yield source_uuid, {
+                    "status": "failed",
+                    "source_uuid": source_uuid,
+                    "error": f"{type(e).__name__}: {e}",
+                }
 
 
 @courses_app.command("silver")
@@ -204,8 +344,23 @@ def courses_silver(
     all_: bool = typer.Option(
         False, "--all", help="Re-silver every source that has a bronze file",
     ),
+    from_snapshot: bool = typer.Option(
+        False, "--from-snapshot",
+        help="Push each source's latest enriched silver snapshot instead of re-enriching bronze",
+    ),
+    jobs: int = typer.Option(
+        1, "--jobs", "-j", min=1, max=64,
+        help="Sources re-silvered in parallel, each in its own worker process",
+    ),
 ) -> None:
-    """Re-run the silver stage from each source's latest bronze file on disk."""
+    """Re-run the silver stage from each source's latest bronze file on disk.
+
+    With --from-snapshot, the enriched snapshot written by the last silver
+    run is pushed to Fuseki as is, skipping parsing and enrichment. With
+    --jobs N, N sources are processed at once in separate processes (parsing
+    and enrichment are CPU-bound); per-source advisory locks still apply, so
+    a source that is being fetched is reported busy.
+    """
     if not any([provider, source_uuid, all_]):
         _die("Specify one of PROVIDER, --source, or --all")
     if all_ and (provider or source_uuid):
@@ -245,38 +400,116 @@ def courses_silver(
         console.print("[yellow]No matching sources with a bronze file on record.[/yellow]")
         raise typer.Exit(code=2)
 
-    table = Table(title=f"Silver re-run — {len(targets)} source(s)")
-    table.add_column("Source")
-    table.add_column("Type")
-    table.add_column("Status")
-    table.add_column("Courses", justify="right")
-    table.add_column("Bronze file")
+    results: Dict[str, dict] = {}
+    mode = " from snapshot" if from_snapshot else ""
 
-    succeeded = 0
-    for t in targets:
-        label = t.get("source_name") or t["source_uuid"]
-        console.print(f"[cyan]silver[/cyan] {label} ({t['source_uuid']})...")
-        res = run_silver_only(UUID(t["source_uuid"]))
-        if res["status"] == "success":
-            succeeded += 1
-            status_cell = "[green]success[/green]"
-        elif res["status"] == "busy":
-            status_cell = "[yellow]busy[/yellow]"
-        else:
-            msg = res.get("error") or "failed"
-            status_cell = f"[red]{msg}[/red]"
-        table.add_row(
-            label,
-            t.get("source_type") or "-",
-            status_cell,
-            str(res.get("course_count") or 0),
-            res.get("bronze_file_path") or "-",
+    def _render() -> Table:
+        table = Table(
+            title=f"Silver re-run{mode} — {len(results)}/{len(targets)} source(s) done"
         )
+        table.add_column("Source")
+        table.add_column("Type")
+        table.add_column("Status")
+        table.add_column("Courses", justify="right")
+        table.add_column("Silver snapshot" if from_snapshot else "Bronze file")
+        for t in targets:
+            res = results.get(t["source_uuid"])
+            if res is None:
+                table.add_row(
+                    t.get("source_name") or t["source_uuid"],
+                    t.get("source_type") or "-",
+                    "[dim]queued[/dim]", "-", "-",
+                )
+                continue
+            if res["status"] == "success":
+                status_cell = "[green]success[/green]"
+            elif res["status"] == "busy":
+                status_cell = "[yellow]busy[/yellow]"
+            else:
+                status_cell = f"[red]{res.get('error') or 'failed'}[/red]"
+            table.add_row(
+                t.get("source_name") or t["source_uuid"],
+                t.get("source_type") or "-",
+                status_cell,
+                str(res.get("course_count") or 0),
+                (res.get("silver_file_path") if from_snapshot else res.get("bronze_file_path")) or "-",
+            )
+        return table
 
-    console.print(table)
+    with Live(_render(), console=console, refresh_per_second=4) as live:
+        for source_uuid, res in _run_silver(targets, jobs=jobs, from_snapshot=from_snapshot):
+            results[source_uuid] = res
+            live.update(_render())
+
+    succeeded = sum(1 for res in results.values() if res["status"] == "success")
     console.print(f"\nRe-silvered {succeeded}/{len(targets)} source(s).")
 
 
+@courses_app.command("rebuild")
+def courses_rebuild(
+    output: Optional[Path] = typer.Option(
+        None, "--output", "-o",
+        help="Write N-Quads to this file (.nq or .nq.gz) for tdb2.tdbloader instead of loading Fuseki",
+    ),
+    jobs: int = typer.Option(4, "--jobs", "-j", min=1, max=64, help="Worker processes"),
+    from_bronze: bool = typer.Option(
+        False, "--from-bronze", help="Re-enrich every source's latest bronze file, ignoring silver snapshots",
+    ),
+    partial_ok: bool = typer.Option(
+        False, "--partial-ok", help="Swap the rebuilt graph in even if some sources failed",
+    ),
+) -> None:
+    """
+    Rebuild the whole Fuseki courses graph from MinIO (disaster recovery).
+
+    Each source's latest silver snapshot — or its latest bronze file, enriched
+    again — is converted to N-Quads in parallel. The stream is loaded into a
+    shadow graph with one request and swapped over the courses graph, or
+    written to --output. Meilisearch is not touched; run `course reindex --all`
+    afterwards if the index needs rebuilding too.
+    """
+    table = Table(title="Courses graph rebuild")
+    table.add_column("Source", no_wrap=True)
+    table.add_column("From")
+    table.add_column("Courses", justify="right")
+    table.add_column("Result")
+
+    with SessionLocal() as db:
+        with console.status("Rebuilding courses graph...") as status_:
+            def _progress(result, done, total):
+                status_.update(f"Rebuilt {done}/{total} source(s)...")
+                table.add_row(
+                    result.source_uuid,
+                    result.origin or "-",
+                    str(result.course_count),
+                    f"[red]{result.error}[/red]" if result.error else "[green]ok[/green]",
+                )
+
+            try:
+                stats = rebuild_courses_graph(
+                    db, jobs=jobs, output=output,
+                    from_bronze=from_bronze, partial_ok=partial_ok,
+                    on_source=_progress,
+                )
+            except RuntimeError as e:
+                _die(str(e))
+
+    if not stats.sources:
+        console.print("[yellow]No sources with a bronze file on record.[/yellow]")
+        raise typer.Exit(code=2)
+
+    console.print(table)
+    courses = sum(s.course_count for s in stats.sources if not s.error)
+    if output is not None:
+        console.print(f"Wrote {stats.quads} quads ({courses} courses) to [cyan]{output}[/cyan]")
+    elif stats.loaded:
+        console.print(f"[green]Courses graph replaced[/green]: {stats.quads} quads, {courses} courses")
+    else:
+        console.print("[red]Courses graph left unchanged[/red]")
+    if stats.failed or (output is None and not stats.loaded):
+        raise typer.Exit(code=2)
+
+
 @courses_app.command("reindex")
 def courses_reindex(
     course: Optional[str] = typer.Argument(
@@ -289,65 +522,99 @@ def courses_reindex(
     all_: bool = typer.Option(
         False, "--all", help="Reindex every course in the Fuseki courses graph",
     ),
+    swap: bool = typer.Option(
+        False, "--swap",
+        help="With --all: build a fresh shadow index and atomically swap it with the live one",
+    ),
 ) -> None:
-    """Re-run the gold stage: reindex courses in Meilisearch."""
+    """Re-run the gold stage: reindex courses in Meilisearch.
+
+    With --all --swap, the live index is not written to: every course goes
+    into a shadow index with the same settings, which then replaces the
+    live index in one swap — search never sees a half-built index, and
+    courses no longer registered disappear.
+    """
     scopes = [bool(course), bool(provider), all_]
     if sum(scopes) != 1:
         _die("Specify exactly one of COURSE, --provider, or --all")
+    if swap and not all_:
+        _die("--swap requires --all")
 
     courses: list[dict] = []
 
     if course is not None:
-        try:
-            UUID(course)
-            try:
-                course_uri = resolve_course_uri(course)
-            except CourseNotFound as e:
-                _die(str(e))
-            courses = [{"uuid": course, "uri": course_uri}]
-        except ValueError:
-            course_uri = course
+        with SessionLocal() as db:
             try:
-                course_uuid = resolve_course_uuid(course_uri)
-            except CourseNotFound as e:
-                _die(str(e))
-            courses = [{"uuid": course_uuid, "uri": course_uri}]
+                UUID(course)
+                try:
+                    course_uri = resolve_course_uri(course, db)
+                except CourseNotFound as e:
+                    _die(str(e))
+                courses = [{"uuid": course, "uri": course_uri}]
+            except ValueError:
+                course_uri = course
+                try:
+                    course_uuid = resolve_course_uuid(course_uri, db)
+                except CourseNotFound as e:
+                    _die(str(e))
+                courses = [{"uuid": course_uuid, "uri": course_uri}]
     elif provider is not None:
         with SessionLocal() as db:
             provider_uuid = _resolve(db, provider)
             try:
                 with console.status(f"Enumerating courses for {provider_uuid}..."):
-                    offset = 0
-                    page_size = 500
+                    cursor = None
                     while True:
                         result = list_provider_courses(
-                            db, provider_uuid, limit=page_size, offset=offset,
+                            db, provider_uuid, limit=500, after=cursor,
                         )
-                        page = result["response"]
-                        if not page:
-                            break
-                        for c in page:
+                        for c in result["response"]:
                             if c.get("course_uuid") and c.get("uri"):
                                 courses.append({"uuid": c["course_uuid"], "uri": c["uri"]})
-                        offset += len(page)
-                        if offset >= result["total"]:
+                        cursor = result["next_cursor"]
+                        if cursor is None:
                             break
             except HTTPException as e:
                 _die(str(e.detail))
     else:  # all_
-        with console.status("Enumerating all courses in Fuseki..."):
-            courses = list_all_courses()
+        with SessionLocal() as db, console.status("Enumerating all courses..."):
+            courses = list_all_courses(db)
 
     if not courses:
         console.print("[yellow]No courses to reindex.[/yellow]")
         raise typer.Exit(code=2)
 
+    if swap:
+        with SessionLocal() as db, requests.Session() as http:
+            with console.status(f"Rebuilding search index from {len(courses)} course(s)...") as status_:
+                try:
+                    stats = rebuild_search_index(
+                        http, courses, db=db,
+                        on_progress=lambda done, total: status_.update(
+                            f"Rebuilding search index: {done}/{total} framed..."
+                        ),
+                    )
+                except Exception as e:
+                    _die(f"Search index rebuild failed: {e}")
+
+        summary = Table(title="Reindex summary (shadow index)")
+        summary.add_column("Metric")
+        summary.add_column("Value", justify="right")
+        summary.add_row("Total", str(len(courses)))
+        summary.add_row("Uploaded", str(stats.uploaded))
+        summary.add_row("Failed", str(stats.failed))
+        summary.add_row("Swapped", "no" if stats.failed else "yes")
+        console.print(summary)
+        if stats.failed:
+            raise typer.Exit(code=2)
+        return
+
     uploaded = 0
     failed = 0
-    with requests.Session() as http:
+    with SessionLocal() as db, requests.Session() as http:
         with console.status(f"Reindexing {len(courses)} course(s)...") as status_:
             for i, c in enumerate(courses, 1):
-                if reindex_course(http, c["uuid"], c.get("uri")):
+                if reindex_course(http, c["uuid"], c.get("uri"), db=db):
                     uploaded += 1
                 else:
                     failed += 1
@@ -362,3 +629,54 @@ def courses_reindex(
     console.print(summary)
     if failed:
         raise typer.Exit(code=2)
+
+
+@courses_app.command("prune")
+def courses_prune(
+    provider: Optional[str] = typer.Argument(
+        None, help="Provider UUID, ETER id, or DEQAR id (default: every provider)"
+    ),
+    source_uuid: Optional[UUID] = typer.Option(
+        None, "--source", "-s", help="Prune a single source by UUID",
+    ),
+    dry_run: bool = typer.Option(
+        False, "--dry-run", help="Report what would be pruned without deleting anything",
+    ),
+) -> None:
+    """
+    Apply the bronze retention policy: delete old bronze files and run logs
+    from MinIO and mark their transaction rows archived.
+    """
+    policy = RetentionPolicy()
+    with SessionLocal() as db:
+        provider_uuid = _resolve(db, provider) if provider else None
+        with console.status("Pruning bronze files..." if not dry_run else "Evaluating retention..."):
+            stats = prune_bronze(
+                db, get_minio_client(),
+                policy=policy,
+                provider_uuid=provider_uuid,
+                source_uuid=source_uuid,
+                dry_run=dry_run,
+            )
+
+    monthly = f"{policy.monthly_months} months" if policy.monthly_months else "forever"
+    table = Table(
+        title=(
+            f"Bronze retention{' (dry run)' if dry_run else ''} — all runs {policy.keep_all_days}d, "
+            f"daily {policy.daily_days}d, monthly {monthly}"
+        )
+    )
+    table.add_column("Metric")
+    table.add_column("Value", justify="right")
+    table.add_row("Sources", str(stats.sources))
+    table.add_row("Sources busy (skipped)", str(stats.busy_sources))
+    table.add_row("Runs examined", str(stats.runs))
+    table.add_row("Runs kept", str(stats.kept))
+    table.add_row("Runs to prune" if dry_run else "Runs archived", str(stats.pruned))
+    if not dry_run:
+        table.add_row("Objects deleted", str(stats.objects_deleted))
+    console.print(table)
+    for error in stats.errors:
+        console.print(f"[red]{error}[/red]")
+    if stats.errors:
+        raise typer.Exit(code=2)
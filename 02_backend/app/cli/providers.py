@@ -10,10 +10,9 @@ from sqlalchemy import text
 from config import DEQAR_API_URL
 from database import SessionLocal
 from services.deqar import (
-    fetch_deqar_providers,
-    providers_to_rdf,
-    push_providers_to_fuseki,
-    upsert_providers,
+    RefreshStats,
+    iter_deqar_pages,
+    refresh_providers,
 )
 from services.manifest import refresh_manifest_for_provider
 from services.providers import (
@@ -78,21 +77,27 @@ def providers_list(
     ),
     page: int = typer.Option(1, "--page", "-p", min=1),
     page_size: int = typer.Option(20, "--page-size", min=1, max=200),
+    after: Optional[str] = typer.Option(
+        None, "--after", help="Continue from this cursor (the next-page cursor of a previous listing)",
+    ),
 ) -> None:
     """
     List or search providers.
     """
 
     with SessionLocal() as db:
-        result = list_providers(
-            db, search=search, with_data=with_data, page=page, page_size=page_size
-        )
+        try:
+            result = list_providers(
+                db, search=search, with_data=with_data, page=page, page_size=page_size,
+                cursor=after,
+            )
+        except HTTPException as e:
+            _die(str(e.detail))
 
-    total = result["total"]
-    total_pages = max(1, result["total_pages"])
-    table = Table(
-        title=f"Providers — {total} match{'es' if total != 1 else ''} (page {page}/{total_pages})"
-    )
+    total = f"{'~' if result['total_approximate'] else ''}{result['total']}"
+    plural = "es" if result["total"] != 1 else ""
+    shown = "after cursor" if after else f"page {page}/{max(1, result['total_pages'])}"
+    table = Table(title=f"Providers — {total} match{plural} ({shown})")
     table.add_column("UUID", no_wrap=True)
     table.add_column("ETER ID")
     table.add_column("DEQAR ID")
@@ -111,6 +116,8 @@ def providers_list(
             "[green]yes[/green]" if row["has_sources"] else "[dim]no[/dim]",
         )
     console.print(table)
+    if result["next_cursor"]:
+        console.print(f"[dim]Next page: --after {result['next_cursor']}[/dim]")
 
 
 @providers_app.command("manifest")
@@ -229,42 +236,61 @@ def providers_refresh_from_deqar(
     force: bool = typer.Option(
         False,
         "--force",
-        help="Re-upload all providers to Fuseki even if DEQAR metadata is unchanged",
+        help="Re-upload all providers to Fuseki even if DEQAR metadata is unchanged. "
+             "Without --offset this rebuilds the reference graph in a shadow graph "
+             "and swaps it in.",
+    ),
+    jobs: int = typer.Option(
+        4, "--jobs", "-j", min=1, max=16,
+        help="Number of DEQAR pages downloaded concurrently",
     ),
 ) -> None:
     """
     Refresh provider registry from the DEQAR API and push to the reference graph.
+
+    Pages are processed as they arrive: each one is upserted into Postgres and
+    pushed to Fuseki while the following pages are still downloading.
     """
 
-    with console.status("Fetching DEQAR providers..."):
-        providers = fetch_deqar_providers(limit=limit, offset=offset, api_url=api_url)
+    totals = RefreshStats()
+    rebuild = force and offset == 0
+    pages = iter_deqar_pages(limit=limit, offset=offset, api_url=api_url, max_workers=jobs)
 
-    if not providers:
+    with SessionLocal() as db:
+        with console.status("Fetching DEQAR providers...") as status_:
+            for page, totals in refresh_providers(db, pages, force=force, rebuild=rebuild):
+                if page.error:
+                    console.print(f"[red]Page at offset {page.offset} failed: {page.error}[/red]")
+                status_.update(
+                    f"Processed {totals.upsert.total} providers "
+                    f"({totals.pages} page(s), {totals.fuseki.success} pushed to Fuseki)..."
+                )
+
+    if not totals.upsert.total:
         console.print("[yellow]No providers returned from DEQAR[/yellow]")
         raise typer.Exit(code=2)
 
-    with SessionLocal() as db:
-        with console.status(f"Upserting {len(providers)} providers into Postgres..."):
-            stats = upsert_providers(db, providers, force=force)
-
-    with console.status("Serializing providers to RDF..."):
-        rdf_list = providers_to_rdf(stats)
-
-    with console.status(f"Pushing {len(rdf_list)} providers to Fuseki reference graph..."):
-        push_stats = push_providers_to_fuseki(rdf_list)
-
     table = Table(title="DEQAR refresh summary")
     table.add_column("Metric")
     table.add_column("Value", justify="right")
-    table.add_row("Total processed", str(stats.total))
-    table.add_row("New", str(stats.new))
-    table.add_row("Updated", str(stats.updated))
-    table.add_row("Unchanged", str(stats.unchanged))
-    table.add_row("DB errors", str(stats.errors))
+    table.add_row("Pages", str(totals.pages))
+    table.add_row("Failed pages", str(totals.failed_pages))
+    table.add_row("Total processed", str(totals.upsert.total))
+    table.add_row("New", str(totals.upsert.new))
+    table.add_row("Updated", str(totals.upsert.updated))
+    table.add_row("Unchanged", str(totals.upsert.unchanged))
+    table.add_row("DB errors", str(totals.upsert.errors))
     table.add_row("Force", str(force))
-    table.add_row("Fuseki success", str(push_stats.success))
-    table.add_row("Fuseki failed", str(push_stats.failed))
+    table.add_row("Fuseki success", str(totals.fuseki.success))
+    table.add_row("Fuseki failed", str(totals.fuseki.failed))
+    if rebuild:
+        table.add_row(
+            "Reference graph swapped",
+            "[green]yes[/green]" if totals.rebuilt else "[red]no[/red]",
+        )
     console.print(table)
+    if totals.failed_pages or (rebuild and not totals.rebuilt):
+        raise typer.Exit(code=2)
 
 
 def _mask_secret(secret: str) -> str:
@@ -1,3 +1,4 @@
+from pathlib import Path
 from typing import Dict, List, Optional
 
 import typer
@@ -5,15 +6,45 @@ from rich.console import Console
 from rich.table import Table
 
 from config import DEFAULT_VOCABULARIES
+from database import SessionLocal
+from dependencies import get_minio_client
 
-from services.vocabulary import refresh_vocabulary, _normalize_spec
+from services.vocabulary import (
+    _normalize_spec,
+    drop_legacy_vocabulary_graph,
+    refresh_vocabularies,
+)
+from services.vocabulary_snapshots import (
+    DiskSnapshotStore,
+    MinioSnapshotStore,
+    SnapshotStore,
+    create_snapshot,
+    load_snapshot,
+    read_manifest,
+)
 
 
 vocabularies_app = typer.Typer(help="EU controlled vocabulary operations", no_args_is_help=True)
+snapshot_app = typer.Typer(help="Offline vocabulary snapshot bundles", no_args_is_help=True)
+vocabularies_app.add_typer(snapshot_app, name="snapshot")
 
 console = Console()
 
 
+def _die(message: str, code: int = 1) -> None:
+    console.print(f"[red]{message}[/red]")
+    raise typer.Exit(code=code)
+
+
+def _snapshot_store(directory: Optional[Path]) -> SnapshotStore:
+    if directory is not None:
+        return DiskSnapshotStore(directory)
+    return MinioSnapshotStore(get_minio_client())
+
+
+_DIR_OPTION_HELP = "Snapshot directory on local disk (default: the MinIO bucket)"
+
+
 def _configured_properties() -> Dict[str, List[str]]:
     """Map scheme_uri -> extra properties list, derived from DEFAULT_VOCABULARIES."""
     out: Dict[str, List[str]] = {}
@@ -31,9 +62,18 @@ def vocabularies_fetch(
              "for a given scheme are taken from DEFAULT_VOCABULARIES in config. "
              "Default (no args): fetch every scheme in DEFAULT_VOCABULARIES.",
     ),
+    force: bool = typer.Option(
+        False, "--force", help="Re-upload schemes even if their content hash is unchanged",
+    ),
+    jobs: int = typer.Option(
+        4, "--jobs", "-j", min=1, max=16, help="Number of schemes fetched concurrently",
+    ),
 ) -> None:
     """
     Fetch controlled vocabularies from EU Publications and push to Fuseki.
+
+    Each scheme replaces its own named graph; schemes whose content did not
+    change since the last fetch are skipped.
     """
     configured = _configured_properties()
 
@@ -53,21 +93,107 @@ def vocabularies_fetch(
     table.add_column("Result")
 
     any_failed = False
-    for spec in specs:
-        scheme, _ = _normalize_spec(spec)
-        with console.status(f"Fetching {scheme}..."):
-            stats = refresh_vocabulary(spec)
-        result = "[green]ok[/green]" if stats.success else f"[red]{stats.error or 'failed'}[/red]"
-        table.add_row(
-            scheme,
-            str(stats.concepts),
-            str(stats.extra_triples),
-            str(stats.bytes_uploaded),
-            result,
-        )
-        if not stats.success:
-            any_failed = True
+    with SessionLocal() as db:
+        with console.status(f"Fetching {len(specs)} scheme(s)...") as status_:
+            for done, stats in enumerate(refresh_vocabularies(db, specs, max_workers=jobs, force=force), 1):
+                status_.update(f"Fetched {done}/{len(specs)} scheme(s)...")
+                if stats.unchanged:
+                    result = "[dim]unchanged[/dim]"
+                elif stats.success:
+                    result = "[green]ok[/green]"
+                else:
+                    result = f"[red]{stats.error or 'failed'}[/red]"
+                table.add_row(
+                    stats.scheme_uri,
+                    str(stats.concepts),
+                    str(stats.extra_triples),
+                    str(stats.bytes_uploaded),
+                    result,
+                )
+                if not stats.success:
+                    any_failed = True
+
+    if not schemes and not any_failed:
+        drop_legacy_vocabulary_graph()
 
     console.print(table)
     if any_failed:
         raise typer.Exit(code=2)
+
+
+@snapshot_app.command("create")
+def snapshot_create(
+    directory: Optional[Path] = typer.Option(None, "--dir", help=_DIR_OPTION_HELP),
+) -> None:
+    """Export every configured vocabulary graph from Fuseki into a new snapshot."""
+    store = _snapshot_store(directory)
+    with console.status("Exporting vocabulary graphs..."):
+        result = create_snapshot(store)
+
+    if not result.schemes:
+        _die("No vocabulary graphs to export — run `vocabulary fetch` first")
+
+    table = Table(title=f"Snapshot {result.version} → {store}")
+    table.add_column("Scheme URI")
+    table.add_column("Concepts", justify="right")
+    table.add_column("Triples", justify="right")
+    for entry in result.schemes:
+        table.add_row(entry["scheme_uri"], str(entry["concepts"]), str(entry["triples"]))
+    for scheme_uri in result.missing:
+        table.add_row(scheme_uri, "-", "-", style="red")
+    console.print(table)
+    if result.missing:
+        raise typer.Exit(code=2)
+
+
+@snapshot_app.command("load")
+def snapshot_load(
+    version: Optional[str] = typer.Argument(None, help="Snapshot version (default: the newest)"),
+    directory: Optional[Path] = typer.Option(None, "--dir", help=_DIR_OPTION_HELP),
+) -> None:
+    """
+    Replace the vocabulary graphs in Fuseki with a snapshot.
+
+    Content hashes are recorded as well, so a later `vocabulary fetch` only
+    re-uploads schemes that changed upstream since the snapshot was taken.
+    """
+    store = _snapshot_store(directory)
+    with SessionLocal() as db:
+        with console.status("Loading vocabulary snapshot..."):
+            try:
+                result = load_snapshot(store, version, db=db)
+            except (FileNotFoundError, RuntimeError) as e:
+                _die(str(e))
+    if result is None:
+        _die(f"No vocabulary snapshot found in {store}")
+    console.print(
+        f"[green]Loaded snapshot {result.version}[/green] ({len(result.schemes)} scheme(s))"
+    )
+
+
+@snapshot_app.command("list")
+def snapshot_list(
+    directory: Optional[Path] = typer.Option(None, "--dir", help=_DIR_OPTION_HELP),
+) -> None:
+    """List available snapshot versions, newest last."""
+    store = _snapshot_store(directory)
+    versions = store.versions()
+    if not versions:
+        console.print(f"[yellow]No vocabulary snapshots in {store}[/yellow]")
+        return
+
+    table = Table(title=f"Vocabulary snapshots — {store}")
+    table.add_column("Version")
+    table.add_column("Created")
+    table.add_column("Schemes", justify="right")
+    table.add_column("Triples", justify="right")
+    for version in versions:
+        manifest = read_manifest(store, version) or {}
+        schemes = manifest.get("schemes", [])
+        table.add_row(
+            version,
+            manifest.get("created_at", "-"),
+            str(len(schemes)),
+            str(sum(entry.get("triples", 0) for entry in schemes)),
+        )
+    console.print(table)
@@ -10,6 +10,8 @@ DB_HOST = os.getenv("DB_HOST", "postgres")
 DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("DB_NAME", "backend")
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# Same database through asyncpg, for the routers' async sessions.
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
 MINIO_HOST = os.getenv("MINIO_HOST", "minio:9000")
 MINIO_ROOT_USER = os.getenv("MINIO_ROOT_USER")
@@ -31,6 +33,28 @@ DEQAR_API_URL = os.getenv(
     "DEQAR_API_URL", "https://backend.testzone.eqar.eu/connectapi/v1/providers/"
 )
 
+# Compression for bronze files written to MinIO: none, gzip or zstd (zstd
+# needs the optional zstandard package).
+BRONZE_COMPRESSION = os.getenv("BRONZE_COMPRESSION", "none")
+
+# Provider-wide course fetch (`course fetch`, POST /queue_provider_fetch):
+# sources fetched at once, and at most this many per source_path host.
+COURSE_FETCH_JOBS = int(os.getenv("COURSE_FETCH_JOBS", "4"))
+COURSE_FETCH_PER_HOST = int(os.getenv("COURSE_FETCH_PER_HOST", "2"))
+
+# Sources whose graph has at least this many triples are enriched and pushed
+# in parallel, partitioned by LOS, across SILVER_PARALLEL_JOBS processes
+# (1 disables partitioning).
+SILVER_PARALLEL_JOBS = int(os.getenv("SILVER_PARALLEL_JOBS", "1"))
+SILVER_PARALLEL_MIN_TRIPLES = int(os.getenv("SILVER_PARALLEL_MIN_TRIPLES", "200000"))
+
+# Bronze retention (services/retention.py): keep every run for KEEP_ALL_DAYS,
+# one run per day until DAILY_DAYS, then one per month for MONTHLY_MONTHS
+# months (0 = keep monthly runs forever).
+BRONZE_RETENTION_KEEP_ALL_DAYS = int(os.getenv("BRONZE_RETENTION_KEEP_ALL_DAYS", "7"))
+BRONZE_RETENTION_DAILY_DAYS = int(os.getenv("BRONZE_RETENTION_DAILY_DAYS", "90"))
+BRONZE_RETENTION_MONTHLY_MONTHS = int(os.getenv("BRONZE_RETENTION_MONTHLY_MONTHS", "0"))
+
 GRAPH_COURSES = "http://data.quality-link.eu/graph/courses"
 GRAPH_REFERENCE = "http://data.quality-link.eu/graph/reference"
 GRAPH_VOCABULARY = "http://data.quality-link.eu/graph/vocabulary"
@@ -38,16 +62,42 @@ GRAPH_VOCABULARY = "http://data.quality-link.eu/graph/vocabulary"
 DEFAULT_VOCABULARIES = [
     # Each entry: {"scheme": <uri>, "properties": [<extra prop uri>, ...]}.
     # "properties" is optional; if omitted, only skos:prefLabel is fetched.
-    {   "scheme": "http://data.europa.eu/snb/isced-f/25831c2" },                  # ISCED Fields of Study
+    {   "scheme": "http://data.europa.eu/snb/isced-f/25831c2",                    # ISCED Fields of Study
+        "properties": [
+            "http://www.w3.org/2004/02/skos/core#notation",
+        ],
+    },
     {   "scheme": "http://publications.europa.eu/resource/authority/language",    # Languages
         "properties": [
             "http://www.w3.org/2004/02/skos/core#notation",
         ],
     },
-    {   "scheme": "http://data.europa.eu/snb/eqf/25831c2" },                      # EQF levels
+    {   "scheme": "http://data.europa.eu/snb/eqf/25831c2",                        # EQF levels
+        "properties": [
+            "http://www.w3.org/2004/02/skos/core#notation",
+        ],
+    },
     {   "scheme": "http://data.europa.eu/snb/learning-opportunity/25831c2" },     # Learning opportunity type
     {   "scheme": "http://data.europa.eu/snb/learning-assessment/25831c2" },      # Mode of learning and assessment
     {   "scheme": "http://publications.europa.eu/resource/authority/country" },   # Countries and territories
 ]
 
+# Directory of vocabulary snapshots (see services/vocabulary_snapshots.py).
+# When set, in-process vocabulary lookups read the newest snapshot here
+# instead of querying Fuseki.
+VOCABULARY_SNAPSHOT_DIR = os.getenv("VOCABULARY_SNAPSHOT_DIR")
+
+# Seconds before an in-process concept index (services/concept_index.py) is
+# reloaded; 0 keeps it until the vocabulary is refreshed in this process.
+CONCEPT_INDEX_TTL = int(os.getenv("CONCEPT_INDEX_TTL", "3600"))
+
 SCHEMA_DIR = Path(os.getenv("SCHEMA_DIR", Path(__file__).resolve().parent / "schema"))
+
+# How course documents are framed with schema/frame.json: "compiled" uses the
+# framer in services/framer.py (falling back to pyld for anything it does not
+# support), "pyld" always frames with pyld.
+FRAMER = os.getenv("FRAMER", "compiled")
+
+# Provider listings count matches exactly up to this many; beyond it the
+# total is the planner's estimate and is flagged as approximate.
+PROVIDER_COUNT_EXACT_LIMIT = int(os.getenv("PROVIDER_COUNT_EXACT_LIMIT", "10000"))
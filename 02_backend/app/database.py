@@ -1,7 +1,10 @@
+from functools import lru_cache
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
 
-from config import DATABASE_URL
+from config import ASYNC_DATABASE_URL, DATABASE_URL
 
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -13,3 +16,29 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+@lru_cache(maxsize=1)
+def async_engine() -> AsyncEngine:
+    """asyncpg engine of the API process, created on first use so that the
+    CLI and pool workers never open one."""
+    return create_async_engine(ASYNC_DATABASE_URL)
+
+
+@lru_cache(maxsize=1)
+def _async_sessionmaker() -> async_sessionmaker:
+    return async_sessionmaker(async_engine(), autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    """Router dependency: an AsyncSession whose queries await the database
+    instead of blocking the event loop."""
+    async with _async_sessionmaker()() as db:
+        yield db
+
+
+def dispose_inherited_engine() -> None:
+    """Process-pool initializer: drop the pooled connections a forked worker
+    inherited from its parent without closing them, so the parent's
+    connections stay usable. The worker opens fresh ones on demand."""
+    engine.dispose(close=False)
@@ -5,8 +5,8 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from config import SERVICE_URL_FRONTEND
-from database import SessionLocal
-from routers import credentials, datalake, health, manifest, providers
+from database import SessionLocal, async_engine
+from routers import courses, credentials, datalake, health, manifest, providers
 from services.keys import ensure_active_keypair
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
@@ -17,6 +17,7 @@ async def lifespan(app: FastAPI):
     with SessionLocal() as db:
         ensure_active_keypair(db)
     yield
+    await async_engine().dispose()
 
 
 app = FastAPI(title="QL-Backend", lifespan=lifespan)
@@ -39,6 +40,7 @@ app.include_router(health.router)
 app.include_router(providers.router)
 app.include_router(manifest.router)
 app.include_router(datalake.router)
+app.include_router(courses.router)
 
 # Public-key sub-app — wildcard CORS so any provider domain can fetch the key
 public_app = FastAPI()
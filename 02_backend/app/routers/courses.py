@@ -0,0 +1,51 @@
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+from database import get_db
+from services.courses import get_course_document
+
+router = APIRouter(tags=["Courses"])
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison: W/ prefixes are ignored.
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return etag.removeprefix("W/") in tags
+
+
+@router.get("/courses/{course_uuid}", status_code=status.HTTP_200_OK)
+def get_course(
+    course_uuid: UUID,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    """Full framed document of a course; search results only carry the
+    fields in schema/search_projection.json.
+
+    Served from the course_document cache (framed on a miss) with a weak
+    ETag: the hash leaves out the ingestion timestamps, which the body
+    carries. A matching If-None-Match gets 304 Not Modified.
+    """
+    try:
+        document, content_hash = get_course_document(db, course_uuid)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to retrieve course: {str(e)}",
+        )
+
+    etag = f'W/"{content_hash}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return JSONResponse(content=document, headers=headers)
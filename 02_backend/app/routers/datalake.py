@@ -1,21 +1,42 @@
-import io
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, status
 from fastapi.responses import JSONResponse, StreamingResponse
 from minio.error import S3Error
+from pydantic import BaseModel, Field
 from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from config import MINIO_BUCKET_NAME
-from database import get_db
+from database import get_async_db, get_db
 from dependencies import get_minio_client
-from services.datalake import queue_provider_data as queue_provider_data_service
+from services import compression
+from services.datalake import queue_provider_data_async as queue_provider_data_service
+from services.datalake import queue_provider_batch_async as queue_provider_batch_service
+from services.datalake import queue_provider_fetch_async as queue_provider_fetch_service
 
 router = APIRouter(tags=["Datalake"])
 
+# Upper bound on sources/providers per /queue_provider_batch request.
+MAX_BATCH_ITEMS = 10000
+
+
+class QueueBatchItem(BaseModel):
+    provider_uuid: UUID
+    # Latest version when omitted; must be the latest if given.
+    source_version_uuid: Optional[UUID] = None
+    # Every source of the version when omitted.
+    source_uuid: Optional[UUID] = None
+
+
+class QueueBatchRequest(BaseModel):
+    items: List[QueueBatchItem] = Field(default_factory=list, max_length=MAX_BATCH_ITEMS)
+    # Shorthand for items with only a provider_uuid: all its sources.
+    providers: List[UUID] = Field(default_factory=list, max_length=MAX_BATCH_ITEMS)
+
 
 @router.get("/list_datalake_files_v2", status_code=status.HTTP_200_OK)
 async def list_datalake_files_v2(
@@ -23,19 +44,19 @@ async def list_datalake_files_v2(
     source_version_uuid: UUID = Query(..., title="Source Version UUID"),
     source_uuid: UUID = Query(..., title="Source UUID"),
     date: Optional[str] = Query(None, title="Date in YYYY-MM-DD format", regex=r"^\d{4}-\d{2}-\d{2}$|^$"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> Dict[str, Any]:
     try:
         today_date = datetime.now().strftime("%Y-%m-%d")
 
-        source_result = db.execute(
+        source_result = (await db.execute(
             text("""
                 SELECT last_file_pushed, last_file_pushed_date, last_file_pushed_path
                 FROM source
                 WHERE source_uuid = :source_uuid
             """),
             {"source_uuid": str(source_uuid)},
-        ).fetchone()
+        )).fetchone()
 
         source_info = {
             "last_file_pushed": source_result[0] if source_result else None,
@@ -54,7 +75,7 @@ async def list_datalake_files_v2(
                     detail="Invalid date format. Please use YYYY-MM-DD format.",
                 )
         else:
-            latest_row = db.execute(
+            latest_row = (await db.execute(
                 text("""
                     SELECT MAX(created_at_date)
                     FROM transaction
@@ -63,7 +84,7 @@ async def list_datalake_files_v2(
                       AND source_uuid = :s
                 """),
                 {"p": str(provider_uuid), "v": str(source_version_uuid), "s": str(source_uuid)},
-            ).scalar()
+            )).scalar()
             if latest_row:
                 date = latest_row.isoformat()
                 date_source = "transaction"
@@ -81,10 +102,11 @@ async def list_datalake_files_v2(
             "date_source": date_source,
         }
 
-        tx_rows = db.execute(
+        tx_rows = (await db.execute(
             text("""
                 SELECT trans_uuid, run_number, status, started_at, finished_at,
-                       bronze_file_path, log_file_path, course_count, error_message
+                       bronze_file_path, log_file_path, course_count, error_message,
+                       archived_at, silver_file_path
                 FROM transaction
                 WHERE provider_uuid = :p
                   AND source_version_uuid = :v
@@ -96,9 +118,9 @@ async def list_datalake_files_v2(
                 "p": str(provider_uuid),
                 "v": str(source_version_uuid),
                 "s": str(source_uuid),
-                "d": date,
+                "d": datetime.strptime(date, "%Y-%m-%d").date(),
             },
-        ).fetchall()
+        )).fetchall()
 
         file_list = []
         for tx in tx_rows:
@@ -115,8 +137,10 @@ async def list_datalake_files_v2(
                 "started_at": tx[3].isoformat() if tx[3] else None,
                 "finished_at": tx[4].isoformat() if tx[4] else None,
                 "log_file_path": tx[6],
+                "silver_file_path": tx[10],
                 "course_count": tx[7],
                 "error_message": tx[8],
+                "archived_at": tx[9].isoformat() if tx[9] else None,
             })
 
         if not file_list:
@@ -152,7 +176,7 @@ async def list_datalake_dates(
     provider_uuid: UUID = Query(..., title="Provider UUID"),
     source_version_uuid: UUID = Query(..., title="Source Version UUID"),
     source_uuid: UUID = Query(..., title="Source UUID"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> Dict[str, Any]:
     try:
         params_summary = {
@@ -161,7 +185,7 @@ async def list_datalake_dates(
             "source_uuid": str(source_uuid),
         }
 
-        rows = db.execute(
+        rows = (await db.execute(
             text("""
                 SELECT DISTINCT created_at_date
                 FROM transaction
@@ -171,7 +195,7 @@ async def list_datalake_dates(
                 ORDER BY created_at_date DESC
             """),
             {"p": str(provider_uuid), "v": str(source_version_uuid), "s": str(source_uuid)},
-        ).fetchall()
+        )).fetchall()
 
         if not rows:
             raise HTTPException(
@@ -204,8 +228,13 @@ async def list_datalake_dates(
 async def download_datalake_file(
     file_path: str = Query(..., title="Full path of file to download"),
     preview: bool = Query(False, title="If true, preview the file instead of downloading"),
+    accept_encoding: Optional[str] = Header(None),
     db: Session = Depends(get_db),
 ) -> Any:
+    """Stream a datalake object. Compressed bronze files are passed through
+    with Content-Encoding when the client accepts that encoding, and
+    decompressed on the fly otherwise; either way the client sees the
+    original file name and content type."""
     try:
         try:
             minio_client = get_minio_client()
@@ -215,13 +244,15 @@ async def download_datalake_file(
                 detail=f"Failed to connect to MinIO: {str(e)}",
             )
 
-        file_name = file_path.split("/")[-1]
+        encoding = compression.encoding_from_path(file_path)
+        file_name = compression.strip_encoding_suffix(file_path).split("/")[-1]
 
         content_type_map = {
             ".rdf": "application/rdf+xml",
             ".json": "application/json",
             ".xml": "application/xml",
             ".ttl": "text/turtle",
+            ".nt": "application/n-triples",
             ".txt": "text/plain",
         }
         content_type = next(
@@ -231,22 +262,34 @@ async def download_datalake_file(
 
         try:
             response = minio_client.get_object(MINIO_BUCKET_NAME, file_path)
-            file_stream = io.BytesIO(response.read())
-            disposition = "inline" if preview else "attachment"
-            return StreamingResponse(
-                file_stream,
-                media_type=content_type,
-                headers={
-                    "Content-Type": content_type,
-                    "Content-Disposition": f"{disposition}; filename={file_name}",
-                },
-            )
         except S3Error as e:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"File not found or access denied: {str(e)}",
             )
 
+        disposition = "inline" if preview else "attachment"
+        headers = {
+            "Content-Type": content_type,
+            "Content-Disposition": f"{disposition}; filename={file_name}",
+        }
+        if encoding and compression.accepts_encoding(accept_encoding, encoding):
+            headers["Content-Encoding"] = encoding
+            stream = response
+        else:
+            stream = compression.open_decompressed(response, encoding)
+        if encoding:
+            headers["Vary"] = "Accept-Encoding"
+
+        def _chunks():
+            try:
+                yield from compression.iter_chunks(stream)
+            finally:
+                response.close()
+                response.release_conn()
+
+        return StreamingResponse(_chunks(), media_type=content_type, headers=headers)
+
     except HTTPException:
         raise
     except Exception as e:
@@ -262,9 +305,9 @@ async def queue_provider_data(
     provider_uuid: UUID = Query(..., title="Provider UUID"),
     source_version_uuid: UUID = Query(..., title="Source Version UUID"),
     source_uuid: UUID = Query(..., title="Source UUID"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> Dict[str, Any]:
-    result = queue_provider_data_service(
+    result = await queue_provider_data_service(
         db, provider_uuid, source_version_uuid, source_uuid,
         background_tasks=background_tasks,
     )
@@ -273,3 +316,43 @@ async def queue_provider_data(
     if result.get("status") == "outdated":
         return JSONResponse(status_code=410, content=result)
     return result
+
+
+@router.post("/queue_provider_fetch", status_code=status.HTTP_202_ACCEPTED)
+async def queue_provider_fetch(
+    background_tasks: BackgroundTasks,
+    provider_uuid: UUID = Query(..., title="Provider UUID"),
+    source_version_uuid: UUID = Query(..., title="Source Version UUID"),
+    db: AsyncSession = Depends(get_async_db),
+) -> Dict[str, Any]:
+    """Fetch every source of the provider's latest manifest version
+    concurrently (see COURSE_FETCH_JOBS / COURSE_FETCH_PER_HOST)."""
+    result = await queue_provider_fetch_service(
+        db, provider_uuid, source_version_uuid,
+        background_tasks=background_tasks,
+    )
+    if result.get("status") == "busy":
+        return JSONResponse(status_code=423, content=result)
+    if result.get("status") == "outdated":
+        return JSONResponse(status_code=410, content=result)
+    return result
+
+
+@router.post("/queue_provider_batch", status_code=status.HTTP_202_ACCEPTED)
+async def queue_provider_batch(
+    request: QueueBatchRequest,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+) -> Dict[str, Any]:
+    """Queue course fetches for many sources and/or providers in one call;
+    returns a status per source."""
+    items = [item.model_dump() for item in request.items] + [
+        {"provider_uuid": p, "source_version_uuid": None, "source_uuid": None}
+        for p in request.providers
+    ]
+    if not items:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Specify at least one item or provider",
+        )
+    return await queue_provider_batch_service(db, items, background_tasks=background_tasks)
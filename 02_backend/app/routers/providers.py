@@ -2,12 +2,13 @@ from typing import Any, Dict, Optional
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
+from database import get_async_db
 from services.providers import (
-    get_provider as get_provider_service,
-    list_providers as list_providers_service,
+    get_provider_async as get_provider_service,
+    get_provider_summary_async as get_provider_summary_service,
+    list_providers_async as list_providers_service,
 )
 
 router = APIRouter(tags=["Providers"])
@@ -19,11 +20,13 @@ async def get_all_providers(
     with_data: bool = Query(False, title="Only providers with a manifest and data sources"),
     page: int = Query(1, ge=1, title="Page Number"),
     page_size: int = Query(10, ge=1, le=100, title="Page Size"),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, title="Next-page cursor of a previous response"),
+    db: AsyncSession = Depends(get_async_db),
 ) -> Dict[str, Any]:
     try:
-        return list_providers_service(
-            db, search=search_provider, with_data=with_data, page=page, page_size=page_size
+        return await list_providers_service(
+            db, search=search_provider, with_data=with_data, page=page, page_size=page_size,
+            cursor=cursor,
         )
     except HTTPException:
         raise
@@ -37,10 +40,10 @@ async def get_all_providers(
 @router.get("/get_provider", status_code=status.HTTP_200_OK)
 async def get_provider(
     provider_uuid: UUID = Query(..., title="Provider UUID"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> Dict[str, Any]:
     try:
-        return get_provider_service(db, provider_uuid)
+        return await get_provider_service(db, provider_uuid)
     except HTTPException:
         raise
     except Exception as e:
@@ -48,3 +51,19 @@ async def get_provider(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to retrieve provider: {str(e)}",
         )
+
+
+@router.get("/get_provider_summary", status_code=status.HTTP_200_OK)
+async def get_provider_summary(
+    provider_uuid: UUID = Query(..., title="Provider UUID"),
+    db: AsyncSession = Depends(get_async_db),
+) -> Dict[str, Any]:
+    try:
+        return await get_provider_summary_service(db, provider_uuid)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to retrieve provider summary: {str(e)}",
+        )
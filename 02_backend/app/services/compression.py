@@ -0,0 +1,109 @@
+"""Compression of datalake objects.
+
+Bronze files are compressed on write according to BRONZE_COMPRESSION and get
+the encoding's suffix appended to their object key (`….xml.gz`,
+`….ttl.zst`), so every reader can tell the encoding from the path alone;
+the encoding is also stored as object metadata and in the transaction
+ledger. zstd needs the optional `zstandard` package — without it, writes
+fall back to gzip and zstd objects cannot be read.
+"""
+import gzip
+import logging
+from typing import BinaryIO, Iterator, Optional
+
+from config import BRONZE_COMPRESSION
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+GZIP = "gzip"
+ZSTD = "zstd"
+
+SUFFIXES = {
+    GZIP: ".gz",
+    ZSTD: ".zst",
+}
+
+# Chunk size for streaming reads from MinIO.
+CHUNK_SIZE = 64 * 1024
+
+
+def bronze_encoding() -> Optional[str]:
+    """Encoding new bronze files are written with, or None for uncompressed."""
+    name = (BRONZE_COMPRESSION or "").strip().lower()
+    if name in ("", "none", "identity"):
+        return None
+    if name == ZSTD and zstandard is None:
+        logger.warning("BRONZE_COMPRESSION=zstd but the zstandard package is missing; using gzip")
+        return GZIP
+    if name not in SUFFIXES:
+        logger.warning("Unknown BRONZE_COMPRESSION %r; storing bronze uncompressed", name)
+        return None
+    return name
+
+
+def compress(data: bytes, encoding: Optional[str]) -> bytes:
+    if encoding is None:
+        return data
+    if encoding == GZIP:
+        return gzip.compress(data, mtime=0)
+    if encoding == ZSTD:
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    raise ValueError(f"unsupported encoding {encoding!r}")
+
+
+def encoding_from_path(path: str) -> Optional[str]:
+    """Encoding implied by an object key's suffix, or None."""
+    for encoding, suffix in SUFFIXES.items():
+        if path.endswith(suffix):
+            return encoding
+    return None
+
+
+def strip_encoding_suffix(path: str) -> str:
+    encoding = encoding_from_path(path)
+    return path[: -len(SUFFIXES[encoding])] if encoding else path
+
+
+def open_decompressed(stream: BinaryIO, encoding: Optional[str]) -> BinaryIO:
+    """Wrap a readable binary stream so reads return decompressed bytes.
+    Data is decompressed as it is read; nothing is buffered up front."""
+    if encoding is None:
+        return stream
+    if encoding == GZIP:
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    if encoding == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("reading zstd objects requires the zstandard package")
+        return zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+    raise ValueError(f"unsupported encoding {encoding!r}")
+
+
+def iter_chunks(stream: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def accepts_encoding(accept_encoding: Optional[str], encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows `encoding` (q=0 excludes it)."""
+    if not accept_encoding:
+        return False
+    for item in accept_encoding.split(","):
+        token, _, params = item.strip().partition(";")
+        if token.strip().lower() not in (encoding, "*"):
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                return float(q[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
@@ -0,0 +1,208 @@
+"""In-process lookup tables for the controlled vocabularies.
+
+One `SchemeIndex` per scheme in DEFAULT_VOCABULARIES maps notations and
+labels to concept URIs and concept URIs back to their English prefLabel.
+Indexes are loaded on first use — from the scheme's named graph in Fuseki,
+or from the newest snapshot under VOCABULARY_SNAPSHOT_DIR when that is set —
+and shared by every thread in the process. Concurrent first lookups wait on
+a single load per scheme instead of each querying Fuseki.
+
+An index is reloaded after CONCEPT_INDEX_TTL seconds, or straight away once
+`invalidate` is called (`refresh_vocabularies` does so for every scheme whose
+content changed). Processes that did not run the refresh pick the change up
+when their TTL expires.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from rdflib import Literal, URIRef
+from rdflib.namespace import SKOS
+from rdflib.term import Identifier
+
+from config import CONCEPT_INDEX_TTL, DEFAULT_VOCABULARIES, VOCABULARY_SNAPSHOT_DIR
+from services import fuseki
+from services.vocabulary import _normalize_spec, scheme_graph_uri
+
+logger = logging.getLogger(__name__)
+
+# An index that came back empty (Fuseki down, scheme not fetched yet) is
+# retried after this many seconds rather than after the full TTL.
+EMPTY_RETRY_SECONDS = 60
+
+_INDEXED_PROPERTIES = (SKOS.notation, SKOS.prefLabel, SKOS.altLabel)
+
+
+@dataclass
+class SchemeIndex:
+    scheme_uri: str
+    # lower-cased notation → concept
+    notations: Dict[str, URIRef] = field(default_factory=dict)
+    # (datatype IRI, lower-cased notation) → concept; "" for untyped notations
+    typed_notations: Dict[Tuple[str, str], URIRef] = field(default_factory=dict)
+    # lower-cased prefLabel or altLabel → concept
+    labels: Dict[str, URIRef] = field(default_factory=dict)
+    # concept → English prefLabel
+    pref_labels: Dict[URIRef, str] = field(default_factory=dict)
+    expires_at: float = 0.0
+
+    def __len__(self) -> int:
+        return len(self.pref_labels) or len(self.notations)
+
+    def add(self, concept: URIRef, prop: URIRef, value: Identifier) -> None:
+        if not isinstance(value, Literal):
+            return
+        key = str(value).strip().lower()
+        if not key:
+            return
+        if prop == SKOS.notation:
+            self.notations.setdefault(key, concept)
+            self.typed_notations[(str(value.datatype or ""), key)] = concept
+        elif prop == SKOS.prefLabel:
+            # prefLabels win over altLabels for the same text
+            self.labels[key] = concept
+            if value.language in (None, "en"):
+                self.pref_labels.setdefault(concept, str(value))
+        elif prop == SKOS.altLabel:
+            self.labels.setdefault(key, concept)
+
+
+def _rows_from_fuseki(scheme_uri: str) -> Iterator[Tuple[URIRef, URIRef, Identifier]]:
+    values = " ".join(f"<{p}>" for p in _INDEXED_PROPERTIES)
+    query = f"""PREFIX skos: <{SKOS}>
+
+SELECT ?concept ?p ?o
+FROM <{scheme_graph_uri(scheme_uri)}>
+WHERE {{
+  VALUES ?p {{ {values} }}
+  ?concept skos:inScheme <{scheme_uri}> ;
+           ?p ?o .
+  FILTER(isLiteral(?o))
+}}
+"""
+    for b in fuseki.sparql_select(query, timeout=120):
+        concept = (b.get("concept") or {}).get("value")
+        prop = (b.get("p") or {}).get("value")
+        o = b.get("o") or {}
+        if not concept or not prop or "value" not in o:
+            continue
+        if o.get("xml:lang"):
+            value = Literal(o["value"], lang=o["xml:lang"])
+        elif o.get("datatype"):
+            value = Literal(o["value"], datatype=URIRef(o["datatype"]))
+        else:
+            value = Literal(o["value"])
+        yield URIRef(concept), URIRef(prop), value
+
+
+def _rows_from_snapshot(scheme_uri: str) -> Iterator[Tuple[URIRef, URIRef, Identifier]]:
+    # Deferred: vocabulary_snapshots imports services.vocabulary, which
+    # imports this module lazily as well.
+    from services.vocabulary_snapshots import DiskSnapshotStore, read_scheme_graph
+
+    graph = read_scheme_graph(DiskSnapshotStore(VOCABULARY_SNAPSHOT_DIR), scheme_uri)
+    if graph is None:
+        logger.warning("No snapshot of %s under %s", scheme_uri, VOCABULARY_SNAPSHOT_DIR)
+        return
+    for prop in _INDEXED_PROPERTIES:
+        for concept, value in graph.subject_objects(prop):
+            if isinstance(concept, URIRef):
+                yield concept, prop, value
+
+
+def _load(scheme_uri: str) -> SchemeIndex:
+    index = SchemeIndex(scheme_uri=scheme_uri)
+    rows = _rows_from_snapshot(scheme_uri) if VOCABULARY_SNAPSHOT_DIR else _rows_from_fuseki(scheme_uri)
+    try:
+        for concept, prop, value in rows:
+            index.add(concept, prop, value)
+    except Exception:
+        logger.exception("Loading concept index for %s failed", scheme_uri)
+
+    if len(index):
+        index.expires_at = time.monotonic() + CONCEPT_INDEX_TTL if CONCEPT_INDEX_TTL > 0 else float("inf")
+        logger.info(
+            "Concept index %s: %s concept(s), %s notation(s), %s label(s)",
+            scheme_uri, len(index.pref_labels), len(index.notations), len(index.labels),
+        )
+    else:
+        index.expires_at = time.monotonic() + EMPTY_RETRY_SECONDS
+        logger.warning("Concept index %s is empty; retrying in %ss", scheme_uri, EMPTY_RETRY_SECONDS)
+    return index
+
+
+_INDEXES: Dict[str, SchemeIndex] = {}
+_LOAD_LOCKS: Dict[str, threading.Lock] = {}
+_LOCKS_GUARD = threading.Lock()
+
+
+def _load_lock(scheme_uri: str) -> threading.Lock:
+    with _LOCKS_GUARD:
+        return _LOAD_LOCKS.setdefault(scheme_uri, threading.Lock())
+
+
+def get_scheme(scheme_uri: str) -> SchemeIndex:
+    """Index of one scheme, loading it if it is missing or expired. Only one
+    thread loads a given scheme; the others wait and reuse its result."""
+    index = _INDEXES.get(scheme_uri)
+    if index is not None and index.expires_at > time.monotonic():
+        return index
+    with _load_lock(scheme_uri):
+        index = _INDEXES.get(scheme_uri)
+        if index is None or index.expires_at <= time.monotonic():
+            index = _load(scheme_uri)
+            _INDEXES[scheme_uri] = index
+    return index
+
+
+def configured_schemes() -> Iterator[str]:
+    for spec in DEFAULT_VOCABULARIES:
+        yield _normalize_spec(spec)[0]
+
+
+def invalidate(scheme_uri: Optional[str] = None) -> None:
+    """Drop the index of `scheme_uri` (default: every scheme) so the next
+    lookup reloads it."""
+    if scheme_uri is None:
+        _INDEXES.clear()
+    else:
+        _INDEXES.pop(scheme_uri, None)
+
+
+def notation_to_uri(
+    scheme_uri: str, notation: str, datatypes: Optional[Iterable[str]] = None,
+) -> Optional[URIRef]:
+    """Concept whose skos:notation equals `notation` (case-insensitive). With
+    `datatypes`, only notations typed with one of them match, tried in order."""
+    if not isinstance(notation, str) or not notation.strip():
+        return None
+    index = get_scheme(scheme_uri)
+    key = notation.strip().lower()
+    if datatypes is None:
+        return index.notations.get(key)
+    for datatype in datatypes:
+        uri = index.typed_notations.get((datatype, key))
+        if uri is not None:
+            return uri
+    return None
+
+
+def label_to_uri(scheme_uri: str, label: str) -> Optional[URIRef]:
+    """Concept whose prefLabel or altLabel equals `label` (case-insensitive)."""
+    if not isinstance(label, str) or not label.strip():
+        return None
+    return get_scheme(scheme_uri).labels.get(label.strip().lower())
+
+
+def pref_label(concept_uri: str, scheme_uri: Optional[str] = None) -> Optional[str]:
+    """English prefLabel of a concept, looked up in `scheme_uri` or, if that
+    is not given, in every configured scheme."""
+    concept = URIRef(concept_uri)
+    schemes = [scheme_uri] if scheme_uri else configured_schemes()
+    for scheme in schemes:
+        label = get_scheme(scheme).pref_labels.get(concept)
+        if label is not None:
+            return label
+    return None
@@ -9,6 +9,7 @@ from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from config import MINIO_BUCKET_NAME
+from services import compression
 
 from .source_types.base import DataSourceType
 from .source_types.eduapi import EduApiDataSource
@@ -35,8 +36,9 @@ def _content_type_to_format(content_type: str) -> tuple[str, Optional[str]]:
 
 
 def _format_from_path(path: str) -> Optional[str]:
-    """Infer rdflib parse format from a bronze file's extension."""
-    lower = path.lower()
+    """Infer rdflib parse format from a bronze file's extension, ignoring a
+    compression suffix."""
+    lower = compression.strip_encoding_suffix(path).lower()
     if lower.endswith(".ttl"):
         return "turtle"
     if lower.endswith(".xml"):
@@ -56,10 +58,12 @@ def latest_bronze_for_source(db: Session, source_uuid: UUID) -> Optional[Dict[st
     """
     row = db.execute(
         text("""
-            SELECT provider_uuid, source_version_uuid, source_uuid, bronze_file_path
+            SELECT provider_uuid, source_version_uuid, source_uuid, bronze_file_path,
+                   bronze_encoding
             FROM transaction
             WHERE source_uuid = :source_uuid
               AND bronze_file_path IS NOT NULL
+              AND archived_at IS NULL
             ORDER BY created_at_date DESC, run_number DESC
             LIMIT 1
         """),
@@ -75,6 +79,41 @@ def latest_bronze_for_source(db: Session, source_uuid: UUID) -> Optional[Dict[st
         "source_uuid": str(row[2]),
         "file_path": file_path,
         "file_format": _format_from_path(file_path),
+        "file_encoding": row[4] or compression.encoding_from_path(file_path),
+    }
+
+
+def latest_silver_for_source(db: Session, source_uuid: UUID) -> Optional[Dict[str, Any]]:
+    """Like `latest_bronze_for_source`, for the most recent run that wrote a
+    silver snapshot; the message also carries `silver_file_path`.
+
+    Returns None if no snapshot exists for this source.
+    """
+    row = db.execute(
+        text("""
+            SELECT provider_uuid, source_version_uuid, source_uuid, bronze_file_path,
+                   bronze_encoding, silver_file_path
+            FROM transaction
+            WHERE source_uuid = :source_uuid
+              AND silver_file_path IS NOT NULL
+              AND archived_at IS NULL
+            ORDER BY created_at_date DESC, run_number DESC
+            LIMIT 1
+        """),
+        {"source_uuid": str(source_uuid)},
+    ).fetchone()
+    if not row:
+        return None
+
+    file_path = row[3]
+    return {
+        "provider_uuid": str(row[0]),
+        "source_version_uuid": str(row[1]),
+        "source_uuid": str(row[2]),
+        "file_path": file_path,
+        "file_format": _format_from_path(file_path),
+        "file_encoding": row[4] or compression.encoding_from_path(file_path),
+        "silver_file_path": row[5],
     }
 
 
@@ -89,7 +128,7 @@ def list_sources_with_bronze(
     latest bronze). Optionally filters by provider.
     """
     params: Dict[str, Any] = {}
-    where = ["t.bronze_file_path IS NOT NULL"]
+    where = ["t.bronze_file_path IS NOT NULL", "t.archived_at IS NULL"]
     if provider_uuid is not None:
         where.append("t.provider_uuid = :provider_uuid")
         params["provider_uuid"] = str(provider_uuid)
@@ -133,7 +172,8 @@ def fetch_bronze(
     The caller supplies `file_path_stem` — the MinIO object key without
     extension — so the orchestrator can co-locate related artefacts (e.g. the
     run log) under a shared timestamped name. Bronze just appends the
-    extension inferred from the response content-type.
+    extension inferred from the response content-type, plus `.gz` / `.zst`
+    when BRONZE_COMPRESSION is set.
 
     Returns None on any failure (logged).
     """
@@ -194,23 +234,33 @@ def fetch_bronze(
         return None
 
     file_extension, file_format = _content_type_to_format(content_type or "")
-    file_path = f"{file_path_stem}{file_extension}"
+    encoding = compression.bronze_encoding()
+    stored_bytes = compression.compress(file_bytes, encoding)
+    file_path = f"{file_path_stem}{file_extension}{compression.SUFFIXES.get(encoding, '')}"
 
     try:
         minio_client.put_object(
             MINIO_BUCKET_NAME, file_path,
-            BytesIO(file_bytes), length=len(file_bytes),
+            BytesIO(stored_bytes), length=len(stored_bytes),
             content_type=content_type,
+            metadata={"encoding": encoding} if encoding else None,
         )
     except S3Error as e:
         logger.error("MinIO write failed: %s", e)
         return None
 
-    logger.info("Bronze: wrote %s (%s bytes)", file_path, len(file_bytes))
+    if encoding:
+        logger.info(
+            "Bronze: wrote %s (%s bytes, %s from %s bytes)",
+            file_path, len(stored_bytes), encoding, len(file_bytes),
+        )
+    else:
+        logger.info("Bronze: wrote %s (%s bytes)", file_path, len(file_bytes))
 
     return {
         "provider_uuid": str(provider_uuid),
         "source_uuid": str(source_uuid),
         "file_path": file_path,
         "file_format": file_format,
+        "file_encoding": encoding,
     }
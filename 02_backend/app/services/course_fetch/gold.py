@@ -1,41 +1,97 @@
+import hashlib
+import json
 import logging
-from typing import Dict, List, Optional
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import requests
+from sqlalchemy import text
+from sqlalchemy.orm import Session
 
-from config import (
-    GRAPH_COURSES,
-    MEILISEARCH_API_KEY,
-    MEILISEARCH_INDEX,
-    MEILISEARCH_URL,
-)
-from services import fuseki
+from config import GRAPH_COURSES, MEILISEARCH_INDEX, SCHEMA_DIR
+from services import fuseki, meilisearch
 from services.courses import (
     CourseNotFound,
-    frame_course,
+    course_document,
+    document_hash,
     resolve_course_uri,
+    store_course_documents,
 )
 
 logger = logging.getLogger(__name__)
 
+# Full rebuilds are written here, then swapped with the live index.
+SHADOW_INDEX = f"{MEILISEARCH_INDEX}_shadow"
+
+# Documents per upload during a full rebuild; large batches index fastest.
+REBUILD_BATCH_SIZE = 5000
+
+# Fields of the framed document that go into Meilisearch; the full document
+# is kept in the course_document table. Without the file, everything is sent.
+SEARCH_PROJECTION_PATH = SCHEMA_DIR / "search_projection.json"
+
+
+@dataclass
+class GoldStats:
+    uploaded: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    failed: int = 0
+
+
+@lru_cache(maxsize=1)
+def _search_projection() -> Optional[Dict[str, Any]]:
+    if not SEARCH_PROJECTION_PATH.exists():
+        return None
+    with open(SEARCH_PROJECTION_PATH, "r") as f:
+        return json.load(f)
+
+
+def _project(value: Any, spec: Any) -> Any:
+    if spec is True:
+        return value
+    if isinstance(value, list):
+        return [_project(item, spec) for item in value]
+    if isinstance(value, dict):
+        return {key: _project(value[key], sub) for key, sub in spec.items() if key in value}
+    return value
 
-def _meili_url() -> str:
-    return f"{MEILISEARCH_URL}/indexes/{MEILISEARCH_INDEX}/documents"
 
+@lru_cache(maxsize=1)
+def _projection_hash() -> str:
+    canonical = json.dumps(_search_projection(), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
 
-def _meili_headers() -> Dict[str, str]:
-    headers = {"Content-Type": "application/json"}
-    if MEILISEARCH_API_KEY:
-        headers["Authorization"] = f"Bearer {MEILISEARCH_API_KEY}"
-    return headers
+
+def _index_hash(document: Dict[str, Any]) -> str:
+    """Hash recorded in course_index for an indexed document: the document's
+    own hash combined with the projection spec's, so that an edit to
+    search_projection.json re-sends every course on its next gold run."""
+    combined = f"{document_hash(document)}:{_projection_hash()}"
+    return hashlib.sha256(combined.encode("utf-8")).hexdigest()
+
+
+def search_projection(document: Dict[str, Any]) -> Dict[str, Any]:
+    """The part of a course document that is indexed in Meilisearch.
+
+    The projection spec mirrors the document's shape: `true` keeps a field
+    as is, an object keeps only the listed keys of the nested node(s), and
+    keys not listed are dropped. Lists are projected item by item.
+    """
+    spec = _search_projection()
+    return document if spec is None else _project(document, spec)
 
 
 def reindex_course(
     session: requests.Session,
     course_uuid: str,
     course_uri: Optional[str] = None,
+    *,
+    db: Optional[Session] = None,
 ) -> bool:
-    """Frame one course and upsert it into Meilisearch.
+    """Frame one course and upsert its search projection into Meilisearch
+    (and, with `db`, the full document into course_document).
 
     If `course_uri` is None, resolve it from the UUID via Fuseki. Callers that
     already have the URI (e.g. the silver→gold handoff, `list_provider_courses`,
@@ -43,44 +99,23 @@ def reindex_course(
     """
     if course_uri is None:
         try:
-            course_uri = resolve_course_uri(course_uuid)
+            course_uri = resolve_course_uri(course_uuid, db)
         except CourseNotFound as e:
             logger.warning("Resolve failed for %s: %s", course_uuid, e)
             return False
 
     try:
-        framed = frame_course(course_uri)
+        framed = course_document(course_uuid, course_uri)
     except Exception as e:
         logger.warning("Framing failed for %s: %s", course_uuid, e)
         return False
 
-    framed.pop("@context", None)
-    framed["uri"] = framed["id"]
-    framed["id"] = course_uuid
-
-    if "elm:learningOpportunity" in framed and isinstance(framed["elm:learningOpportunity"], list):
-        count = len(framed["elm:learningOpportunity"])
-        if count > 0:
-            framed["instanceCount"] = len(framed["elm:learningOpportunity"])
-
-    try:
-        r = session.post(_meili_url(), headers=_meili_headers(), json=framed, timeout=30)
-        r.raise_for_status()
-        return True
-    except Exception as e:
-        logger.warning("Meilisearch upload failed for %s: %s", course_uuid, e)
-        return False
-
+    if db is not None:
+        store_course_documents(db, [framed])
+    return meilisearch.add_documents(session, [search_projection(framed)], timeout=30) is not None
 
-def list_all_courses() -> List[Dict[str, str]]:
-    """Enumerate every course in the Fuseki courses graph as {uuid, uri} pairs."""
-    query = f"""
-PREFIX owl: <http://www.w3.org/2002/07/owl#>
-PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-PREFIX ql:  <http://data.quality-link.eu/ontology/v1#>
-PREFIX elm: <http://data.europa.eu/snb/model/elm/>
 
-SELECT DISTINCT ?uuid_node ?los
+_GRAPH_COURSES_PATTERN = f"""
 FROM <{GRAPH_COURSES}>
 WHERE {{
   VALUES ?t {{
@@ -98,6 +133,43 @@ WHERE {{
   }}
 }}
 """
+
+_PREFIXES = """
+PREFIX owl: <http://www.w3.org/2002/07/owl#>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+PREFIX ql:  <http://data.quality-link.eu/ontology/v1#>
+PREFIX elm: <http://data.europa.eu/snb/model/elm/>
+"""
+
+
+def _graph_course_count() -> int:
+    bindings = fuseki.sparql_select(
+        f"{_PREFIXES}\nSELECT (COUNT(DISTINCT ?los) AS ?n)\n{_GRAPH_COURSES_PATTERN}"
+    )
+    return int(bindings[0]["n"]["value"]) if bindings else 0
+
+
+def list_all_courses(db: Optional[Session] = None) -> List[Dict[str, str]]:
+    """Enumerate every course as {uuid, uri} pairs: from the course table
+    with `db` once it covers the Fuseki courses graph, else from the graph.
+
+    The table fills as sources go through silver, so until every source has
+    (see `course silver --all --from-snapshot`) it holds fewer courses than
+    the graph; listing from it then would drop the rest from a rebuilt
+    search index."""
+    if db is not None:
+        rows = db.execute(
+            text("SELECT course_uuid, course_uri FROM course ORDER BY course_uuid")
+        ).fetchall()
+        in_graph = _graph_course_count()
+        if rows and len(rows) >= in_graph:
+            return [{"uuid": str(r[0]), "uri": r[1]} for r in rows]
+        logger.warning(
+            "Course table holds %s of the %s courses in the graph; listing courses from Fuseki",
+            len(rows), in_graph,
+        )
+
+    query = f"{_PREFIXES}\nSELECT DISTINCT ?uuid_node ?los\n{_GRAPH_COURSES_PATTERN}"
     bindings = fuseki.sparql_select(query)
     courses: List[Dict[str, str]] = []
     for b in bindings:
@@ -114,18 +186,223 @@ WHERE {{
     return courses
 
 
-def index_gold(session: requests.Session, courses: List[Dict[str, str]]) -> None:
-    """Upsert each course into Meilisearch. Counts are logged."""
-    if not courses:
-        logger.info("Gold: nothing to index")
+def _stored_hashes(db: Session, source_uuid: str) -> Dict[str, Optional[str]]:
+    """Recorded hash per indexed course of a source; None for courses whose
+    full document is missing from course_document, so they are redone."""
+    rows = db.execute(
+        text("""
+            SELECT ci.course_uuid,
+                   CASE WHEN cd.course_uuid IS NULL THEN NULL ELSE ci.content_hash END
+            FROM course_index ci
+            LEFT JOIN course_document cd ON cd.course_uuid = ci.course_uuid
+            WHERE ci.source_uuid = :s
+        """),
+        {"s": source_uuid},
+    ).fetchall()
+    return {str(r[0]): r[1] for r in rows}
+
+
+def _record_hashes(db: Session, source_uuid: str, hashes: Dict[str, str]) -> None:
+    if not hashes:
         return
+    db.execute(
+        text("""
+            INSERT INTO course_index (course_uuid, source_uuid, content_hash, indexed_at)
+            VALUES (:course_uuid, :source_uuid, :content_hash, NOW())
+            ON CONFLICT (course_uuid) DO UPDATE SET
+                source_uuid = EXCLUDED.source_uuid,
+                content_hash = EXCLUDED.content_hash,
+                indexed_at = EXCLUDED.indexed_at
+        """),
+        [
+            {"course_uuid": u, "source_uuid": source_uuid, "content_hash": h}
+            for u, h in hashes.items()
+        ],
+    )
+    db.commit()
+
+
+def _task_succeeded(session: requests.Session, task_uid: int) -> bool:
+    try:
+        meilisearch.wait_for_task(session, task_uid)
+    except (meilisearch.MeilisearchError, requests.RequestException) as e:
+        logger.warning("Meilisearch task %s failed: %s", task_uid, e)
+        return False
+    return True
+
+
+def index_gold(
+    session: requests.Session,
+    courses: List[Dict[str, str]],
+    *,
+    db: Optional[Session] = None,
+    source_uuid: Optional[str] = None,
+) -> GoldStats:
+    """Frame each course, store the full document in course_document (with
+    `db`) and upload its search projection to Meilisearch in batches.
+
+    With `db` and `source_uuid`, gold is incremental: documents whose hash
+    matches the one recorded in `course_index` for the source are not sent
+    again, and courses recorded for the source that are no longer among
+    `courses` are deleted from Meilisearch. Without them, every course is
+    uploaded. Counts are logged.
+    """
+    stats = GoldStats()
+    incremental = db is not None and source_uuid is not None
+    stored = _stored_hashes(db, source_uuid) if incremental else {}
+
+    pending: List[Dict[str, Any]] = []
+    pending_hashes: Dict[str, str] = {}
+
+    subgraph_hashes = {c["uuid"]: c.get("subgraph_hash") for c in courses}
+
+    def _flush() -> None:
+        if db is not None:
+            store_course_documents(db, pending, subgraph_hashes)
+        # A hash is recorded only once Meilisearch has indexed the batch, or
+        # a document its task rejected would be skipped as unchanged forever.
+        task_uid = meilisearch.add_documents(session, [search_projection(d) for d in pending])
+        if task_uid is not None and _task_succeeded(session, task_uid):
+            stats.uploaded += len(pending)
+            if incremental:
+                _record_hashes(db, source_uuid, pending_hashes)
+        else:
+            stats.failed += len(pending)
+        pending.clear()
+        pending_hashes.clear()
 
-    uploaded = 0
-    failed = 0
     for c in courses:
-        if reindex_course(session, c["uuid"], c.get("uri")):
-            uploaded += 1
+        try:
+            document = course_document(c["uuid"], c.get("uri") or resolve_course_uri(c["uuid"], db))
+        except Exception as e:
+            logger.warning("Framing failed for %s: %s", c["uuid"], e)
+            stats.failed += 1
+            continue
+        content_hash = _index_hash(document)
+        if stored.get(c["uuid"]) == content_hash:
+            stats.unchanged += 1
+            continue
+        pending.append(document)
+        pending_hashes[c["uuid"]] = content_hash
+        if len(pending) >= meilisearch.BATCH_SIZE:
+            _flush()
+    if pending:
+        _flush()
+
+    if incremental:
+        gone = sorted(set(stored) - {c["uuid"] for c in courses})
+        for i in range(0, len(gone), meilisearch.BATCH_SIZE):
+            batch = gone[i:i + meilisearch.BATCH_SIZE]
+            task_uid = meilisearch.delete_documents(session, batch)
+            if task_uid is None or not _task_succeeded(session, task_uid):
+                stats.failed += len(batch)
+                continue
+            db.execute(
+                text("DELETE FROM course_index WHERE course_uuid = ANY(CAST(:ids AS uuid[]))"),
+                {"ids": batch},
+            )
+            db.execute(
+                text("DELETE FROM course_document WHERE course_uuid = ANY(CAST(:ids AS uuid[]))"),
+                {"ids": batch},
+            )
+            db.commit()
+            stats.deleted += len(batch)
+
+    logger.info(
+        "Gold: uploaded=%s unchanged=%s deleted=%s failed=%s",
+        stats.uploaded, stats.unchanged, stats.deleted, stats.failed,
+    )
+    return stats
+
+
+def rebuild_search_index(
+    session: requests.Session,
+    courses: List[Dict[str, str]],
+    *,
+    db: Optional[Session] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> GoldStats:
+    """Reindex every course into a fresh shadow index and swap it in.
+
+    The shadow index gets the live index's settings, is filled in large
+    batches while search keeps hitting the untouched live index, and
+    replaces it in one atomic swap. Courses no longer in `courses` are gone
+    afterwards. The previous contents are dropped with the shadow. Nothing is
+    swapped if any framing or upload failed. With `db`, full documents are
+    stored in course_document as they are framed, and `course_index` and
+    course_document are brought in line with the new index. `on_progress(done, total)` is
+    called after each batch.
+    """
+    stats = GoldStats()
+
+    live = meilisearch.get_index(session, MEILISEARCH_INDEX)
+    meilisearch.delete_index(session, SHADOW_INDEX)
+    meilisearch.create_index(session, SHADOW_INDEX, primary_key=(live or {}).get("primaryKey") or "id")
+    if live is not None:
+        meilisearch.update_settings(session, SHADOW_INDEX, meilisearch.get_settings(session, MEILISEARCH_INDEX))
+
+    hashes: Dict[str, str] = {}
+    tasks: List[Tuple[int, int]] = []
+    batch: List[Dict[str, Any]] = []
+
+    def _flush() -> None:
+        if db is not None:
+            store_course_documents(db, batch)
+        task_uid = meilisearch.add_documents(
+            session, [search_projection(d) for d in batch], index=SHADOW_INDEX, timeout=300,
+        )
+        if task_uid is None:
+            stats.failed += len(batch)
         else:
-            failed += 1
+            tasks.append((task_uid, len(batch)))
+            stats.uploaded += len(batch)
+        batch.clear()
+
+    for i, c in enumerate(courses, 1):
+        try:
+            document = course_document(c["uuid"], c.get("uri") or resolve_course_uri(c["uuid"], db))
+        except Exception as e:
+            logger.warning("Framing failed for %s: %s", c["uuid"], e)
+            stats.failed += 1
+            continue
+        hashes[c["uuid"]] = _index_hash(document)
+        batch.append(document)
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            _flush()
+            if on_progress:
+                on_progress(i, len(courses))
+    if batch:
+        _flush()
+    if on_progress:
+        on_progress(len(courses), len(courses))
+
+    # Tasks of one index run in order; wait for each to see failures.
+    for task_uid, count in tasks:
+        if not _task_succeeded(session, task_uid):
+            stats.uploaded -= count
+            stats.failed += count
+
+    if stats.failed:
+        logger.error("Search index rebuild: %s course(s) failed — live index left unchanged", stats.failed)
+        meilisearch.delete_index(session, SHADOW_INDEX)
+        return stats
+
+    if live is None:
+        meilisearch.create_index(session, MEILISEARCH_INDEX)
+    meilisearch.swap_indexes(session, MEILISEARCH_INDEX, SHADOW_INDEX)
+    meilisearch.delete_index(session, SHADOW_INDEX)
+    logger.info("Search index rebuild: %s document(s) swapped into %s", stats.uploaded, MEILISEARCH_INDEX)
 
-    logger.info("Gold: uploaded=%s failed=%s", uploaded, failed)
+    if db is not None:
+        for table in ("course_index", "course_document"):
+            db.execute(
+                text(f"DELETE FROM {table} WHERE NOT (course_uuid = ANY(CAST(:ids AS uuid[])))"),
+                {"ids": list(hashes)},
+            )
+        if hashes:
+            db.execute(
+                text("UPDATE course_index SET content_hash = :h, indexed_at = NOW() WHERE course_uuid = :u"),
+                [{"u": u, "h": h} for u, h in hashes.items()],
+            )
+        db.commit()
+    return stats
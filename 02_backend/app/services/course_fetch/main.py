@@ -1,28 +1,38 @@
 import io
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from datetime import datetime, timezone
 from io import BytesIO
-from typing import Iterator
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
 from uuid import UUID
 
 import requests
 from minio import Minio
 
-from config import MINIO_BUCKET_NAME
+from config import COURSE_FETCH_JOBS, COURSE_FETCH_PER_HOST, MINIO_BUCKET_NAME
 from database import SessionLocal
 from dependencies import get_minio_client
 from services.locks import NS_COURSE_FETCH, advisory_lock
 
-from .bronze import fetch_bronze, latest_bronze_for_source
+from .bronze import fetch_bronze, latest_bronze_for_source, latest_silver_for_source
 from .gold import index_gold
-from .silver import enrich_silver
+from .silver import enrich_silver, push_silver_snapshot
 from .transactions import finish_transaction, start_transaction, update_transaction
 
 logger = logging.getLogger(__name__)
 
 _LOG_FORMATTER = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
 
+# Runs capturing logs at the moment, and the parent logger's level before
+# the first of them started: the level is raised once for all concurrent
+# runs and restored by the last one to finish.
+_capture_lock = threading.Lock()
+_capture_count = 0
+_capture_saved_level = logging.NOTSET
+
 
 @contextmanager
 def _capture_logs() -> Iterator[io.StringIO]:
@@ -31,24 +41,37 @@ def _capture_logs() -> Iterator[io.StringIO]:
 
     Child loggers (bronze, silver, gold, source_types.*) propagate up, so
     one handler on the parent captures everything. The parent's level is
-    forced to INFO for the duration — otherwise CLI runs (which never call
-    logging.basicConfig) inherit the root WARNING level and drop INFO records
-    before they ever reach the handler.
+    forced to INFO while any run captures — otherwise CLI runs (which never
+    call logging.basicConfig) inherit the root WARNING level and drop INFO
+    records before they ever reach the handler.
+
+    Only records from the calling thread are kept, so concurrent runs of
+    `run_provider_fetch` each log to their own buffer.
     """
+    global _capture_count, _capture_saved_level
+
     buf = io.StringIO()
     handler = logging.StreamHandler(buf)
     handler.setFormatter(_LOG_FORMATTER)
     handler.setLevel(logging.DEBUG)
+    thread_id = threading.get_ident()
+    handler.addFilter(lambda record: record.thread == thread_id)
     parent = logging.getLogger("services.course_fetch")
-    previous_level = parent.level
-    parent.setLevel(logging.INFO)
+    with _capture_lock:
+        if _capture_count == 0:
+            _capture_saved_level = parent.level
+            parent.setLevel(logging.INFO)
+        _capture_count += 1
     parent.addHandler(handler)
     try:
         yield buf
     finally:
         handler.flush()
         parent.removeHandler(handler)
-        parent.setLevel(previous_level)
+        with _capture_lock:
+            _capture_count -= 1
+            if _capture_count == 0:
+                parent.setLevel(_capture_saved_level)
 
 
 def _upload_log(minio_client: Minio, object_key: str, content: str) -> None:
@@ -66,7 +89,8 @@ def _build_file_path_stem(
     """MinIO object-key stem shared by the bronze data file and the run log.
 
     Layout: `datalake/courses/{provider}/{version}/{source}/{YYYY-MM-DD}/{YYYYMMDD_HHMMSS}`
-    Bronze appends the content-type extension; the log appends `_log.txt`.
+    Bronze appends the content-type extension, the silver snapshot
+    `_silver.nt`, and the log `_log.txt`.
     """
     now = datetime.now(timezone.utc)
     return (
@@ -79,12 +103,15 @@ def run_course_fetch(
     provider_uuid: UUID,
     source_version_uuid: UUID,
     source_uuid: UUID,
-) -> None:
+) -> dict:
     """Bronze → silver → gold, bracketed by a per-source advisory lock and
     a transaction-ledger row (start → update → finish) with log capture.
 
     Opens its own SQLAlchemy session — must not reuse a request-scoped session
     since this runs in a FastAPI BackgroundTask after the response has been sent.
+
+    Returns {status, source_uuid, bronze_file_path, silver_file_path,
+    course_count, error}; status is "success", "failed" or "busy".
     """
     logger.info(
         "course_fetch: provider=%s source=%s version=%s",
@@ -92,6 +119,15 @@ def run_course_fetch(
     )
     minio_client = get_minio_client()
 
+    result: dict = {
+        "status": "failed",
+        "source_uuid": str(source_uuid),
+        "bronze_file_path": None,
+        "silver_file_path": None,
+        "course_count": 0,
+        "error": None,
+    }
+
     with SessionLocal() as db, requests.Session() as http:
         with advisory_lock(db, NS_COURSE_FETCH, str(source_uuid)) as acquired:
             if not acquired:
@@ -99,7 +135,9 @@ def run_course_fetch(
                     "course_fetch: source %s already being processed — skipping",
                     source_uuid,
                 )
-                return
+                result["status"] = "busy"
+                result["error"] = "source already being processed"
+                return result
 
             started = start_transaction(db, provider_uuid, source_version_uuid, source_uuid)
             trans_uuid = started[0] if started else None
@@ -119,18 +157,30 @@ def run_course_fetch(
                     )
                     if not bronze:
                         raise RuntimeError("bronze returned no result")
+                    result["bronze_file_path"] = bronze["file_path"]
                     if trans_uuid:
-                        update_transaction(db, trans_uuid, bronze_file_path=bronze["file_path"])
+                        update_transaction(
+                            db, trans_uuid,
+                            bronze_file_path=bronze["file_path"],
+                            bronze_encoding=bronze["file_encoding"],
+                        )
 
-                    courses = enrich_silver(db, minio_client, http, bronze)
-                    if courses is None:
+                    silver = enrich_silver(
+                        db, minio_client, http, bronze,
+                        snapshot_path=f"{file_path_stem}_silver.nt",
+                    )
+                    if silver is None:
                         raise RuntimeError("silver returned no result")
+                    result["course_count"] = len(silver.courses)
+                    result["silver_file_path"] = silver.snapshot_path
                     if trans_uuid:
                         update_transaction(
-                            db, trans_uuid, course_count=len(courses),
+                            db, trans_uuid,
+                            course_count=len(silver.courses),
+                            silver_file_path=silver.snapshot_path,
                         )
 
-                    index_gold(http, courses)
+                    index_gold(http, silver.courses, db=db, source_uuid=str(source_uuid))
                     status_val = "success"
                 except Exception as e:
                     error_message = f"{type(e).__name__}: {e}"
@@ -149,8 +199,70 @@ def run_course_fetch(
                     log_file_path=log_path,
                 )
 
+            result["status"] = status_val
+            result["error"] = error_message
+
+    return result
+
 
-def run_silver_only(source_uuid: UUID) -> dict:
+def _source_host(source: Dict[str, Any]) -> str:
+    return (urlparse(source.get("source_path") or "").hostname or "").lower()
+
+
+def run_provider_fetch(
+    provider_uuid: UUID,
+    source_version_uuid: UUID,
+    sources: List[Dict[str, Any]],
+    *,
+    jobs: int = COURSE_FETCH_JOBS,
+    per_host: int = COURSE_FETCH_PER_HOST,
+    on_source: Optional[Callable[[Dict[str, Any], dict], None]] = None,
+) -> List[dict]:
+    """Run `run_course_fetch` for several sources of one provider version
+    concurrently: at most `jobs` at once, and at most `per_host` against
+    the same `source_path` host, so one institution's server is not hit by
+    every faculty's source at the same time.
+
+    `sources` are dicts with `source_uuid` and `source_path` (as listed by
+    `get_provider`). Returns the per-source results in `sources` order;
+    `on_source(source, result)` is called as each one finishes.
+    """
+    host_slots: Dict[str, threading.Semaphore] = {}
+    for source in sources:
+        host_slots.setdefault(_source_host(source), threading.Semaphore(max(1, per_host)))
+
+    def _fetch(source: Dict[str, Any]) -> dict:
+        with host_slots[_source_host(source)]:
+            try:
+                res = run_course_fetch(provider_uuid, source_version_uuid, UUID(source["source_uuid"]))
+            except Exception as e:
+                logger.exception("course_fetch: source %s failed", source["source_uuid"])
+                res = {
+                    "status": "failed",
+                    "source_uuid": source["source_uuid"],
+                    "course_count": 0,
+                    "error": f"{type(e).__name__}: {e}",
+                }
+        if on_source:
+            on_source(source, res)
+        return res
+
+    logger.info(
+        "provider_fetch: provider=%s version=%s — %s source(s), %s job(s), %s per host",
+        provider_uuid, source_version_uuid, len(sources), jobs, per_host,
+    )
+    with ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix="course_fetch") as pool:
+        results = list(pool.map(_fetch, sources))
+
+    succeeded = sum(1 for r in results if r["status"] == "success")
+    logger.info(
+        "provider_fetch: provider=%s — %s/%s source(s) succeeded, %s course(s)",
+        provider_uuid, succeeded, len(results), sum(r.get("course_count") or 0 for r in results),
+    )
+    return results
+
+
+def run_silver_only(source_uuid: UUID, *, from_snapshot: bool = False) -> dict:
     """Re-run the silver stage for a source using its most recent bronze file.
 
     Mirrors `run_course_fetch`'s orchestration (advisory lock, transaction
@@ -158,10 +270,17 @@ def run_silver_only(source_uuid: UUID) -> dict:
     `bronze_file_path` is set to the reused MinIO path so the ledger tells you
     exactly which file silver ran on.
 
+    With `from_snapshot`, the most recent silver snapshot is pushed as is —
+    no bronze download, parsing or enrichment — and recorded as the run's
+    `silver_file_path`. Otherwise silver writes a fresh snapshot.
+
     Returns {status, source_uuid, provider_uuid, source_version_uuid,
-    bronze_file_path, course_count, error}.
+    bronze_file_path, silver_file_path, course_count, error}.
     """
-    logger.info("course_fetch (silver-only): source=%s", source_uuid)
+    logger.info(
+        "course_fetch (silver-only%s): source=%s",
+        ", from snapshot" if from_snapshot else "", source_uuid,
+    )
     minio_client = get_minio_client()
 
     result: dict = {
@@ -170,14 +289,21 @@ def run_silver_only(source_uuid: UUID) -> dict:
         "provider_uuid": None,
         "source_version_uuid": None,
         "bronze_file_path": None,
+        "silver_file_path": None,
         "course_count": 0,
         "error": None,
     }
 
     with SessionLocal() as db, requests.Session() as http:
-        message = latest_bronze_for_source(db, source_uuid)
+        if from_snapshot:
+            message = latest_silver_for_source(db, source_uuid)
+        else:
+            message = latest_bronze_for_source(db, source_uuid)
         if not message:
-            result["error"] = "no bronze file on record for this source"
+            result["error"] = (
+                "no silver snapshot on record for this source" if from_snapshot
+                else "no bronze file on record for this source"
+            )
             logger.warning("course_fetch (silver-only): %s", result["error"])
             return result
 
@@ -210,16 +336,29 @@ def run_silver_only(source_uuid: UUID) -> dict:
                 try:
                     if trans_uuid:
                         update_transaction(
-                            db, trans_uuid, bronze_file_path=message["file_path"],
+                            db, trans_uuid,
+                            bronze_file_path=message["file_path"],
+                            bronze_encoding=message["file_encoding"],
                         )
 
-                    courses = enrich_silver(db, minio_client, http, message)
-                    if courses is None:
+                    if from_snapshot:
+                        silver = push_silver_snapshot(db, minio_client, http, message)
+                    else:
+                        silver = enrich_silver(
+                            db, minio_client, http, message,
+                            snapshot_path=f"{file_path_stem}_silver.nt",
+                        )
+                    if silver is None:
                         raise RuntimeError("silver returned no result")
 
-                    result["course_count"] = len(courses)
+                    result["course_count"] = len(silver.courses)
+                    result["silver_file_path"] = silver.snapshot_path
                     if trans_uuid:
-                        update_transaction(db, trans_uuid, course_count=len(courses))
+                        update_transaction(
+                            db, trans_uuid,
+                            course_count=len(silver.courses),
+                            silver_file_path=silver.snapshot_path,
+                        )
 
                     status_val = "success"
                 except Exception as e:
@@ -0,0 +1,218 @@
+"""Bulk rebuild of the Fuseki courses graph from the datalake.
+
+For disaster recovery: every source's latest silver snapshot (or, without
+one, its latest bronze file, enriched again) is turned into N-Quads for the
+courses graph, in parallel across a process pool. The quads are written as
+one stream — to a file for `tdb2.tdbloader`, or into a shadow graph with a
+single Graph Store request that is then MOVEd over the courses graph.
+"""
+import gzip
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import requests
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import GRAPH_COURSES, MINIO_BUCKET_NAME
+from dependencies import get_minio_client
+from services import compression, fuseki
+
+from .bronze import latest_bronze_for_source, latest_silver_for_source, list_sources_with_bronze
+from .silver import _course_blocks, _enrich_rdf_graph, _fetch_same_as_map, iter_snapshot
+
+logger = logging.getLogger(__name__)
+
+GRAPH_COURSES_SHADOW = f"{GRAPH_COURSES}/shadow"
+
+OWL_SAME_AS = "http://www.w3.org/2002/07/owl#sameAs"
+
+
+@dataclass
+class SourceRebuild:
+    source_uuid: str
+    origin: str = ""                 # "snapshot" or "bronze"
+    file_path: Optional[str] = None
+    course_count: int = 0
+    quads: bytes = b""
+    error: Optional[str] = None
+
+
+@dataclass
+class RebuildStats:
+    sources: List[SourceRebuild] = field(default_factory=list)
+    quads: int = 0
+    loaded: bool = False
+
+    @property
+    def failed(self) -> List[SourceRebuild]:
+        return [s for s in self.sources if s.error]
+
+
+def rebuild_targets(db: Session, *, from_bronze: bool = False) -> List[Dict[str, Any]]:
+    """Silver-input message per source with a bronze file: the latest
+    snapshot's when there is one (unless `from_bronze`), else the latest
+    bronze file's, with `provider_uri` resolved for enrichment. Ordered by
+    source UUID, so rebuild output is deterministic."""
+    targets = []
+    provider_uris: Dict[str, Optional[str]] = {}
+    for source in sorted(list_sources_with_bronze(db), key=lambda s: s["source_uuid"]):
+        message = None if from_bronze else latest_silver_for_source(db, source["source_uuid"])
+        if message is None:
+            message = latest_bronze_for_source(db, source["source_uuid"])
+        if message is None:
+            continue
+        provider_uuid = message["provider_uuid"]
+        if provider_uuid not in provider_uris:
+            row = db.execute(
+                text("SELECT base_id FROM provider WHERE provider_uuid = :uuid"),
+                {"uuid": provider_uuid},
+            ).fetchone()
+            provider_uris[provider_uuid] = (
+                f"https://data.deqar.eu/institution/{row[0]}" if row and row[0] else None
+            )
+        message["provider_uri"] = provider_uris[provider_uuid]
+        targets.append(message)
+    return targets
+
+
+def _source_quads(
+    message: Dict[str, Any], *, graph_uri: str, same_as_map: Dict[str, str],
+) -> SourceRebuild:
+    """N-Quads for one source's courses, from its snapshot or bronze file.
+    Runs in a pool worker and touches MinIO only."""
+    result = SourceRebuild(source_uuid=message["source_uuid"])
+    snapshot_path = message.get("silver_file_path")
+    try:
+        minio_client = get_minio_client()
+        if snapshot_path:
+            result.origin, result.file_path = "snapshot", snapshot_path
+            response = minio_client.get_object(MINIO_BUCKET_NAME, snapshot_path)
+            try:
+                blocks = list(iter_snapshot(compression.open_decompressed(
+                    response, compression.encoding_from_path(snapshot_path),
+                )))
+            finally:
+                response.close()
+                response.release_conn()
+        else:
+            file_path = message["file_path"]
+            result.origin, result.file_path = "bronze", file_path
+            response = minio_client.get_object(MINIO_BUCKET_NAME, file_path)
+            try:
+                courses, graph = _enrich_rdf_graph(
+                    compression.open_decompressed(response, message.get("file_encoding")),
+                    message.get("file_format") or "turtle",
+                    message["provider_uuid"], message.get("provider_uri"), same_as_map,
+                )
+            finally:
+                response.close()
+                response.release_conn()
+            if graph is None:
+                result.error = "enrichment failed"
+                return result
+            blocks = _course_blocks(graph, courses)
+
+        lines: List[bytes] = []
+        for course, nt in blocks:
+            lines.extend(fuseki.ntriples_to_nquads(nt, graph_uri))
+            # The urn:uuid alias `replace_subject_in_graph` adds on push.
+            lines.append(
+                f"<urn:uuid:{course['uuid']}> <{OWL_SAME_AS}> <{course['uri']}> <{graph_uri}> .\n"
+                .encode("utf-8")
+            )
+        result.course_count = len(blocks)
+        result.quads = b"".join(lines)
+    except Exception as e:
+        logger.exception("Rebuild of source %s failed", result.source_uuid)
+        result.error = f"{type(e).__name__}: {e}"
+    return result
+
+
+def rebuild_courses_graph(
+    db: Session,
+    *,
+    jobs: int = 4,
+    output: Optional[Path] = None,
+    from_bronze: bool = False,
+    partial_ok: bool = False,
+    on_source: Optional[Callable[[SourceRebuild, int, int], None]] = None,
+) -> RebuildStats:
+    """Rebuild the courses graph from MinIO.
+
+    With `output`, N-Quads for the courses graph are written to that file
+    (gzipped if it ends in `.gz`) for `tdb2.tdbloader` and Fuseki is not
+    touched. Otherwise they are POSTed in one request into a shadow graph,
+    which replaces the courses graph with a MOVE — unless a source failed
+    and `partial_ok` is not set, in which case the shadow is dropped and
+    the live graph left as it was. `on_source(result, done, total)` is
+    called as each source finishes.
+    """
+    stats = RebuildStats()
+    targets = rebuild_targets(db, from_bronze=from_bronze)
+    if not targets:
+        return stats
+
+    same_as_map: Dict[str, str] = {}
+    if any(not t.get("silver_file_path") for t in targets):
+        with requests.Session() as http:
+            same_as_map = _fetch_same_as_map(http)
+
+    graph_uri = GRAPH_COURSES if output else GRAPH_COURSES_SHADOW
+    worker = partial(_source_quads, graph_uri=graph_uri, same_as_map=same_as_map)
+
+    def _stream() -> Iterator[bytes]:
+        # map() keeps submission order, so the stream is ordered by source.
+        # Spawned rather than forked, as in silver: a rebuild started from an
+        # API thread must not fork while another thread holds a lock.
+        spawn = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max(1, jobs), mp_context=spawn) as pool:
+            for done, result in enumerate(pool.map(worker, targets), 1):
+                stats.sources.append(result)
+                if on_source:
+                    on_source(result, done, len(targets))
+                if result.error:
+                    continue
+                stats.quads += result.quads.count(b"\n")
+                yield result.quads
+                result.quads = b""
+
+    if output is not None:
+        opener = gzip.open if output.suffix == ".gz" else open
+        with opener(output, "wb") as fh:
+            for chunk in _stream():
+                fh.write(chunk)
+        logger.info("Rebuild: wrote %s quads to %s", stats.quads, output)
+        return stats
+
+    if not fuseki.drop_graph(GRAPH_COURSES_SHADOW):
+        raise RuntimeError("could not clear the shadow courses graph")
+    try:
+        stored = fuseki.store_dataset(_stream())
+    except BaseException:
+        # A dead worker or a dropped connection mid-POST leaves the shadow
+        # half loaded; clear it (best effort) before the error goes up.
+        try:
+            fuseki.drop_graph(GRAPH_COURSES_SHADOW)
+        except requests.RequestException as e:
+            logger.warning("Rebuild: could not drop the shadow courses graph: %s", e)
+        raise
+    if not stored:
+        fuseki.drop_graph(GRAPH_COURSES_SHADOW)
+        raise RuntimeError("loading the rebuilt courses graph into Fuseki failed")
+
+    if stats.failed and not partial_ok:
+        logger.error(
+            "Rebuild: %s source(s) failed — courses graph left unchanged", len(stats.failed),
+        )
+        fuseki.drop_graph(GRAPH_COURSES_SHADOW)
+        return stats
+
+    stats.loaded = fuseki.move_graph(GRAPH_COURSES_SHADOW, GRAPH_COURSES)
+    logger.info("Rebuild: loaded %s quads, courses graph %s", stats.quads, "swapped" if stats.loaded else "NOT swapped")
+    return stats
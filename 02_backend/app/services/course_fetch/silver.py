@@ -1,7 +1,13 @@
+import io
 import logging
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Tuple
+from functools import partial
+from io import BytesIO
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 import uuid
 
 import requests
@@ -11,8 +17,15 @@ from rdflib.namespace import DCTERMS, OWL, XSD
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
-from config import MINIO_BUCKET_NAME, GRAPH_COURSES, GRAPH_REFERENCE
-from services import fuseki
+from config import (
+    MINIO_BUCKET_NAME,
+    GRAPH_COURSES,
+    GRAPH_REFERENCE,
+    SILVER_PARALLEL_JOBS,
+    SILVER_PARALLEL_MIN_TRIPLES,
+)
+from services import compression, fuseki
+from services.courses import invalidate_course_documents, register_courses
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +34,15 @@ ELM = Namespace("http://data.europa.eu/snb/model/elm/")
 
 DEFAULT_TYPE = URIRef("http://data.europa.eu/snb/learning-opportunity/05053c1cbe")
 
+LOS_TYPES = (QL.LearningOpportunitySpecification, ELM.Qualification, ELM.LearningAchievementSpecification)
+LOI_TYPES = (QL.LearningOpportunityInstance, ELM.LearningOpportunity)
+
+# First line of each course block in a silver snapshot.
+SNAPSHOT_HEADER = "# course"
+
+# Courses replaced per SPARQL Update request.
+PUSH_BATCH_SIZE = 50
+
 def _has_type(graph: Graph, subject, *types) -> bool:
     """
     Checks if subject has any of a given list of RDF types (classes)
@@ -85,134 +107,351 @@ WHERE {{
     return {b["uriA"]["value"]: b["uriB"]["value"] for b in bindings}
 
 
+def _parse_rdf_graph(file_content: Union[bytes, BinaryIO], file_format: str) -> Graph:
+    """Parse a bronze file; `file_content` may be a readable binary stream,
+    which is parsed as it is read."""
+    graph = Graph()
+    if isinstance(file_content, bytes):
+        graph.parse(data=file_content, format=file_format)
+    else:
+        graph.parse(source=file_content, format=file_format)
+    graph.bind("ql", QL)
+    graph.bind("elm", ELM)
+    graph.bind("dcterms", DCTERMS)
+    graph.bind("owl", OWL)
+    return graph
+
+
 def _enrich_rdf_graph(
-    file_content: bytes, file_format: str,
+    file_content: Union[bytes, BinaryIO], file_format: str,
     provider_uuid: str, provider_uri: Optional[str],
     same_as_map: Dict[str, str],
 ) -> Tuple[List[Dict[str, str]], Optional[Graph]]:
     """Parse, enrich in place, return (courses, graph) where each course is a
-    {"uuid": str, "uri": str} dict."""
+    {"uuid": str, "uri": str} dict. `file_content` may be a readable binary
+    stream, which is parsed as it is read."""
 
     try:
-        graph = Graph()
-        graph.parse(data=file_content, format=file_format)
-        graph.bind("ql", QL)
-        graph.bind("elm", ELM)
-        graph.bind("dcterms", DCTERMS)
-        graph.bind("owl", OWL)
-
-        now = datetime.now(timezone.utc)
-        today = now.date()
-
-        courses: Dict[str, str] = {}
-        owl_same_as: list[tuple] = []
-        loi_subjects: list[URIRef] = []
-        los_subjects: list[URIRef] = []
-
-        # first iteration: identify LOS and LOIs in graph, create missing UUIDs
-        for subject in graph.subjects(unique=True):
-            if not isinstance(subject, URIRef):
-                continue
-
-            if _has_type(graph, subject, QL.LearningOpportunitySpecification,
-                         ELM.Qualification, ELM.LearningAchievementSpecification):
-
-                los_subjects.append(subject)
-
-                # add metadata
-                graph.add((subject, QL.ingestedDate, Literal(today, datatype=XSD.date)))
-                graph.add((subject, QL.ingestedAt, Literal(now, datatype=XSD.dateTime)))
-
-                # determined course UUID
-                course_uuid = None
-                if course_uuid := _is_uuid(subject):
-                    # URI is a urn:uuid: one
-                    pass
-                else:
-                    # check if UUID already in graph
-                    for uuid_node in graph.subjects(OWL.sameAs, subject):
-                        if course_uuid := _is_uuid(uuid_node):
-                            break
-                    if not course_uuid:
-                        # generate a UUID if it does not already exist
-                        course_uuid = uuid.uuid5(uuid.NAMESPACE_URL, str(subject))
-                        owl_same_as.append((URIRef(f"urn:uuid:{course_uuid}"), OWL.sameAs, subject))
-                courses[str(course_uuid)] = str(subject)
-
-            elif _has_type(graph, subject, QL.LearningOpportunityInstance, ELM.LearningOpportunity):
-                loi_subjects.append(subject)
-
-        for triple in owl_same_as:
-            graph.add(triple)
-
-        for loi in loi_subjects:
-            if (loi, ELM.providedBy, None) not in graph and provider_uri:
-                graph.add((loi, ELM.providedBy, URIRef(provider_uri)))
-            if same_as_map:
-                for prov in list(graph.objects(loi, ELM.providedBy)):
-                    if isinstance(prov, URIRef) and str(prov) in same_as_map:
-                        graph.remove((loi, ELM.providedBy, prov))
-                        graph.add((loi, ELM.providedBy, URIRef(same_as_map[str(prov)])))
-
-        for los_uri in los_subjects:
-            # set default values
-            if (los_uri, QL.isActive, None) not in graph:
-                graph.add((los_uri, QL.isActive, Literal(True)))
-
-            if (los_uri, DCTERMS.type, None) not in graph:
-                graph.add((los_uri, DCTERMS.type, DEFAULT_TYPE))
-
-            if (los_uri, QL.sourceType, None) not in graph:
-                graph.add((los_uri, QL.sourceType, QL.ELMSource))
-
-            # convert ECTS credits to xsd:double
-            if (los_uri, ELM.creditPoint, None) in graph:
-                for creditPoint in graph.objects(los_uri, ELM.creditPoint):
-                    for point in graph.objects(creditPoint, ELM.point):
-                        if isinstance(point, Literal):
-                            if point.datatype != XSD.double:
-                                graph.remove((creditPoint, ELM.point, point))
-                                try:
-                                    newpoint = Literal(float(point), datatype=XSD.double)
-                                    graph.add((creditPoint, ELM.point, newpoint))
-                                except ValueError:
-                                    logger.warning(f"{los_uri} has an invalid credit point value: {point}")
-                        else:
-                            logger.warning(f"{los_uri} has a credit point value that is not a Literal, cannot convert.")
-
-            # resolve provider aliases to canonical URI
-            if same_as_map:
-                for pub in list(graph.objects(los_uri, DCTERMS.publisher)):
-                    if isinstance(pub, URIRef) and str(pub) in same_as_map:
-                        graph.remove((los_uri, DCTERMS.publisher, pub))
-                        graph.add((los_uri, DCTERMS.publisher, URIRef(same_as_map[str(pub)])))
-
-            # infer publisher from instances if unset
-            if (los_uri, DCTERMS.publisher, None) not in graph:
-                loi_providers = set()
-                for loi in graph.subjects(ELM.learningAchievementSpecification, los_uri):
-                    for p in graph.objects(loi, ELM.providedBy):
-                        loi_providers.add(p)
-                if loi_providers:
-                    for p in loi_providers:
-                        canonical = URIRef(same_as_map[str(p)]) if same_as_map and str(p) in same_as_map else p
-                        graph.add((los_uri, DCTERMS.publisher, canonical))
-                elif provider_uri:
-                    graph.add((los_uri, DCTERMS.publisher, URIRef(provider_uri)))
-
-            # create statements from LOS -> LOI
+        graph = _parse_rdf_graph(file_content, file_format)
+        return _enrich_graph(graph, provider_uri, same_as_map), graph
+    except Exception as e:
+        logger.exception("RDF enrichment failed: %s", e)
+        return [], None
+
+
+def _enrich_graph(
+    graph: Graph, provider_uri: Optional[str], same_as_map: Dict[str, str],
+    *, now: Optional[datetime] = None,
+) -> List[Dict[str, str]]:
+    """Enrich a parsed graph in place and return its courses. `now` is the
+    ingestion timestamp, shared by all partitions of one source."""
+    now = now or datetime.now(timezone.utc)
+    today = now.date()
+
+    courses: Dict[str, str] = {}
+    owl_same_as: list[tuple] = []
+    loi_subjects: list[URIRef] = []
+    los_subjects: list[URIRef] = []
+
+    # first iteration: identify LOS and LOIs in graph, create missing UUIDs
+    for subject in graph.subjects(unique=True):
+        if not isinstance(subject, URIRef):
+            continue
+
+        if _has_type(graph, subject, *LOS_TYPES):
+
+            los_subjects.append(subject)
+
+            # add metadata
+            graph.add((subject, QL.ingestedDate, Literal(today, datatype=XSD.date)))
+            graph.add((subject, QL.ingestedAt, Literal(now, datatype=XSD.dateTime)))
+
+            # determined course UUID
+            course_uuid = None
+            if course_uuid := _is_uuid(subject):
+                # URI is a urn:uuid: one
+                pass
+            else:
+                # check if UUID already in graph
+                for uuid_node in graph.subjects(OWL.sameAs, subject):
+                    if course_uuid := _is_uuid(uuid_node):
+                        break
+                if not course_uuid:
+                    # generate a UUID if it does not already exist
+                    course_uuid = uuid.uuid5(uuid.NAMESPACE_URL, str(subject))
+                    owl_same_as.append((URIRef(f"urn:uuid:{course_uuid}"), OWL.sameAs, subject))
+            courses[str(course_uuid)] = str(subject)
+
+        elif _has_type(graph, subject, *LOI_TYPES):
+            loi_subjects.append(subject)
+
+    for triple in owl_same_as:
+        graph.add(triple)
+
+    for loi in loi_subjects:
+        if (loi, ELM.providedBy, None) not in graph and provider_uri:
+            graph.add((loi, ELM.providedBy, URIRef(provider_uri)))
+        if same_as_map:
+            for prov in list(graph.objects(loi, ELM.providedBy)):
+                if isinstance(prov, URIRef) and str(prov) in same_as_map:
+                    graph.remove((loi, ELM.providedBy, prov))
+                    graph.add((loi, ELM.providedBy, URIRef(same_as_map[str(prov)])))
+
+    for los_uri in los_subjects:
+        # set default values
+        if (los_uri, QL.isActive, None) not in graph:
+            graph.add((los_uri, QL.isActive, Literal(True)))
+
+        if (los_uri, DCTERMS.type, None) not in graph:
+            graph.add((los_uri, DCTERMS.type, DEFAULT_TYPE))
+
+        if (los_uri, QL.sourceType, None) not in graph:
+            graph.add((los_uri, QL.sourceType, QL.ELMSource))
+
+        # convert ECTS credits to xsd:double
+        if (los_uri, ELM.creditPoint, None) in graph:
+            for creditPoint in graph.objects(los_uri, ELM.creditPoint):
+                for point in graph.objects(creditPoint, ELM.point):
+                    if isinstance(point, Literal):
+                        if point.datatype != XSD.double:
+                            graph.remove((creditPoint, ELM.point, point))
+                            try:
+                                newpoint = Literal(float(point), datatype=XSD.double)
+                                graph.add((creditPoint, ELM.point, newpoint))
+                            except ValueError:
+                                logger.warning(f"{los_uri} has an invalid credit point value: {point}")
+                    else:
+                        logger.warning(f"{los_uri} has a credit point value that is not a Literal, cannot convert.")
+
+        # resolve provider aliases to canonical URI
+        if same_as_map:
+            for pub in list(graph.objects(los_uri, DCTERMS.publisher)):
+                if isinstance(pub, URIRef) and str(pub) in same_as_map:
+                    graph.remove((los_uri, DCTERMS.publisher, pub))
+                    graph.add((los_uri, DCTERMS.publisher, URIRef(same_as_map[str(pub)])))
+
+        # infer publisher from instances if unset
+        if (los_uri, DCTERMS.publisher, None) not in graph:
+            loi_providers = set()
             for loi in graph.subjects(ELM.learningAchievementSpecification, los_uri):
-                graph.add((los_uri, ELM.learningOpportunity, loi))
+                for p in graph.objects(loi, ELM.providedBy):
+                    loi_providers.add(p)
+            if loi_providers:
+                for p in loi_providers:
+                    canonical = URIRef(same_as_map[str(p)]) if same_as_map and str(p) in same_as_map else p
+                    graph.add((los_uri, DCTERMS.publisher, canonical))
+            elif provider_uri:
+                graph.add((los_uri, DCTERMS.publisher, URIRef(provider_uri)))
+
+        # create statements from LOS -> LOI
+        for loi in graph.subjects(ELM.learningAchievementSpecification, los_uri):
+            graph.add((los_uri, ELM.learningOpportunity, loi))
+
+    logger.info(
+        "Enriched: %s LOS, %s LOI, %s courses, %s triples",
+        len(los_subjects), len(loi_subjects), len(courses), len(graph),
+    )
+    return [{"uuid": u, "uri": uri} for u, uri in courses.items()]
+
+
+@dataclass
+class SilverResult:
+    courses: List[Dict[str, str]]
+    # MinIO key of the enriched snapshot, None if none was written
+    snapshot_path: Optional[str] = None
+
+
+def _course_blocks(graph: Graph, courses: List[Dict[str, str]]) -> List[Tuple[Dict[str, str], str]]:
+    """(course, sorted N-Triples of its subgraph) per course, ordered by UUID."""
+    blocks = []
+    for course in sorted(courses, key=lambda c: c["uuid"]):
+        nt = _extract_subgraph(graph, URIRef(course["uri"])).serialize(format="nt")
+        lines = sorted(line for line in nt.splitlines() if line.strip())
+        blocks.append((course, "\n".join(lines) + "\n" if lines else ""))
+    return blocks
+
+
+def _push_courses(
+    session: requests.Session, blocks: Iterable[Tuple[Dict[str, str], str]],
+) -> Tuple[int, int]:
+    """Replace each course's subgraph in the courses graph, in batched
+    updates. Returns (succeeded, failed)."""
+    return fuseki.replace_subjects_in_graph(
+        GRAPH_COURSES,
+        ((course["uri"], nt, f"urn:uuid:{course['uuid']}") for course, nt in blocks),
+        alias_replace=True,
+        batch_size=PUSH_BATCH_SIZE,
+        session=session,
+    )
 
-        logger.info(
-            "Enriched: %s LOS, %s LOI, %s courses, %s triples",
-            len(los_subjects), len(loi_subjects), len(courses), len(graph),
-        )
-        return [{"uuid": u, "uri": uri} for u, uri in courses.items()], graph
 
+def _los_partition(graph: Graph, roots: Iterable[URIRef]) -> Graph:
+    """The part of `graph` that enriching and extracting `roots` reads: the
+    statements reachable from each root and, for every LOS reached, the
+    LOIs pointing at it (elm:learningAchievementSpecification) and its
+    urn:uuid aliases, closed over again. Enriching this partition yields the
+    same subgraphs for `roots` as enriching the whole graph."""
+    part = Graph()
+    visited: set = set()
+    expanded: set = set()
+    pending: List[Any] = list(roots)
+    while pending:
+        _collect(graph, part, pending.pop(), visited)
+        for node in visited - expanded:
+            expanded.add(node)
+            if isinstance(node, URIRef) and _has_type(graph, node, *LOS_TYPES):
+                pending.extend(graph.subjects(ELM.learningAchievementSpecification, node))
+                pending.extend(graph.subjects(OWL.sameAs, node))
+    return part
+
+
+def _partition_graph(graph: Graph, parts: int) -> List[Tuple[bytes, List[str]]]:
+    """Split a source graph into up to `parts` partitions by LOS closure.
+    Each is (N-Triples of the partition, URIs of the LOS it is responsible
+    for); every LOS belongs to exactly one partition, though statements
+    shared between LOS closures are copied into each."""
+    roots = sorted({s for t in LOS_TYPES for s in graph.subjects(RDF.type, t) if isinstance(s, URIRef)})
+    size = max(1, -(-len(roots) // max(1, parts)))
+    partitions = []
+    for i in range(0, len(roots), size):
+        chunk = roots[i:i + size]
+        nt = _los_partition(graph, chunk).serialize(format="nt", encoding="utf-8")
+        partitions.append((nt, [str(r) for r in chunk]))
+    return partitions
+
+
+def _enrich_partition(
+    partition: Tuple[bytes, List[str]], *,
+    provider_uri: Optional[str], same_as_map: Dict[str, str], now: datetime,
+) -> Tuple[List[Tuple[Dict[str, str], str]], int, int]:
+    """Pool worker: enrich one partition, then serialize and push the
+    courses it is responsible for. Returns (blocks, succeeded, failed)."""
+    nt, roots = partition
+    graph = Graph()
+    graph.parse(data=nt, format="nt")
+    courses = _enrich_graph(graph, provider_uri, same_as_map, now=now)
+    owned = set(roots)
+    blocks = _course_blocks(graph, [c for c in courses if c["uri"] in owned])
+    with requests.Session() as session:
+        succeeded, failed = _push_courses(session, blocks)
+    return blocks, succeeded, failed
+
+
+def _enrich_and_push_partitioned(
+    graph: Graph, provider_uri: Optional[str], same_as_map: Dict[str, str], jobs: int,
+) -> Tuple[List[Tuple[Dict[str, str], str]], int, int]:
+    """Enrich, serialize and push a large source graph across a process
+    pool, one LOS-closure partition per task. Blocks are merged back in
+    course UUID order, as `_course_blocks` returns them for the whole graph."""
+    partitions = _partition_graph(graph, jobs * 4)
+    worker = partial(
+        _enrich_partition,
+        provider_uri=provider_uri, same_as_map=same_as_map, now=datetime.now(timezone.utc),
+    )
+    blocks: List[Tuple[Dict[str, str], str]] = []
+    succeeded = failed = 0
+    # Spawned, not forked: this runs in request and fetch threads, and a
+    # fork can copy a lock another thread holds (the connection pool's,
+    # logging's) into the child for good.
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for part_blocks, part_succeeded, part_failed in pool.map(worker, partitions):
+            blocks.extend(part_blocks)
+            succeeded += part_succeeded
+            failed += part_failed
+    blocks.sort(key=lambda block: block[0]["uuid"])
+    logger.info(
+        "Enriched %s triples in %s partitions across %s workers: %s courses",
+        len(graph), len(partitions), jobs, len(blocks),
+    )
+    return blocks, succeeded, failed
+
+
+def _invalidate_documents(db: Session, blocks: List[Tuple[Dict[str, str], str]]) -> None:
+    """Drop cached course documents whose subgraph was changed by this push;
+    a failure only means gold or the detail endpoint reframes them."""
+    try:
+        dropped = invalidate_course_documents(db, blocks)
     except Exception as e:
-        logger.exception("RDF enrichment failed: %s", e)
-        return [], None
+        db.rollback()
+        logger.warning("Invalidating course documents failed: %s", e)
+        return
+    if dropped:
+        logger.info("Invalidated %s cached course document(s)", dropped)
+
+
+def _register_courses(
+    db: Session, provider_uuid: str, source_uuid: str, blocks: List[Tuple[Dict[str, str], str]],
+) -> None:
+    """Bring the source's rows in the course table in line with this push;
+    on failure, lookups of its new courses fall back to SPARQL."""
+    try:
+        upserted, deleted = register_courses(db, provider_uuid, source_uuid, blocks)
+    except Exception as e:
+        db.rollback()
+        logger.warning("Registering courses of source %s failed: %s", source_uuid, e)
+        return
+    logger.info("Course registry: %s course(s) registered, %s removed", upserted, deleted)
+
+
+def _write_snapshot(
+    minio_client: Minio, path: str, blocks: List[Tuple[Dict[str, str], str]],
+) -> Optional[str]:
+    """Store the enriched courses as one N-Triples file: per course, a
+    `# course <uuid> <uri>` line followed by its sorted triples. Compressed
+    like bronze files; returns the object key, or None if the write failed."""
+    body = "".join(
+        f"{SNAPSHOT_HEADER} {course['uuid']} {course['uri']}\n{nt}" for course, nt in blocks
+    ).encode("utf-8")
+    encoding = compression.bronze_encoding()
+    path = f"{path}{compression.SUFFIXES.get(encoding, '')}"
+    data = compression.compress(body, encoding)
+    try:
+        minio_client.put_object(
+            MINIO_BUCKET_NAME, path,
+            BytesIO(data), length=len(data),
+            content_type="application/n-triples",
+            metadata={"encoding": encoding} if encoding else None,
+        )
+    except Exception as e:
+        logger.warning("Writing silver snapshot %s failed: %s", path, e)
+        return None
+    logger.info("Silver snapshot: wrote %s (%s courses, %s bytes)", path, len(blocks), len(data))
+    return path
+
+
+def iter_snapshot(stream: BinaryIO) -> Iterator[Tuple[Dict[str, str], str]]:
+    """Read a silver snapshot back as (course, N-Triples) blocks."""
+    course: Optional[Dict[str, str]] = None
+    lines: List[str] = []
+    for raw in io.TextIOWrapper(stream, encoding="utf-8"):
+        line = raw.rstrip("\n")
+        if line.startswith(SNAPSHOT_HEADER + " "):
+            if course is not None:
+                yield course, "".join(lines)
+            _, _, course_uuid, course_uri = line.split(" ", 3)
+            course = {"uuid": course_uuid, "uri": course_uri}
+            lines = []
+        elif line.strip() and course is not None:
+            lines.append(line + "\n")
+    if course is not None:
+        yield course, "".join(lines)
+
+
+def _mark_pushed(db: Session, source_uuid: str, file_path: str) -> None:
+    filename = os.path.basename(file_path)
+    now = datetime.now(timezone.utc)
+    db.execute(
+        text("""
+            UPDATE source
+            SET last_file_pushed = :filename,
+                last_file_pushed_date = :ts,
+                last_file_pushed_path = :path,
+                updated_at = :ts
+            WHERE source_uuid = :source_uuid
+        """),
+        {"filename": filename, "ts": now, "path": file_path, "source_uuid": source_uuid},
+    )
+    db.commit()
 
 
 def enrich_silver(
@@ -220,27 +459,29 @@ def enrich_silver(
     minio_client: Minio,
     session: requests.Session,
     message: Dict[str, Any],
-) -> Optional[List[Dict[str, str]]]:
+    *,
+    snapshot_path: Optional[str] = None,
+    jobs: Optional[int] = None,
+) -> Optional[SilverResult]:
     """Download bronze file, enrich, push each subject to Fuseki, update source row.
 
-    Returns a list of {"uuid", "uri"} dicts for the courses produced, or None
-    on failure.
+    The bronze object is decompressed and parsed while it streams from MinIO.
+    With `snapshot_path`, the enriched courses are also written there (see
+    `_write_snapshot`) so `push_silver_snapshot` can repeat the push later
+    without parsing or enriching again.
+
+    Graphs of at least SILVER_PARALLEL_MIN_TRIPLES statements are split by
+    LOS closure and enriched and pushed across `jobs` worker processes
+    (default SILVER_PARALLEL_JOBS; 1 disables this).
+
+    Returns the courses produced (as {"uuid", "uri"} dicts) and the snapshot
+    key, or None on failure.
     """
     provider_uuid = message["provider_uuid"]
     source_uuid = message["source_uuid"]
     file_path = message["file_path"]
     file_format = message.get("file_format", "turtle")
-
-    try:
-        response = minio_client.get_object(MINIO_BUCKET_NAME, file_path)
-        try:
-            file_content = response.read()
-        finally:
-            response.close()
-            response.release_conn()
-    except Exception as e:
-        logger.error("Failed to download bronze file %s: %s", file_path, e)
-        return None
+    file_encoding = message.get("file_encoding") or compression.encoding_from_path(file_path)
 
     provider_uri: Optional[str] = None
     row = db.execute(
@@ -253,32 +494,77 @@ def enrich_silver(
     same_as_map = _fetch_same_as_map(session)
     logger.info("Loaded %s owl:sameAs mappings", len(same_as_map))
 
-    courses, enriched_graph = _enrich_rdf_graph(
-        file_content, file_format, provider_uuid, provider_uri, same_as_map
-    )
-    if enriched_graph is None:
+    try:
+        response = minio_client.get_object(MINIO_BUCKET_NAME, file_path)
+    except Exception as e:
+        logger.error("Failed to download bronze file %s: %s", file_path, e)
         return None
+    try:
+        graph = _parse_rdf_graph(compression.open_decompressed(response, file_encoding), file_format)
+    except Exception as e:
+        logger.exception("RDF parsing of %s failed: %s", file_path, e)
+        return None
+    finally:
+        response.close()
+        response.release_conn()
 
-    failed = 0
-    for course in courses:
-        subgraph_nt = _extract_subgraph(enriched_graph, URIRef(course['uri'])).serialize(format="nt")
-        if not fuseki.replace_subject_in_graph(GRAPH_COURSES, course['uri'], subgraph_nt, session=session, alias_uri=f"urn:uuid:{course['uuid']}", alias_replace=True):
-            failed += 1
-    logger.info("Pushed %s/%s LOS subjects to Fuseki courses graph", len(courses) - failed, len(courses))
+    jobs = SILVER_PARALLEL_JOBS if jobs is None else jobs
+    try:
+        if jobs > 1 and len(graph) >= SILVER_PARALLEL_MIN_TRIPLES:
+            blocks, succeeded, failed = _enrich_and_push_partitioned(graph, provider_uri, same_as_map, jobs)
+            courses = [course for course, _ in blocks]
+        else:
+            courses = _enrich_graph(graph, provider_uri, same_as_map)
+            blocks = _course_blocks(graph, courses)
+            succeeded, failed = _push_courses(session, blocks)
+    except Exception as e:
+        logger.exception("RDF enrichment failed: %s", e)
+        return None
+    logger.info("Pushed %s/%s LOS subjects to Fuseki courses graph", succeeded, len(courses))
+    _invalidate_documents(db, blocks)
+    _register_courses(db, provider_uuid, source_uuid, blocks)
 
-    filename = os.path.basename(file_path)
-    now = datetime.now(timezone.utc)
-    db.execute(
-        text("""
-            UPDATE source
-            SET last_file_pushed = :filename,
-                last_file_pushed_date = :ts,
-                last_file_pushed_path = :path,
-                updated_at = :ts
-            WHERE source_uuid = :source_uuid
-        """),
-        {"filename": filename, "ts": now, "path": file_path, "source_uuid": source_uuid},
+    written = _write_snapshot(minio_client, snapshot_path, blocks) if snapshot_path else None
+    _mark_pushed(db, source_uuid, file_path)
+
+    return SilverResult(courses=courses, snapshot_path=written)
+
+
+def push_silver_snapshot(
+    db: Session,
+    minio_client: Minio,
+    session: requests.Session,
+    message: Dict[str, Any],
+) -> Optional[SilverResult]:
+    """Push a previously written silver snapshot (`message["silver_file_path"]`)
+    to Fuseki, skipping download, parsing and enrichment of the bronze file.
+    The source row is updated as by `enrich_silver`, with the bronze file the
+    snapshot was made from."""
+    source_uuid = message["source_uuid"]
+    snapshot_path = message["silver_file_path"]
+
+    try:
+        response = minio_client.get_object(MINIO_BUCKET_NAME, snapshot_path)
+    except Exception as e:
+        logger.error("Failed to download silver snapshot %s: %s", snapshot_path, e)
+        return None
+    try:
+        blocks = list(iter_snapshot(
+            compression.open_decompressed(response, compression.encoding_from_path(snapshot_path))
+        ))
+    except Exception as e:
+        logger.error("Failed to read silver snapshot %s: %s", snapshot_path, e)
+        return None
+    finally:
+        response.close()
+        response.release_conn()
+
+    succeeded, failed = _push_courses(session, blocks)
+    logger.info(
+        "Pushed %s/%s LOS subjects from snapshot %s", succeeded, len(blocks), snapshot_path,
     )
-    db.commit()
+    _invalidate_documents(db, blocks)
+    _register_courses(db, message["provider_uuid"], source_uuid, blocks)
+    _mark_pushed(db, source_uuid, message["file_path"])
 
-    return courses
+    return SilverResult(courses=[course for course, _ in blocks], snapshot_path=snapshot_path)
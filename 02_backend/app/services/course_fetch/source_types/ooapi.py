@@ -8,6 +8,9 @@ from rdflib.namespace import DCTERMS, FOAF, OWL, SKOS, XSD
 
 import requests
 
+from services import concept_index
+from services.vocabulary import ISCED_F_SCHEME, language_tag_to_uri
+
 from .base import DataSourceType
 
 logger = logging.getLogger(__name__)
@@ -116,6 +119,14 @@ class OoapiDataSource(DataSourceType):
             return multilingual_field[0].get("value", "")
         return str(multilingual_field[0])
 
+    def _isced_field_uri(self, code: str) -> URIRef:
+        """ISCED-F concept for a field-of-study code, via the concept index;
+        codes the index does not know keep the URI built from the code."""
+        return (
+            concept_index.notation_to_uri(ISCED_F_SCHEME, code)
+            or URIRef(f"http://data.europa.eu/snb/isced-f/{code.strip()}")
+        )
+
     def map_course_to_rdf(self, course: Dict, graph: Graph, offerings: List):
         courseId = course.get("courseId")
         if not courseId:
@@ -181,25 +192,20 @@ class OoapiDataSource(DataSourceType):
             graph.add((course_uri, ELM.EQFLevel, self.LEVEL_MAP[course["level"]]))
 
         if course.get("teachingLanguage"):
-            lang_code = course.get("teachingLanguage")
-            if isinstance(lang_code, str):
-                graph.add((course_uri, DCTERMS.language, URIRef(
-                    f"http://publications.europa.eu/resource/authority/language/{lang_code.upper()}"
-                )))
+            if lang_uri := language_tag_to_uri(course.get("teachingLanguage")):
+                graph.add((course_uri, DCTERMS.language, lang_uri))
         elif course.get("languages"):
             for lang_code in course.get("languages"):
-                if isinstance(lang_code, str):
-                    graph.add((course_uri, DCTERMS.language, URIRef(
-                        f"http://publications.europa.eu/resource/authority/language/{lang_code.upper()}"
-                    )))
+                if lang_uri := language_tag_to_uri(lang_code):
+                    graph.add((course_uri, DCTERMS.language, lang_uri))
 
         if fields := course.get("fieldsOfStudy"):
             if isinstance(fields, list):
                 for field in fields:
                     if isinstance(field, str):
-                        graph.add((course_uri, ELM.ISCEDFCode, URIRef(f"http://data.europa.eu/snb/isced-f/{field}")))
+                        graph.add((course_uri, ELM.ISCEDFCode, self._isced_field_uri(field)))
             elif isinstance(fields, str):
-                graph.add((course_uri, ELM.ISCEDFCode, URIRef(f"http://data.europa.eu/snb/isced-f/{fields}")))
+                graph.add((course_uri, ELM.ISCEDFCode, self._isced_field_uri(fields)))
 
         if course.get("link"):
             web = BNode()
@@ -240,11 +246,8 @@ class OoapiDataSource(DataSourceType):
                     graph.add((offering_uri, DCTERMS.description, Literal(description, lang="en")))
 
             if offering.get("teachingLanguage"):
-                lang_code = offering.get("teachingLanguage")
-                if isinstance(lang_code, str):
-                    graph.add((offering_uri, DCTERMS.language, URIRef(
-                        f"http://publications.europa.eu/resource/authority/language/{lang_code.upper()}"
-                    )))
+                if lang_uri := language_tag_to_uri(offering.get("teachingLanguage")):
+                    graph.add((offering_uri, DCTERMS.language, lang_uri))
 
             if offering.get("startDate") or offering.get("endDate"):
                 temporal = BNode()
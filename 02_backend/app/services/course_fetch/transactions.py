@@ -3,7 +3,8 @@
 Each call to run_course_fetch creates one row via start_transaction,
 updates it via update_transaction as stages complete, and seals it via
 finish_transaction. The ledger is observability — errors here must not
-break the pipeline, so every function swallow-and-logs.
+break the pipeline, so every function swallow-and-logs. Starting and
+finishing a run also refresh the provider's `provider_summary` row.
 """
 import logging
 from typing import Optional, Tuple
@@ -12,6 +13,8 @@ from uuid import UUID
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from services.providers import refresh_provider_summary
+
 logger = logging.getLogger(__name__)
 
 
@@ -57,18 +60,22 @@ def start_transaction(
             },
         ).scalar()
         db.commit()
-        return trans_uuid, run_number
     except Exception as e:
         db.rollback()
         logger.warning("start_transaction failed: %s", e)
         return None
 
+    _refresh_summary(db, provider_uuid)
+    return trans_uuid, run_number
+
 
 def update_transaction(
     db: Session,
     trans_uuid: UUID,
     *,
     bronze_file_path: Optional[str] = None,
+    bronze_encoding: Optional[str] = None,
+    silver_file_path: Optional[str] = None,
     log_file_path: Optional[str] = None,
     course_count: Optional[int] = None,
 ) -> None:
@@ -76,6 +83,10 @@ def update_transaction(
     fields = {}
     if bronze_file_path is not None:
         fields["bronze_file_path"] = bronze_file_path
+    if bronze_encoding is not None:
+        fields["bronze_encoding"] = bronze_encoding
+    if silver_file_path is not None:
+        fields["silver_file_path"] = silver_file_path
     if log_file_path is not None:
         fields["log_file_path"] = log_file_path
     if course_count is not None:
@@ -109,7 +120,7 @@ def finish_transaction(
     optionally error_message / log_file_path.
     """
     try:
-        db.execute(
+        provider_uuid = db.execute(
             text("""
                 UPDATE transaction
                 SET status = :status,
@@ -117,6 +128,7 @@ def finish_transaction(
                     error_message = :err,
                     log_file_path = COALESCE(:lp, log_file_path)
                 WHERE trans_uuid = :t
+                RETURNING provider_uuid
             """),
             {
                 "status": status,
@@ -124,8 +136,21 @@ def finish_transaction(
                 "lp": log_file_path,
                 "t": str(trans_uuid),
             },
-        )
+        ).scalar()
         db.commit()
     except Exception as e:
         db.rollback()
         logger.warning("finish_transaction failed: %s", e)
+        return
+
+    if provider_uuid:
+        _refresh_summary(db, provider_uuid)
+
+
+def _refresh_summary(db: Session, provider_uuid: UUID) -> None:
+    try:
+        refresh_provider_summary(db, provider_uuid)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning("refresh_provider_summary failed: %s", e)
@@ -1,26 +1,32 @@
+import hashlib
 import json
+import logging
 from functools import lru_cache
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from uuid import UUID
 
 from fastapi import HTTPException, status
 from pyld import jsonld
+from rdflib import Graph, Literal
+from rdflib.compare import to_canonical_graph
 from rdflib.namespace import (
     OWL,
     RDF,
     RDFS,
     SKOS,
 )
+from rdflib.util import from_n3
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from config import (
     GRAPH_COURSES,
+    FRAMER,
     GRAPH_REFERENCE,
-    GRAPH_VOCABULARY,
     SCHEMA_DIR,
 )
-from services import fuseki
+from services import concept_index, framer, fuseki
+from services.vocabulary import LEARNING_OPPORTUNITY_SCHEME, vocabulary_from_clauses
 
 DCTERMS_NS = "http://purl.org/dc/terms/"
 RDF_NS = str(RDF)
@@ -30,8 +36,15 @@ SKOS_NS = str(SKOS)
 QL_NS = "http://data.quality-link.eu/ontology/v1#"
 ELM_NS = "http://data.europa.eu/snb/model/elm/"
 
+logger = logging.getLogger(__name__)
+
 FRAME_JSON_PATH = SCHEMA_DIR / "frame.json"
 
+# Set anew on every ingestion; left out of document and subgraph hashes so
+# that a re-fetch of unchanged data does not count as a change.
+VOLATILE_FIELDS = ("ingestedAt", "ingestedDate")
+VOLATILE_PREDICATES = tuple(f"<{QL_NS}{field}>" for field in VOLATILE_FIELDS)
+
 class CourseNotFound(Exception):
     """
     A course (specified as UUID or URI) could not be found.
@@ -43,10 +56,51 @@ def _frame_config() -> dict:
     with open(FRAME_JSON_PATH, "r") as f:
         return json.load(f)
 
-def resolve_course_uri(uuid: str) -> Optional[str]:
+def compile_frame() -> framer.Framer:
     """
-    Look up course URI based on UUID
+    Compile frame.json; raises framer.UnsupportedFrame if it uses JSON-LD
+    the compiled framer does not support.
     """
+    return framer.Framer(_frame_config())
+
+@lru_cache(maxsize=1)
+def _framer() -> Optional[framer.Framer]:
+    if FRAMER == "pyld":
+        return None
+    try:
+        return compile_frame()
+    except framer.UnsupportedFrame as e:
+        logger.warning("frame.json cannot be compiled (%s); framing with pyld", e)
+        return None
+
+def pyld_frame(nt: str) -> Dict[str, Any]:
+    return jsonld.frame(jsonld.from_rdf(nt, options={"useNativeTypes":True}), _frame_config())
+
+def frame_ntriples(nt: str) -> Dict[str, Any]:
+    """
+    Frame N-Triples with frame.json: with the compiled framer where it
+    supports the data, else with pyld. Both give the same document.
+    """
+    compiled = _framer()
+    if compiled is not None:
+        try:
+            return compiled.frame(nt)
+        except framer.UnsupportedFrame as e:
+            logger.debug("Compiled framer unsupported (%s); framing with pyld", e)
+    return pyld_frame(nt)
+
+def resolve_course_uri(uuid: str, db: Optional[Session] = None) -> Optional[str]:
+    """
+    Look up course URI based on UUID, in the course table if `db` is given
+    and the graph otherwise (or if the course is not registered)
+    """
+    if db is not None:
+        row = db.execute(
+            text("SELECT course_uri FROM course WHERE course_uuid = :uuid"),
+            {"uuid": str(uuid)},
+        ).fetchone()
+        if row:
+            return row[0]
 
     uri_query = f"""
 PREFIX rdf: <{RDF}>
@@ -74,7 +128,14 @@ WHERE {{
     return bindings[0]["learningOpportunity"]["value"]
 
 
-def resolve_course_uuid(uri: str) -> Optional[str]:
+def resolve_course_uuid(uri: str, db: Optional[Session] = None) -> Optional[str]:
+    if db is not None:
+        row = db.execute(
+            text("SELECT course_uuid FROM course WHERE course_uri = :uri"),
+            {"uri": uri},
+        ).fetchone()
+        if row:
+            return str(row[0])
 
     uuid_query = f"""
 PREFIX rdf: <{RDF}>
@@ -102,11 +163,11 @@ WHERE {{
     return bindings[0]["uuid"]["value"][len("urn:uuid:"):]
 
 
-def frame_course(course_uri: str) -> Optional[Dict[str, Any]]:
-
-    frame_config = _frame_config()
-    uploaded = 0
-    failed = 0
+def course_ntriples(course_uri: str) -> str:
+    """
+    N-Triples of everything reachable from a course, as framed into its
+    document.
+    """
 
     construct_query = f"""
 PREFIX rdf: <{RDF}>
@@ -115,7 +176,7 @@ PREFIX rdfs: <{RDFS}>
 CONSTRUCT {{ ?s ?p ?o . }}
 FROM <{GRAPH_COURSES}>
 FROM <{GRAPH_REFERENCE}>
-FROM <{GRAPH_VOCABULARY}>
+{vocabulary_from_clauses()}
 WHERE {{
   <{course_uri}> (<>|!<>)* ?s .
   ?s ?p ?o .
@@ -126,7 +187,11 @@ WHERE {{
     if not raw_nt:
         raise CourseNotFound("SPARQL query returned no data.")
 
-    return jsonld.frame(jsonld.from_rdf(raw_nt, options={"useNativeTypes":True}), frame_config)
+    return raw_nt
+
+
+def frame_course(course_uri: str) -> Optional[Dict[str, Any]]:
+    return frame_ntriples(course_ntriples(course_uri))
 
 
 def list_provider_courses(
@@ -134,10 +199,19 @@ def list_provider_courses(
     provider_uuid: UUID,
     limit: int = 50,
     offset: int = 0,
+    after: Optional[UUID] = None,
 ) -> Dict[str, Any]:
-    """List courses published by a provider (queried from the Fuseki courses graph)."""
+    """List courses of a provider's sources (from the course table), ordered
+    by UUID.
+
+    Pages by keyset when `after` is given: the courses following that UUID,
+    at the cost of the first page however deep. `next_cursor` is the `after`
+    of the next page, None on the last one. `offset` paging is still
+    supported. `total` is the provider's cached course count, counted
+    only if silver has not set it yet.
+    """
     row = db.execute(
-        text("SELECT base_id FROM provider WHERE provider_uuid = :uuid"),
+        text("SELECT base_id, course_count FROM provider WHERE provider_uuid = :uuid"),
         {"uuid": provider_uuid},
     ).fetchone()
     if not row:
@@ -145,71 +219,50 @@ def list_provider_courses(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Provider not found",
         )
-    if not row[0]:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail=f"Provider {provider_uuid} has no base_id; cannot resolve its RDF URI",
-        )
-    provider_uri = f"https://data.deqar.eu/institution/{row[0]}"
-
-    count_query = f"""
-PREFIX rdf: <{RDF_NS}>
-PREFIX ql:  <{QL_NS}>
-PREFIX elm: <{ELM_NS}>
-PREFIX dcterms: <{DCTERMS_NS}>
-
-SELECT (COUNT(DISTINCT ?los) AS ?n)
-FROM <{GRAPH_COURSES}>
-WHERE {{
-  VALUES ?t {{ ql:LearningOpportunitySpecification elm:Qualification elm:LearningAchievementSpecification }}
-  ?los rdf:type ?t ;
-       dcterms:publisher <{provider_uri}> .
-}}
-"""
-    count_bindings = fuseki.sparql_select(count_query)
-    total = int(count_bindings[0]["n"]["value"]) if count_bindings else 0
-
-    list_query = f"""
-PREFIX rdf: <{RDF_NS}>
-PREFIX owl: <{OWL_NS}>
-PREFIX dcterms: <{DCTERMS_NS}>
-PREFIX skos: <{SKOS_NS}>
-PREFIX ql:  <{QL_NS}>
-PREFIX elm: <{ELM_NS}>
-
-SELECT ?course_uuid ?los (SAMPLE(?typeLabel) AS ?type) (SAMPLE(?anyTitle) AS ?title) (COUNT(?loi) AS ?instances)
-FROM <{GRAPH_COURSES}>
-FROM <{GRAPH_VOCABULARY}>
-WHERE {{
-  VALUES ?class {{ ql:LearningOpportunitySpecification elm:Qualification elm:LearningAchievementSpecification }}
-  ?los rdf:type ?class ;
-       dcterms:publisher <{provider_uri}> .
-  ?uuid_node owl:sameAs ?los .
-  FILTER(STRSTARTS(STR(?uuid_node), "urn:uuid:"))
-  BIND(STRAFTER(STR(?uuid_node), "urn:uuid:") AS ?course_uuid)
-  OPTIONAL {{ ?los dcterms:title ?anyTitle . }}
-  OPTIONAL {{ ?los dcterms:type ?typeConcept . ?typeConcept skos:prefLabel ?typeLabel . }}
-  OPTIONAL {{ ?los elm:learningOpportunity ?loi . }}
-}}
-GROUP BY ?course_uuid ?los
-ORDER BY ?course_uuid
-LIMIT {int(limit)} OFFSET {int(offset)}
-"""
-    bindings = fuseki.sparql_select(list_query)
+    provider_uri = f"https://data.deqar.eu/institution/{row[0]}" if row[0] else None
+
+    total = row[1]
+    if total is None:
+        total = db.execute(
+            text("SELECT COUNT(*) FROM course WHERE provider_uuid = :uuid"),
+            {"uuid": provider_uuid},
+        ).scalar()
+
+    if after is not None:
+        offset = 0
+    rows = db.execute(
+        text("""
+            SELECT course_uuid, course_uri, type_uri, title, title_lang, instance_count
+            FROM course
+            WHERE provider_uuid = :uuid
+              AND (CAST(:after AS uuid) IS NULL OR course_uuid > CAST(:after AS uuid))
+            ORDER BY course_uuid
+            LIMIT :limit OFFSET :offset
+        """),
+        {
+            "uuid": provider_uuid,
+            "after": str(after) if after is not None else None,
+            "limit": int(limit),
+            "offset": int(offset),
+        },
+    ).fetchall()
 
     courses = []
-    for b in bindings:
-        type_iri = b.get("type", {}).get("value", "") or ""
-        type_label = type_iri.rsplit("#", 1)[-1].rsplit("/", 1)[-1] or None
-        title_binding = b.get("title") or {}
+    for r in rows:
+        type_iri = r[2] or ""
+        type_label = (
+            concept_index.pref_label(type_iri, LEARNING_OPPORTUNITY_SCHEME)
+            or type_iri.rsplit("#", 1)[-1].rsplit("/", 1)[-1]
+            or None
+        ) if type_iri else None
         courses.append({
-            "course_uuid": b.get("course_uuid", {}).get("value"),
-            "uri": b.get("los", {}).get("value"),
-            "instances": b.get("instances", {}).get("value"),
+            "course_uuid": str(r[0]),
+            "uri": r[1],
+            "instances": r[5],
             "type": type_label,
             "type_uri": type_iri or None,
-            "title": title_binding.get("value"),
-            "title_lang": title_binding.get("xml:lang"),
+            "title": r[3],
+            "title_lang": r[4],
         })
 
     return {
@@ -218,5 +271,253 @@ LIMIT {int(limit)} OFFSET {int(offset)}
         "provider_uri": provider_uri,
         "limit": limit,
         "offset": offset,
+        "next_cursor": courses[-1]["course_uuid"] if len(courses) == int(limit) else None,
     }
 
+
+def course_summary(course_uri: str, nt: str) -> Dict[str, Any]:
+    """
+    Registry fields of a course from its N-Triples block: first dcterms:type,
+    a title (English, else untagged, else the first), and its number of
+    instances.
+    """
+    subject = f"<{course_uri}> "
+    type_uri = None
+    titles: List[Literal] = []
+    instances = set()
+    for line in nt.splitlines():
+        if not line.startswith(subject):
+            continue
+        _, predicate, obj = line[:line.rindex(".")].strip().split(" ", 2)
+        if predicate == f"<{DCTERMS_NS}type>" and type_uri is None and obj.startswith("<"):
+            type_uri = obj[1:-1]
+        elif predicate == f"<{DCTERMS_NS}title>" and obj.startswith('"'):
+            titles.append(from_n3(obj))
+        elif predicate == f"<{ELM_NS}learningOpportunity>":
+            instances.add(obj)
+
+    title = None
+    for preferred in ("en", None):
+        title = next((t for t in titles if t.language == preferred), None)
+        if title is not None:
+            break
+    title = title if title is not None else next(iter(titles), None)
+    return {
+        "type_uri": type_uri,
+        "title": str(title) if title is not None else None,
+        "title_lang": title.language if title is not None else None,
+        "instance_count": len(instances),
+    }
+
+
+def register_courses(
+    db: Session,
+    provider_uuid: str,
+    source_uuid: str,
+    blocks: Iterable[Tuple[Dict[str, str], str]],
+) -> Tuple[int, int]:
+    """Upsert the courses silver pushed for a source into the course table,
+    and delete the source's rows for courses it no longer has. `blocks` are
+    all (course, N-Triples) pairs of the source. The cached course count of
+    every provider whose courses changed is refreshed. Returns (upserted,
+    deleted)."""
+    rows = [
+        {
+            "course_uuid": course["uuid"],
+            "course_uri": course["uri"],
+            "provider_uuid": str(provider_uuid),
+            "source_uuid": str(source_uuid),
+            "content_hash": course.get("subgraph_hash") or subgraph_hash(nt),
+            **course_summary(course["uri"], nt),
+        }
+        for course, nt in blocks
+    ]
+    ids = [r["course_uuid"] for r in rows]
+    # Providers that may lose courses here, besides the one gaining them.
+    providers = {str(provider_uuid)} | {
+        str(r[0]) for r in db.execute(
+            text("""
+                SELECT DISTINCT provider_uuid FROM course
+                WHERE source_uuid = :source_uuid OR course_uuid = ANY(CAST(:ids AS uuid[]))
+            """),
+            {"source_uuid": str(source_uuid), "ids": ids},
+        )
+    }
+    if rows:
+        # A course moving to another URI keeps its UUID; free the old URI first.
+        db.execute(
+            text("""
+                DELETE FROM course c
+                USING unnest(CAST(:ids AS uuid[]), CAST(:uris AS varchar[])) AS k(course_uuid, course_uri)
+                WHERE c.course_uri = k.course_uri AND c.course_uuid <> k.course_uuid
+            """),
+            {"ids": ids, "uris": [r["course_uri"] for r in rows]},
+        )
+        db.execute(
+            text("""
+                INSERT INTO course
+                    (course_uuid, course_uri, provider_uuid, source_uuid, type_uri,
+                     title, title_lang, instance_count, content_hash, last_seen_at)
+                VALUES
+                    (:course_uuid, :course_uri, :provider_uuid, :source_uuid, :type_uri,
+                     :title, :title_lang, :instance_count, :content_hash, NOW())
+                ON CONFLICT (course_uuid) DO UPDATE SET
+                    course_uri = EXCLUDED.course_uri,
+                    provider_uuid = EXCLUDED.provider_uuid,
+                    source_uuid = EXCLUDED.source_uuid,
+                    type_uri = EXCLUDED.type_uri,
+                    title = EXCLUDED.title,
+                    title_lang = EXCLUDED.title_lang,
+                    instance_count = EXCLUDED.instance_count,
+                    content_hash = EXCLUDED.content_hash,
+                    last_seen_at = EXCLUDED.last_seen_at
+            """),
+            rows,
+        )
+    deleted = db.execute(
+        text("""
+            DELETE FROM course
+            WHERE source_uuid = :source_uuid
+              AND NOT (course_uuid = ANY(CAST(:ids AS uuid[])))
+        """),
+        {"source_uuid": str(source_uuid), "ids": ids},
+    ).rowcount
+    db.execute(
+        text("""
+            UPDATE provider p
+            SET course_count = (SELECT COUNT(*) FROM course c WHERE c.provider_uuid = p.provider_uuid)
+            WHERE p.provider_uuid = ANY(CAST(:providers AS uuid[]))
+        """),
+        {"providers": sorted(providers)},
+    )
+    db.commit()
+    return len(rows), deleted
+
+
+def course_document(course_uuid: str, course_uri: str) -> Dict[str, Any]:
+    """Framed JSON-LD of a course as served by the detail endpoint: no
+    @context, `id` is the course UUID and `uri` the LOS URI."""
+    framed = frame_course(course_uri)
+
+    framed.pop("@context", None)
+    framed["uri"] = framed["id"]
+    framed["id"] = course_uuid
+
+    if "elm:learningOpportunity" in framed and isinstance(framed["elm:learningOpportunity"], list):
+        count = len(framed["elm:learningOpportunity"])
+        if count > 0:
+            framed["instanceCount"] = len(framed["elm:learningOpportunity"])
+    return framed
+
+
+def document_hash(document: Dict[str, Any]) -> str:
+    """SHA-256 of a course document's canonical JSON, ingestion timestamps
+    excluded. Also used as the detail endpoint's (weak) ETag."""
+    stable = {k: v for k, v in document.items() if k not in VOLATILE_FIELDS}
+    canonical = json.dumps(stable, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def subgraph_hash(nt: str) -> str:
+    """SHA-256 of a course's sorted N-Triples block, ingestion timestamps
+    excluded. Blank nodes get a fresh random label on every parse, so a
+    block with any is canonicalised first (rdflib.compare) and hashed with
+    stable labels."""
+    lines = [
+        line for line in nt.splitlines()
+        if line.strip() and not any(p in line for p in VOLATILE_PREDICATES)
+    ]
+    if any("_:" in line for line in lines):
+        graph = Graph()
+        graph.parse(data="\n".join(lines), format="nt")
+        lines = sorted(f"{s.n3()} {p.n3()} {o.n3()} ." for s, p, o in to_canonical_graph(graph))
+    return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+
+
+def store_course_documents(
+    db: Session,
+    documents: List[Dict[str, Any]],
+    subgraph_hashes: Optional[Dict[str, Optional[str]]] = None,
+) -> None:
+    """Upsert framed documents into the course_document cache. A document's
+    subgraph hash is the one silver computed for it, if known."""
+    if not documents:
+        return
+    subgraph_hashes = subgraph_hashes or {}
+    db.execute(
+        text("""
+            INSERT INTO course_document
+                (course_uuid, course_uri, document, content_hash, subgraph_hash, updated_at)
+            VALUES
+                (:course_uuid, :course_uri, CAST(:document AS jsonb), :content_hash, :subgraph_hash, NOW())
+            ON CONFLICT (course_uuid) DO UPDATE SET
+                course_uri = EXCLUDED.course_uri,
+                document = EXCLUDED.document,
+                content_hash = EXCLUDED.content_hash,
+                subgraph_hash = COALESCE(EXCLUDED.subgraph_hash, course_document.subgraph_hash),
+                updated_at = EXCLUDED.updated_at
+        """),
+        [
+            {
+                "course_uuid": d["id"],
+                "course_uri": d.get("uri"),
+                "document": json.dumps(d),
+                "content_hash": document_hash(d),
+                "subgraph_hash": subgraph_hashes.get(d["id"]),
+            }
+            for d in documents
+        ],
+    )
+    db.commit()
+
+
+def invalidate_course_documents(
+    db: Session, blocks: Iterable[Tuple[Dict[str, str], str]],
+) -> int:
+    """Drop cached documents of courses whose subgraph changed.
+
+    `blocks` are the (course, N-Triples) pairs silver just pushed. Each
+    course dict gets its `subgraph_hash`, which gold stores with the
+    reframed document; cached documents recorded with a different hash are
+    deleted, so the detail endpoint reframes them until gold catches up.
+    Returns the number of documents dropped.
+    """
+    ids, hashes = [], []
+    for course, nt in blocks:
+        course["subgraph_hash"] = subgraph_hash(nt)
+        ids.append(course["uuid"])
+        hashes.append(course["subgraph_hash"])
+    if not ids:
+        return 0
+    result = db.execute(
+        text("""
+            DELETE FROM course_document cd
+            USING unnest(CAST(:ids AS uuid[]), CAST(:hashes AS text[])) AS k(course_uuid, subgraph_hash)
+            WHERE cd.course_uuid = k.course_uuid
+              AND cd.subgraph_hash IS DISTINCT FROM k.subgraph_hash
+        """),
+        {"ids": ids, "hashes": hashes},
+    )
+    db.commit()
+    return result.rowcount
+
+
+def get_course_document(db: Session, course_uuid: UUID) -> Tuple[Dict[str, Any], str]:
+    """Framed JSON-LD of a course and its ETag, from the course_document
+    cache. On a miss the course is framed from Fuseki and cached."""
+    row = db.execute(
+        text("SELECT document, content_hash FROM course_document WHERE course_uuid = :uuid"),
+        {"uuid": str(course_uuid)},
+    ).fetchone()
+    if row and row[1]:
+        return row[0], row[1]
+
+    try:
+        document = course_document(str(course_uuid), resolve_course_uri(str(course_uuid), db))
+    except CourseNotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course not found",
+        )
+    store_course_documents(db, [document])
+    return document, document_hash(document)
@@ -1,49 +1,22 @@
+from collections import Counter
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 
 from fastapi import BackgroundTasks, HTTPException, status
 from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from services.course_fetch.main import run_course_fetch
-from services.locks import NS_COURSE_FETCH, NS_PULL_MANIFEST, is_locked
+from services.course_fetch.main import run_course_fetch, run_provider_fetch
+from services.locks import NS_COURSE_FETCH, NS_PULL_MANIFEST, is_locked, locked_keys
 
 
-def queue_provider_data(
-    db: Session,
-    provider_uuid: UUID,
-    source_version_uuid: UUID,
-    source_uuid: UUID,
-    *,
-    background_tasks: Optional[BackgroundTasks] = None,
-) -> Dict[str, Any]:
-    """Validate the fetch request and schedule the course-fetch pipeline.
-
-    Returns {"status": "busy", ...} if the provider's manifest is currently
-    being pulled, {"status": "outdated", ...} if the caller's source_version
-    is not the latest, otherwise {"status": "success", ...}. Raises
-    HTTPException for missing versions and infrastructure errors.
-
-    When called with `background_tasks`, the pipeline is scheduled for async
-    execution (HTTP use). Without it, the caller is expected to run the
-    pipeline in the foreground (CLI use).
-    """
-    if is_locked(db, NS_PULL_MANIFEST, str(provider_uuid)):
-        return {
-            "status": "busy",
-            "message": "Manifest is currently being pulled for this provider. Please try again later.",
-            "provider_uuid": str(provider_uuid),
-        }
-
-    if is_locked(db, NS_COURSE_FETCH, str(source_uuid)):
-        return {
-            "status": "busy",
-            "message": "This source is already being fetched. Please try again later.",
-            "provider_uuid": str(provider_uuid),
-            "source_uuid": str(source_uuid),
-        }
-
+def _check_latest_version(
+    db: Session, provider_uuid: UUID, source_version_uuid: UUID,
+) -> Optional[Dict[str, Any]]:
+    """None if `source_version_uuid` is the provider's latest manifest
+    version, else the "outdated" response. Raises 404 for unknown versions."""
     requested_version = db.execute(
         text("""
             SELECT version_date, version_id
@@ -92,6 +65,47 @@ def queue_provider_data(
             },
         }
 
+    return None
+
+
+def queue_provider_data(
+    db: Session,
+    provider_uuid: UUID,
+    source_version_uuid: UUID,
+    source_uuid: UUID,
+    *,
+    background_tasks: Optional[BackgroundTasks] = None,
+) -> Dict[str, Any]:
+    """Validate the fetch request and schedule the course-fetch pipeline.
+
+    Returns {"status": "busy", ...} if the provider's manifest is currently
+    being pulled, {"status": "outdated", ...} if the caller's source_version
+    is not the latest, otherwise {"status": "success", ...}. Raises
+    HTTPException for missing versions and infrastructure errors.
+
+    When called with `background_tasks`, the pipeline is scheduled for async
+    execution (HTTP use). Without it, the caller is expected to run the
+    pipeline in the foreground (CLI use).
+    """
+    if is_locked(db, NS_PULL_MANIFEST, str(provider_uuid)):
+        return {
+            "status": "busy",
+            "message": "Manifest is currently being pulled for this provider. Please try again later.",
+            "provider_uuid": str(provider_uuid),
+        }
+
+    if is_locked(db, NS_COURSE_FETCH, str(source_uuid)):
+        return {
+            "status": "busy",
+            "message": "This source is already being fetched. Please try again later.",
+            "provider_uuid": str(provider_uuid),
+            "source_uuid": str(source_uuid),
+        }
+
+    outdated = _check_latest_version(db, provider_uuid, source_version_uuid)
+    if outdated is not None:
+        return outdated
+
     queued_at = datetime.now(timezone.utc).isoformat()
 
     if background_tasks is not None:
@@ -109,3 +123,261 @@ def queue_provider_data(
             "queued_at": queued_at,
         },
     }
+
+
+def queue_provider_fetch(
+    db: Session,
+    provider_uuid: UUID,
+    source_version_uuid: UUID,
+    *,
+    background_tasks: Optional[BackgroundTasks] = None,
+) -> Dict[str, Any]:
+    """Validate a provider-wide fetch and schedule `run_provider_fetch` for
+    every source of the version that is not already being fetched.
+
+    Returns "busy" / "outdated" like `queue_provider_data`; on success,
+    `data.sources` lists the sources that were queued and `data.busy` those
+    skipped. Raises 404 if the version has no sources.
+    """
+    if is_locked(db, NS_PULL_MANIFEST, str(provider_uuid)):
+        return {
+            "status": "busy",
+            "message": "Manifest is currently being pulled for this provider. Please try again later.",
+            "provider_uuid": str(provider_uuid),
+        }
+
+    outdated = _check_latest_version(db, provider_uuid, source_version_uuid)
+    if outdated is not None:
+        return outdated
+
+    rows = db.execute(
+        text("""
+            SELECT source_uuid, source_name, source_path
+            FROM source
+            WHERE source_version_uuid = :source_version_uuid
+            ORDER BY source_name, source_uuid
+        """),
+        {"source_version_uuid": source_version_uuid},
+    ).fetchall()
+    if not rows:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No sources attached to this manifest file version",
+        )
+
+    sources, busy = [], []
+    for row in rows:
+        source = {"source_uuid": str(row[0]), "source_name": row[1], "source_path": row[2]}
+        if is_locked(db, NS_COURSE_FETCH, source["source_uuid"]):
+            busy.append(source)
+        else:
+            sources.append(source)
+
+    if not sources:
+        return {
+            "status": "busy",
+            "message": "All sources of this provider are already being fetched. Please try again later.",
+            "provider_uuid": str(provider_uuid),
+        }
+
+    queued_at = datetime.now(timezone.utc).isoformat()
+
+    if background_tasks is not None:
+        background_tasks.add_task(
+            run_provider_fetch, provider_uuid, source_version_uuid, sources
+        )
+
+    return {
+        "status": "success",
+        "message": f"Fetch of {len(sources)} source(s) has been dispatched",
+        "data": {
+            "provider_uuid": str(provider_uuid),
+            "source_version_uuid": str(source_version_uuid),
+            "sources": [{"source_uuid": s["source_uuid"], "source_name": s["source_name"]} for s in sources],
+            "busy": [{"source_uuid": s["source_uuid"], "source_name": s["source_name"]} for s in busy],
+            "queued_at": queued_at,
+        },
+    }
+
+
+def queue_provider_batch(
+    db: Session,
+    items: List[Dict[str, Optional[UUID]]],
+    *,
+    background_tasks: Optional[BackgroundTasks] = None,
+) -> Dict[str, Any]:
+    """Validate and schedule many course fetches at once.
+
+    Each item has `provider_uuid` and optionally `source_version_uuid`
+    (default: the provider's latest) and `source_uuid` (default: every
+    source of that version). Validation is set-based — one query for the
+    latest version per provider, one for the requested versions, one for
+    the sources and one pg_locks scan for every lock key — instead of the
+    four queries per source `queue_provider_data` runs.
+
+    Returns one result per source (or per item that could not be expanded)
+    with a status of "queued", "busy", "outdated" or "not_found", plus
+    counts per status. Queued sources are scheduled per provider version
+    with `run_provider_fetch`.
+    """
+    provider_ids = list(dict.fromkeys(str(item["provider_uuid"]) for item in items))
+    requested_versions = list(dict.fromkeys(
+        str(item["source_version_uuid"]) for item in items if item.get("source_version_uuid")
+    ))
+
+    latest: Dict[str, str] = {}
+    if provider_ids:
+        rows = db.execute(
+            text("""
+                SELECT DISTINCT ON (provider_uuid) provider_uuid, source_version_uuid
+                FROM source_version
+                WHERE provider_uuid = ANY(CAST(:providers AS uuid[]))
+                ORDER BY provider_uuid, version_date DESC, version_id DESC
+            """),
+            {"providers": provider_ids},
+        ).fetchall()
+        latest = {str(r[0]): str(r[1]) for r in rows}
+
+    version_provider: Dict[str, str] = {}
+    if requested_versions:
+        rows = db.execute(
+            text("""
+                SELECT source_version_uuid, provider_uuid
+                FROM source_version
+                WHERE source_version_uuid = ANY(CAST(:versions AS uuid[]))
+            """),
+            {"versions": requested_versions},
+        ).fetchall()
+        version_provider = {str(r[0]): str(r[1]) for r in rows}
+
+    sources_by_version: Dict[str, List[Dict[str, Any]]] = {}
+    if latest:
+        rows = db.execute(
+            text("""
+                SELECT source_uuid, source_version_uuid, source_name, source_path
+                FROM source
+                WHERE source_version_uuid = ANY(CAST(:versions AS uuid[]))
+                ORDER BY source_name, source_uuid
+            """),
+            {"versions": list(latest.values())},
+        ).fetchall()
+        for r in rows:
+            sources_by_version.setdefault(str(r[1]), []).append(
+                {"source_uuid": str(r[0]), "source_name": r[2], "source_path": r[3]}
+            )
+
+    locked = locked_keys(
+        db,
+        [(NS_PULL_MANIFEST, p) for p in latest]
+        + [
+            (NS_COURSE_FETCH, s["source_uuid"])
+            for sources in sources_by_version.values() for s in sources
+        ],
+    )
+
+    results: List[Dict[str, Any]] = []
+    queued: Dict[tuple, List[Dict[str, Any]]] = {}
+    seen: set = set()
+
+    def _result(
+        provider: str, version: Optional[str], source: Optional[str],
+        status_: str, message: Optional[str] = None,
+    ) -> None:
+        results.append({
+            "provider_uuid": provider,
+            "source_version_uuid": version,
+            "source_uuid": source,
+            "status": status_,
+            "message": message,
+        })
+
+    for item in items:
+        provider = str(item["provider_uuid"])
+        version = str(item["source_version_uuid"]) if item.get("source_version_uuid") else None
+        source = str(item["source_uuid"]) if item.get("source_uuid") else None
+
+        if provider not in latest:
+            _result(provider, version, source, "not_found", "No manifest file versions found for this provider")
+            continue
+        if version is not None and version_provider.get(version) != provider:
+            _result(provider, version, source, "not_found", "Manifest file version not found for the specified provider")
+            continue
+        if version is not None and version != latest[provider]:
+            _result(provider, version, source, "outdated", f"Outdated manifest file version; latest is {latest[provider]}")
+            continue
+        version = latest[provider]
+
+        if (NS_PULL_MANIFEST, provider) in locked:
+            _result(provider, version, source, "busy", "Manifest is currently being pulled for this provider")
+            continue
+
+        sources = sources_by_version.get(version, [])
+        if source is not None:
+            sources = [s for s in sources if s["source_uuid"] == source]
+            if not sources:
+                _result(provider, version, source, "not_found", "Source does not belong to the latest manifest file version")
+                continue
+        elif not sources:
+            _result(provider, version, None, "not_found", "No sources attached to the latest manifest file version")
+            continue
+
+        for s in sources:
+            if (NS_COURSE_FETCH, s["source_uuid"]) in locked:
+                _result(provider, version, s["source_uuid"], "busy", "This source is already being fetched")
+                continue
+            _result(provider, version, s["source_uuid"], "queued")
+            if s["source_uuid"] not in seen:
+                seen.add(s["source_uuid"])
+                queued.setdefault((provider, version), []).append(s)
+
+    if background_tasks is not None:
+        for (provider, version), sources in queued.items():
+            background_tasks.add_task(run_provider_fetch, UUID(provider), UUID(version), sources)
+
+    return {
+        "status": "success",
+        "message": f"Fetch of {len(seen)} source(s) has been dispatched",
+        "counts": dict(Counter(r["status"] for r in results)),
+        "queued_at": datetime.now(timezone.utc).isoformat(),
+        "results": results,
+    }
+
+
+# AsyncSession variants for the routers. `run_sync` runs the functions above
+# on the session's asyncpg connection: their queries are awaited, so a slow
+# one no longer holds up other requests on the event loop.
+
+async def queue_provider_data_async(
+    db: AsyncSession,
+    provider_uuid: UUID,
+    source_version_uuid: UUID,
+    source_uuid: UUID,
+    *,
+    background_tasks: Optional[BackgroundTasks] = None,
+) -> Dict[str, Any]:
+    return await db.run_sync(
+        queue_provider_data, provider_uuid, source_version_uuid, source_uuid,
+        background_tasks=background_tasks,
+    )
+
+
+async def queue_provider_fetch_async(
+    db: AsyncSession,
+    provider_uuid: UUID,
+    source_version_uuid: UUID,
+    *,
+    background_tasks: Optional[BackgroundTasks] = None,
+) -> Dict[str, Any]:
+    return await db.run_sync(
+        queue_provider_fetch, provider_uuid, source_version_uuid,
+        background_tasks=background_tasks,
+    )
+
+
+async def queue_provider_batch_async(
+    db: AsyncSession,
+    items: List[Dict[str, Optional[UUID]]],
+    *,
+    background_tasks: Optional[BackgroundTasks] = None,
+) -> Dict[str, Any]:
+    return await db.run_sync(queue_provider_batch, items, background_tasks=background_tasks)
@@ -1,8 +1,13 @@
+import hashlib
 import json
 import logging
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import requests
 from rdflib import BNode, Graph, Literal, Namespace, URIRef
@@ -20,6 +25,8 @@ ELM = Namespace("http://data.europa.eu/snb/model/elm/")
 ADMS = Namespace("http://www.w3.org/ns/adms#")
 ROV = Namespace("http://www.w3.org/ns/regorg#")
 
+GRAPH_REFERENCE_SHADOW = f"{GRAPH_REFERENCE}/shadow"
+
 
 @dataclass
 class UpsertStats:
@@ -37,48 +44,139 @@ class FusekiPushStats:
     failed: int = 0
 
 
-def fetch_deqar_providers(
+@dataclass
+class RefreshStats:
+    pages: int = 0
+    failed_pages: int = 0
+    upsert: UpsertStats = field(default_factory=UpsertStats)
+    fuseki: FusekiPushStats = field(default_factory=FusekiPushStats)
+    rebuilt: bool = False
+
+
+@dataclass
+class DeqarPage:
+    offset: int
+    providers: List[Dict[str, Any]] = field(default_factory=list)
+    count: int = 0
+    error: Optional[str] = None
+
+
+def _fetch_page(
+    session: requests.Session,
+    base: str,
+    limit: int,
+    offset: int,
+    *,
+    max_retries: int,
+    retry_delay: int,
+) -> DeqarPage:
+    """GET one page of the provider listing, retrying transient failures."""
+    retries = 0
+    last_error = ""
+    while True:
+        try:
+            response = session.get(base, params={"limit": limit, "offset": offset}, timeout=60)
+            if response.status_code == 200:
+                data = response.json()
+                return DeqarPage(
+                    offset=offset,
+                    providers=data.get("results", []),
+                    count=data.get("count") or 0,
+                )
+            last_error = f"HTTP {response.status_code}"
+            logger.warning("DEQAR HTTP %s for offset=%s", response.status_code, offset)
+        except Exception as e:
+            last_error = str(e)
+            logger.warning("DEQAR fetch error offset=%s: %s", offset, e)
+
+        retries += 1
+        if retries > max_retries:
+            logger.error("DEQAR: giving up on offset=%s after %s retries", offset, max_retries)
+            return DeqarPage(offset=offset, error=last_error)
+        time.sleep(retry_delay)
+
+
+def iter_deqar_pages(
     limit: int = 2000,
     offset: int = 0,
     api_url: Optional[str] = None,
     *,
+    max_workers: int = 4,
     max_retries: int = 3,
     retry_delay: int = 10,
-    request_delay: int = 1,
-) -> List[Dict[str, Any]]:
-    """Page through the DEQAR provider API and return the combined list."""
+) -> Iterator[DeqarPage]:
+    """Yield pages of the DEQAR provider API in offset order.
+
+    The first page is fetched on its own to learn `count`; the remaining
+    offsets are then downloaded by a thread pool with at most `max_workers`
+    requests in flight. Pages are yielded as soon as they (and every page
+    before them) have arrived, so the caller can upsert and serialize one
+    page while the next ones are still downloading. Failed pages are yielded
+    with `error` set rather than aborting the whole listing.
+    """
     base = api_url or DEQAR_API_URL
     logger.info("Fetching DEQAR providers from %s (limit=%s, offset=%s)", base, limit, offset)
 
-    results: List[Dict[str, Any]] = []
-    more_pages = True
-    total_count = 0
+    local = threading.local()
+    sessions: List[requests.Session] = []
+    sessions_lock = threading.Lock()
+
+    def _session() -> requests.Session:
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+            with sessions_lock:
+                sessions.append(local.session)
+        return local.session
+
+    def _fetch(page_offset: int) -> DeqarPage:
+        return _fetch_page(
+            _session(), base, limit, page_offset,
+            max_retries=max_retries, retry_delay=retry_delay,
+        )
+
+    fetched = 0
+    try:
+        first = _fetch(offset)
+        fetched += len(first.providers)
+        yield first
+        if first.error:
+            return
+
+        remaining = range(offset + limit, first.count, limit)
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            pending = deque()
+            offsets = iter(remaining)
+            for page_offset in islice(offsets, max(1, max_workers)):
+                pending.append(pool.submit(_fetch, page_offset))
+            while pending:
+                page = pending.popleft().result()
+                # Keep the window full: one new request per page handed out.
+                for page_offset in islice(offsets, 1):
+                    pending.append(pool.submit(_fetch, page_offset))
+                fetched += len(page.providers)
+                yield page
+    finally:
+        for s in sessions:
+            s.close()
+        logger.info("DEQAR fetch done: %s providers", fetched)
 
-    with requests.Session() as session:
-        while more_pages:
-            retries = 0
-            while True:
-                try:
-                    time.sleep(retry_delay if retries else request_delay)
-                    response = session.get(base, params={"limit": limit, "offset": offset}, timeout=60)
-                    if response.status_code == 200:
-                        data = response.json()
-                        total_count = data.get("count", total_count)
-                        results.extend(data.get("results", []))
-                        offset += limit
-                        more_pages = bool(data.get("next"))
-                        break
-                    logger.warning("DEQAR HTTP %s for offset=%s", response.status_code, offset)
-                except Exception as e:
-                    logger.warning("DEQAR fetch error offset=%s: %s", offset, e)
-
-                retries += 1
-                if retries > max_retries:
-                    logger.error("DEQAR: giving up on offset=%s after %s retries", offset, max_retries)
-                    offset += limit
-                    break
-
-    logger.info("DEQAR fetch done: %s providers (total=%s)", len(results), total_count)
+
+def fetch_deqar_providers(
+    limit: int = 2000,
+    offset: int = 0,
+    api_url: Optional[str] = None,
+    *,
+    max_workers: int = 4,
+    max_retries: int = 3,
+    retry_delay: int = 10,
+) -> List[Dict[str, Any]]:
+    """Page through the DEQAR provider API and return the combined list."""
+    results: List[Dict[str, Any]] = []
+    for page in iter_deqar_pages(
+        limit, offset, api_url,
+        max_workers=max_workers, max_retries=max_retries, retry_delay=retry_delay,
+    ):
+        results.extend(page.providers)
     return results
 
 
@@ -101,31 +199,61 @@ def _build_name_concat(provider: Dict[str, Any]) -> str:
     return " ".join(parts)
 
 
+def provider_hash(provider: Dict[str, Any]) -> str:
+    """SHA-256 of the provider's canonical JSON (sorted keys, no whitespace)."""
+    canonical = json.dumps(provider, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
 def upsert_providers(
-    db: Session, providers: List[Dict[str, Any]], *, force: bool = False
+    db: Session, providers: Iterable[Dict[str, Any]], *, force: bool = False
 ) -> UpsertStats:
+    """Insert new providers and update those whose content hash changed.
+
+    Existing rows are looked up for the whole batch in one query. Rows written
+    before `metadata_hash` existed are compared on their stored metadata and
+    get the hash backfilled. Only new and changed providers (or all of them,
+    with `force`) end up in `data_updated`, and so in the RDF push.
+    """
     stats = UpsertStats()
+    providers = list(providers)
+
+    existing: Dict[Any, Tuple[Any, Optional[str], Optional[Dict[str, Any]]]] = {}
+    base_ids = [p.get("id") for p in providers if p.get("id") is not None]
+    if base_ids:
+        rows = db.execute(
+            text("""
+                SELECT base_id, provider_uuid, metadata_hash,
+                       CASE WHEN metadata_hash IS NULL THEN metadata END
+                FROM provider
+                WHERE base_id = ANY(:bids)
+            """),
+            {"bids": base_ids},
+        ).fetchall()
+        existing = {row[0]: (row[1], row[2], row[3]) for row in rows}
 
     for provider in providers:
         stats.total += 1
         base_id = provider.get("id")
+        content_hash = provider_hash(provider)
         try:
-            existing = db.execute(
-                text("SELECT provider_uuid, metadata FROM provider WHERE base_id = :bid"),
-                {"bid": base_id},
-            ).fetchone()
-
-            if existing:
-                if existing[1] != provider:
-                    _update_provider(db, existing[0], provider)
-                    stats.data_updated.append((str(existing[0]), provider))
+            if base_id in existing:
+                provider_uuid, stored_hash, stored_metadata = existing[base_id]
+                if stored_hash is None and stored_metadata is not None:
+                    stored_hash = provider_hash(stored_metadata)
+                    if stored_hash == content_hash:
+                        _set_provider_hash(db, provider_uuid, content_hash)
+
+                if stored_hash != content_hash:
+                    _update_provider(db, provider_uuid, provider, content_hash)
+                    stats.data_updated.append((str(provider_uuid), provider))
                     stats.updated += 1
                 else:
                     stats.unchanged += 1
                     if force:
-                        stats.data_updated.append((str(existing[0]), provider))
+                        stats.data_updated.append((str(provider_uuid), provider))
             else:
-                new_uuid = _insert_provider(db, provider)
+                new_uuid = _insert_provider(db, provider, content_hash)
                 stats.data_updated.append((str(new_uuid), provider))
                 stats.new += 1
             db.commit()
@@ -141,13 +269,14 @@ def upsert_providers(
     return stats
 
 
-def _insert_provider(db: Session, provider: Dict[str, Any]):
+def _insert_provider(db: Session, provider: Dict[str, Any], content_hash: str):
     params = {
         "deqar_id": provider.get("deqar_id"),
         "eter_id": provider.get("eter_id"),
         "base_id": provider.get("id"),
         "schac_code": manifest.extract_schac(provider),
         "metadata": json.dumps(provider),
+        "metadata_hash": content_hash,
         "manifest_json": json.dumps(_build_manifest_json(provider)),
         "name_concat": _build_name_concat(provider),
         "provider_name": provider.get("name_primary", ""),
@@ -155,12 +284,12 @@ def _insert_provider(db: Session, provider: Dict[str, Any]):
     row = db.execute(
         text("""
             INSERT INTO provider (
-                deqar_id, eter_id, base_id, schac_code, metadata, manifest_json,
-                name_concat, provider_name, last_deqar_pull,
+                deqar_id, eter_id, base_id, schac_code, metadata, metadata_hash,
+                manifest_json, name_concat, provider_name, last_deqar_pull,
                 last_manifest_pull, created_at, updated_at
             ) VALUES (
                 :deqar_id, :eter_id, :base_id, :schac_code,
-                CAST(:metadata AS jsonb), CAST(:manifest_json AS jsonb),
+                CAST(:metadata AS jsonb), :metadata_hash, CAST(:manifest_json AS jsonb),
                 :name_concat, :provider_name, NOW(),
                 NULL, NOW(), NOW()
             )
@@ -171,7 +300,7 @@ def _insert_provider(db: Session, provider: Dict[str, Any]):
     return row[0]
 
 
-def _update_provider(db: Session, provider_uuid, provider: Dict[str, Any]) -> None:
+def _update_provider(db: Session, provider_uuid, provider: Dict[str, Any], content_hash: str) -> None:
     db.execute(
         text("""
             UPDATE provider
@@ -179,6 +308,7 @@ def _update_provider(db: Session, provider_uuid, provider: Dict[str, Any]) -> No
                 eter_id = :eter_id,
                 schac_code = :schac_code,
                 metadata = CAST(:metadata AS jsonb),
+                metadata_hash = :metadata_hash,
                 name_concat = :name_concat,
                 provider_name = :provider_name,
                 last_deqar_pull = NOW(),
@@ -191,12 +321,20 @@ def _update_provider(db: Session, provider_uuid, provider: Dict[str, Any]) -> No
             "eter_id": provider.get("eter_id"),
             "schac_code": manifest.extract_schac(provider),
             "metadata": json.dumps(provider),
+            "metadata_hash": content_hash,
             "name_concat": _build_name_concat(provider),
             "provider_name": provider.get("name_primary", ""),
         },
     )
 
 
+def _set_provider_hash(db: Session, provider_uuid, content_hash: str) -> None:
+    db.execute(
+        text("UPDATE provider SET metadata_hash = :h WHERE provider_uuid = :provider_uuid"),
+        {"h": content_hash, "provider_uuid": provider_uuid},
+    )
+
+
 def providers_to_rdf(stats: UpsertStats) -> List[Tuple[str, bytes]]:
     """Serialize each upserted provider to N-Triples ready for Fuseki push."""
     out: List[Tuple[str, bytes]] = []
@@ -300,15 +438,101 @@ def _deqar_to_rdf(provider_source: Dict[str, Any], provider_uuid: str, graph: Gr
     return provider_uri
 
 
-def push_providers_to_fuseki(rdf_list: List[Tuple[str, bytes]]) -> FusekiPushStats:
+def push_providers_to_fuseki(
+    rdf_list: List[Tuple[str, bytes]], *, batch_size: int = 200,
+) -> FusekiPushStats:
+    """Replace each provider's subject in the reference graph, `batch_size`
+    providers per SPARQL Update request."""
     stats = FusekiPushStats()
+    items = (
+        (uri, nt_bytes.decode("utf-8") if isinstance(nt_bytes, bytes) else nt_bytes, None)
+        for uri, nt_bytes in rdf_list
+    )
     with requests.Session() as session:
-        for uri, nt_bytes in rdf_list:
-            nt = nt_bytes.decode("utf-8") if isinstance(nt_bytes, bytes) else nt_bytes
-            ok = fuseki.replace_subject_in_graph(GRAPH_REFERENCE, uri, nt, session=session)
-            if ok:
-                stats.success += 1
-            else:
-                stats.failed += 1
+        stats.success, stats.failed = fuseki.replace_subjects_in_graph(
+            GRAPH_REFERENCE, items, batch_size=batch_size, session=session,
+        )
     logger.info("Fuseki push: success=%s failed=%s", stats.success, stats.failed)
     return stats
+
+
+def load_providers_into_graph(
+    rdf_list: List[Tuple[str, bytes]], graph_uri: str,
+) -> FusekiPushStats:
+    """Append provider N-Triples to `graph_uri` in one Graph Store POST.
+
+    Only safe on a graph that is being built from scratch (see
+    `refresh_providers(rebuild=True)`): nothing is deleted first.
+    """
+    stats = FusekiPushStats()
+    if not rdf_list:
+        return stats
+    body = (nt if isinstance(nt, bytes) else nt.encode("utf-8") for _, nt in rdf_list)
+    if fuseki.store_graph(graph_uri, body):
+        stats.success = len(rdf_list)
+    else:
+        stats.failed = len(rdf_list)
+    logger.info("Fuseki load into <%s>: success=%s failed=%s", graph_uri, stats.success, stats.failed)
+    return stats
+
+
+def refresh_providers(
+    db: Session,
+    pages: Iterable[DeqarPage],
+    *,
+    force: bool = False,
+    rebuild: bool = False,
+) -> Iterator[Tuple[DeqarPage, RefreshStats]]:
+    """Upsert, serialize and push each DEQAR page as it arrives.
+
+    Consumes `pages` (typically `iter_deqar_pages`, whose pool keeps
+    downloading ahead) one at a time, so only the current page's providers
+    and RDF are held in memory. Yields (page, running totals) after each
+    page; per-provider `data_updated` entries are not carried into the totals.
+
+    With `rebuild=True` (implies `force`) every provider is streamed into an
+    empty shadow graph, which replaces GRAPH_REFERENCE in a single MOVE once
+    the last page is in. `pages` must then cover the complete listing; if any
+    page, upsert or load failed the swap is skipped and the live graph is
+    left untouched. `totals.rebuilt` reports the outcome.
+    """
+    totals = RefreshStats()
+    if rebuild:
+        force = True
+        if not fuseki.drop_graph(GRAPH_REFERENCE_SHADOW):
+            raise RuntimeError(f"could not clear shadow graph <{GRAPH_REFERENCE_SHADOW}>")
+
+    for page in pages:
+        totals.pages += 1
+        if page.error:
+            totals.failed_pages += 1
+            yield page, totals
+            continue
+
+        stats = upsert_providers(db, page.providers, force=force)
+        rdf_list = providers_to_rdf(stats)
+        if rebuild:
+            push = load_providers_into_graph(rdf_list, GRAPH_REFERENCE_SHADOW)
+        else:
+            push = push_providers_to_fuseki(rdf_list)
+
+        totals.upsert.total += stats.total
+        totals.upsert.new += stats.new
+        totals.upsert.updated += stats.updated
+        totals.upsert.unchanged += stats.unchanged
+        totals.upsert.errors += stats.errors
+        totals.fuseki.success += push.success
+        totals.fuseki.failed += push.failed
+        yield page, totals
+
+    if rebuild:
+        if totals.failed_pages or totals.upsert.errors or totals.fuseki.failed:
+            logger.error(
+                "Reference graph rebuild incomplete (failed pages=%s, db errors=%s, "
+                "load failures=%s) — keeping the live graph",
+                totals.failed_pages, totals.upsert.errors, totals.fuseki.failed,
+            )
+            fuseki.drop_graph(GRAPH_REFERENCE_SHADOW)
+        else:
+            totals.rebuilt = fuseki.move_graph(GRAPH_REFERENCE_SHADOW, GRAPH_REFERENCE)
+            logger.info("Reference graph rebuilt from %s providers: %s", totals.fuseki.success, totals.rebuilt)
@@ -0,0 +1,676 @@
+"""Compiled JSON-LD framing.
+
+`jsonld.frame(jsonld.from_rdf(nt), frame)` turns N-Triples into expanded
+JSON-LD, expands it again, flattens it, frames it and compacts the result,
+interpreting the frame and its context at every node. `Framer` compiles a
+frame once — the context into term tables, the nested frames into a tree of
+flags and properties — and goes from N-Triples straight to the framed,
+compacted document. It follows pyld's algorithms step for step, so the
+output is the same as pyld's down to key and value order, blank node labels
+and null defaults.
+
+Only the part of JSON-LD that schema/frame.json uses is compiled: `@vocab`,
+prefixes, keyword aliases and terms with `@type`, `@language` or a `@set`
+container; frames matching on `@type` or on properties, with `@embed` and
+`@explicit`. Anything else, in the frame or in the data (named graphs, RDF
+lists, JSON literals, lines pyld's N-Quads parser rejects), raises
+`UnsupportedFrame`, and callers fall back to pyld.
+"""
+import copy
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+RDF_TYPE = RDF_NS + "type"
+RDF_NIL = RDF_NS + "nil"
+RDF_JSON = RDF_NS + "JSON"
+XSD_NS = "http://www.w3.org/2001/XMLSchema#"
+XSD_STRING = XSD_NS + "string"
+XSD_BOOLEAN = XSD_NS + "boolean"
+XSD_INTEGER = XSD_NS + "integer"
+XSD_DOUBLE = XSD_NS + "double"
+NATIVE_TYPES = (XSD_BOOLEAN, XSD_INTEGER, XSD_DOUBLE, XSD_STRING)
+
+KEYWORDS = frozenset((
+    "@base", "@container", "@context", "@default", "@direction", "@embed",
+    "@explicit", "@first", "@graph", "@id", "@import", "@included", "@index",
+    "@json", "@language", "@list", "@nest", "@none", "@omitDefault",
+    "@propagate", "@protected", "@preserve", "@requireAll", "@reverse", "@set",
+    "@type", "@value", "@version", "@vocab",
+))
+
+# pyld's N-Quads grammar (pyld.nquads.parse_nquads), so that lines are
+# accepted, and literals read, exactly as pyld reads them.
+_IRI = "(?:<([^:]+:[^>]*)>)"
+_BNODE = "(_:(?:[A-Za-z0-9_][A-Za-z0-9_.-]*))"
+_PLAIN = '"([^"\\\\]*(?:\\\\.[^"\\\\]*)*)"'
+_LITERAL = "(?:" + _PLAIN + "(?:(?:\\^\\^" + _IRI + ")|(?:@([a-zA-Z]+(?:-[a-zA-Z0-9]+)*)))?)"
+_QUAD = re.compile(
+    "^[ \\t]*"
+    + "(?:" + _IRI + "|" + _BNODE + ")[ \\t]+"
+    + _IRI + "[ \\t]+"
+    + "(?:" + _IRI + "|" + _BNODE + "|" + _LITERAL + ")[ \\t]*"
+    + "(?:\\.|(?:(?:" + _IRI + "|" + _BNODE + ")[ \\t]*\\.))"
+    + "[ \\t]*$"
+)
+_EMPTY = re.compile("^[ \\t]*$")
+_ABSOLUTE_IRI = re.compile(r"^([A-Za-z][A-Za-z0-9+-.]*|_):[^\s]*$")
+_PREFIX_IRI = re.compile(r".*[:/\?#\[\]@]$")
+_IRI_LIKE_TERM = re.compile(r".*((:[^:])|/)")
+
+EMBED_FLAGS = {True: "@once", False: "@never", "@once": "@once", "@always": "@always", "@never": "@never"}
+
+
+class UnsupportedFrame(ValueError):
+    """The frame, its context or the data uses JSON-LD that `Framer` does
+    not compile; frame with pyld instead."""
+
+
+def _unescape(value: str) -> str:
+    return (
+        value.replace('\\"', '"')
+        .replace("\\t", "\t")
+        .replace("\\n", "\n")
+        .replace("\\r", "\r")
+        .replace("\\\\", "\\")
+    )
+
+
+def _is_numeric(value: str) -> bool:
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _literal(value: str, datatype: Optional[str], language: Optional[str]) -> Dict[str, Any]:
+    """Value object of a literal as pyld's from_rdf (with useNativeTypes)
+    and expansion produce it."""
+    if language is not None:
+        return {"@value": value, "@language": language.lower()}
+    datatype = datatype or XSD_STRING
+    if datatype == RDF_JSON:
+        raise UnsupportedFrame("JSON literal")
+    native: Any = value
+    if datatype == XSD_BOOLEAN:
+        if value == "true":
+            native = True
+        elif value == "false":
+            native = False
+    elif _is_numeric(value):
+        if datatype == XSD_INTEGER:
+            if value.isdigit():
+                native = int(value)
+        elif datatype == XSD_DOUBLE:
+            native = float(value)
+    if datatype in NATIVE_TYPES:
+        return {"@value": native}
+    return {"@value": native, "@type": datatype}
+
+
+def _value_key(value: Dict[str, Any]) -> Tuple:
+    # pyld's compare_values: equal @value (a bool never equals a number),
+    # @type and @language.
+    v = value["@value"]
+    return (type(v) is bool, v, value.get("@type"), value.get("@language"))
+
+
+def node_map(nt: str) -> Dict[str, Dict[str, Any]]:
+    """Flattened node map of N-Triples, keyed and labelled as pyld's framing
+    sees it: blank nodes renamed `_:b0`, `_:b1`, … in the order the
+    expanded from_rdf output reaches them, values deduplicated."""
+    seen: Set[Tuple] = set()
+    subjects: Dict[str, Dict[str, Any]] = {}
+    for line in nt.splitlines(True):
+        if _EMPTY.match(line):
+            continue
+        m = _QUAD.match(line)
+        if m is None:
+            raise UnsupportedFrame(f"line pyld cannot parse: {line.strip()[:200]}")
+        g = m.groups()
+        if g[8] is not None or g[9] is not None:
+            raise UnsupportedFrame("named graph")
+        s_iri = g[0] is not None
+        s = g[0] if s_iri else g[1]
+        p = g[2]
+        if g[3] is not None:
+            kind, o, datatype, language = "IRI", g[3], None, None
+        elif g[4] is not None:
+            kind, o, datatype, language = "blank node", g[4], None, None
+        else:
+            kind, o, datatype, language = "literal", _unescape(g[5]), g[6], g[7]
+            if language is None and datatype is None:
+                datatype = XSD_STRING
+        key = (s_iri, s, p, kind, o, datatype, language)
+        if key in seen:
+            continue
+        seen.add(key)
+
+        node = subjects.setdefault(s, {"@id": s})
+        if kind == "literal":
+            node.setdefault(p, []).append(_literal(o, datatype, language))
+        elif p == RDF_TYPE:
+            if o.startswith("_:"):
+                raise UnsupportedFrame("blank node type")
+            node.setdefault("@type", []).append(o)
+        else:
+            if o == RDF_NIL:
+                raise UnsupportedFrame("RDF list")
+            node.setdefault(p, []).append({"@id": o})
+
+    # Relabel blank nodes in the order pyld's node map creation meets them:
+    # subjects by original label, then their references, properties sorted.
+    labels: Dict[str, str] = {}
+
+    def relabel(id_: str) -> str:
+        if not id_.startswith("_:"):
+            return id_
+        if id_ not in labels:
+            labels[id_] = f"_:b{len(labels)}"
+        return labels[id_]
+
+    graph: Dict[str, Dict[str, Any]] = {}
+    for s in sorted(subjects):
+        source = subjects[s]
+        sid = relabel(s)
+        node = graph.setdefault(sid, {"@id": sid})
+        for prop in sorted(source):
+            if prop == "@id":
+                continue
+            values = source[prop]
+            if prop == "@type":
+                types = node.setdefault("@type", [])
+                for t in values:
+                    if t not in types:
+                        types.append(t)
+                continue
+            out = node.setdefault(prop, [])
+            keys = {("@id", v["@id"]) if "@id" in v else _value_key(v) for v in out}
+            for v in values:
+                if "@id" in v:
+                    rid = relabel(v["@id"])
+                    graph.setdefault(rid, {"@id": rid})
+                    v, key = {"@id": rid}, ("@id", rid)
+                else:
+                    key = _value_key(v)
+                if key not in keys:
+                    keys.add(key)
+                    out.append(v)
+    return graph
+
+
+class _Frame:
+    """One compiled frame: flags, @type filter and property subframes
+    (keyed by expanded IRI, in sorted order)."""
+
+    __slots__ = ("embed", "explicit", "types", "properties", "_implicit")
+
+    def __init__(self, embed: str, explicit: bool, types: Optional[List[str]], properties: Dict[str, "_Frame"]):
+        self.embed = embed
+        self.explicit = explicit
+        self.types = types
+        self.properties = properties
+        self._implicit: Optional[_Frame] = None
+
+    def implicit(self) -> "_Frame":
+        """Wildcard frame for properties this frame does not list; it
+        inherits this frame's flags."""
+        if self._implicit is None:
+            self._implicit = _Frame(self.embed, self.explicit, None, {})
+        return self._implicit
+
+    def matches(self, node: Dict[str, Any]) -> bool:
+        if self.types is not None:
+            node_types = node.get("@type", ())
+            return any(t in node_types for t in self.types)
+        if not self.properties:
+            return True
+        return any(p in node for p in self.properties)
+
+
+class _FrameState:
+    __slots__ = ("graph", "embeds", "stack", "bnodes")
+
+    def __init__(self, graph: Dict[str, Dict[str, Any]]):
+        self.graph = graph
+        self.embeds: Set[str] = set()
+        self.stack: List[str] = []
+        self.bnodes: Dict[str, List[Dict[str, Any]]] = {}
+
+
+class Framer:
+    """A JSON-LD frame compiled for framing N-Triples.
+
+    Construction raises `UnsupportedFrame` if the frame uses features that
+    are not compiled; so does `frame` for data outside the supported subset.
+    """
+
+    def __init__(self, frame: Dict[str, Any]):
+        context = frame.get("@context")
+        if not isinstance(context, dict) or not context:
+            raise UnsupportedFrame("frame needs an inline @context object")
+        self.context = context
+        self._mappings: Dict[str, Dict[str, Any]] = {}
+        self._vocab: Optional[str] = None
+        self._compile_context(context)
+        self._inverse = self._inverse_context()
+        self._term_iris = {m["@id"] for m in self._mappings.values()}
+        self._prefix_candidates = [
+            (term, m["@id"]) for term, m in self._mappings.items() if ":" not in term and m["@id"]
+        ]
+        self._prefix_terms = [term for term, m in self._mappings.items() if m["_prefix"]]
+        self._aliases = {kw: self._compact_iri(kw) for kw in ("@id", "@type", "@language", "@value", "@graph")}
+        if any(self._container(self._aliases[kw]) for kw in ("@id", "@type")):
+            raise UnsupportedFrame("container on a keyword alias")
+        self._term_cache: Dict[Tuple, str] = {}
+        self._value_cache: Dict[Tuple, Optional[Tuple[str, Any]]] = {}
+        self.root = self._compile_frame(frame, top=True)
+
+    # -- context ---------------------------------------------------------
+
+    def _compile_context(self, context: Dict[str, Any]) -> None:
+        for key in context:
+            if key.startswith("@") and key != "@vocab":
+                raise UnsupportedFrame(f"context keyword {key}")
+        if "@vocab" in context:
+            vocab = context["@vocab"]
+            if not isinstance(vocab, str) or not _ABSOLUTE_IRI.match(vocab):
+                raise UnsupportedFrame("@vocab must be an absolute IRI")
+            self._vocab = vocab
+        defined: Dict[str, bool] = {}
+        for term in context:
+            if term != "@vocab":
+                self._define(context, term, defined)
+
+    def _define(self, context: Dict[str, Any], term: str, defined: Dict[str, bool]) -> None:
+        if term in defined:
+            if defined[term]:
+                return
+            raise UnsupportedFrame(f"cyclic definition of {term}")
+        defined[term] = False
+        if not term or term.startswith("@"):
+            raise UnsupportedFrame(f"term {term!r}")
+
+        value = context[term]
+        simple = isinstance(value, str)
+        if simple:
+            value = {"@id": value}
+        if not isinstance(value, dict) or set(value) - {"@id", "@type", "@language", "@container"}:
+            raise UnsupportedFrame(f"definition of {term}")
+
+        mapping: Dict[str, Any] = {"_prefix": False}
+        colon = term.find(":")
+        if "@id" in value and value["@id"] != term:
+            id_ = value["@id"]
+            if not isinstance(id_, str) or (id_.startswith("@") and id_ not in KEYWORDS):
+                raise UnsupportedFrame(f"@id of {term}")
+            id_ = self._expand(id_, context, defined)
+            if id_ in ("@context", "@preserve") or not (id_ in KEYWORDS or _ABSOLUTE_IRI.match(id_)):
+                raise UnsupportedFrame(f"@id of {term}")
+            if _IRI_LIKE_TERM.match(term):
+                if self._expand(term, context, {**defined, term: True}) != id_:
+                    raise UnsupportedFrame(f"{term} does not expand to its @id")
+            mapping["@id"] = id_
+            mapping["_prefix"] = simple and colon <= 0 and bool(_PREFIX_IRI.match(id_))
+        elif colon > 0:
+            prefix = term[:colon]
+            if prefix in context:
+                self._define(context, prefix, defined)
+            if prefix in self._mappings:
+                mapping["@id"] = self._mappings[prefix]["@id"] + term[colon + 1:]
+            else:
+                mapping["@id"] = term
+        elif self._vocab is not None:
+            mapping["@id"] = self._vocab + term
+        else:
+            raise UnsupportedFrame(f"{term} has no @id")
+
+        if "@type" in value:
+            type_ = value["@type"]
+            if not isinstance(type_, str) or (type_.startswith("@") and type_ not in ("@id", "@vocab")):
+                raise UnsupportedFrame(f"@type of {term}")
+            if type_ not in ("@id", "@vocab"):
+                type_ = self._expand(type_, context, defined)
+                if not _ABSOLUTE_IRI.match(type_) or type_.startswith("_:"):
+                    raise UnsupportedFrame(f"@type of {term}")
+            mapping["@type"] = type_
+        if "@container" in value:
+            container = value["@container"]
+            if (container if isinstance(container, list) else [container]) != ["@set"]:
+                raise UnsupportedFrame(f"@container of {term}")
+            mapping["@container"] = ["@set"]
+        if "@language" in value and "@type" not in value:
+            language = value["@language"]
+            if language is not None and not isinstance(language, str):
+                raise UnsupportedFrame(f"@language of {term}")
+            mapping["@language"] = language.lower() if language is not None else None
+
+        self._mappings[term] = mapping
+        defined[term] = True
+
+    def _expand(self, value: str, context: Optional[Dict[str, Any]] = None, defined: Optional[Dict[str, bool]] = None) -> str:
+        """pyld's _expand_iri with vocab=True."""
+        if value in KEYWORDS:
+            return value
+        if value.startswith("@"):
+            raise UnsupportedFrame(f"keyword-like {value}")
+        if context is not None and value in context and defined.get(value) is not True:
+            self._define(context, value, defined)
+        if value in self._mappings:
+            return self._mappings[value]["@id"]
+        colon = value.find(":")
+        if colon > 0:
+            prefix, suffix = value.split(":", 1)
+            if prefix == "_" or suffix.startswith("//"):
+                return value
+            if context is not None and prefix in context and not defined.get(prefix):
+                self._define(context, prefix, defined)
+            mapping = self._mappings.get(prefix)
+            if mapping and mapping["_prefix"]:
+                return mapping["@id"] + suffix
+            if _ABSOLUTE_IRI.match(value):
+                return value
+        if self._vocab is not None:
+            return self._vocab + value
+        raise UnsupportedFrame(f"relative IRI {value}")
+
+    def _inverse_context(self) -> Dict[str, Dict[str, Dict[str, Dict[str, str]]]]:
+        inverse: Dict[str, Dict[str, Dict[str, Dict[str, str]]]] = {}
+        for term, mapping in sorted(self._mappings.items(), key=lambda kv: (len(kv[0]), kv[0])):
+            if not mapping["@id"]:
+                continue
+            container = "".join(sorted(mapping.get("@container", ["@none"])))
+            entry = inverse.setdefault(mapping["@id"], {}).setdefault(
+                container, {"@language": {}, "@type": {}, "@any": {}}
+            )
+            entry["@any"].setdefault("@none", term)
+            if "@type" in mapping:
+                entry["@type"].setdefault(mapping["@type"], term)
+            elif "@language" in mapping:
+                language = mapping["@language"]
+                entry["@language"].setdefault("@null" if language is None else language, term)
+            else:
+                entry["@language"].setdefault("@none", term)
+                entry["@type"].setdefault("@none", term)
+        return inverse
+
+    def _container(self, term: str) -> bool:
+        """Whether `term` has a @set container."""
+        mapping = self._mappings.get(term)
+        return bool(mapping and "@container" in mapping)
+
+    # -- frame -----------------------------------------------------------
+
+    def _compile_frame(self, frame: Any, *, top: bool = False) -> _Frame:
+        if isinstance(frame, list):
+            if len(frame) != 1:
+                raise UnsupportedFrame("frame must be a single object")
+            frame = frame[0]
+        if not isinstance(frame, dict):
+            raise UnsupportedFrame("frame must be an object")
+        embed, explicit, types = "@once", False, None
+        properties: Dict[str, _Frame] = {}
+        for key, value in frame.items():
+            if key == "@context" and top:
+                continue
+            expanded = self._expand(key)
+            if expanded == "@embed":
+                if value not in EMBED_FLAGS:
+                    raise UnsupportedFrame(f"@embed {value}")
+                embed = EMBED_FLAGS[value]
+            elif expanded == "@explicit":
+                if not isinstance(value, bool):
+                    raise UnsupportedFrame("@explicit must be a boolean")
+                explicit = value
+            elif expanded == "@type":
+                values = value if isinstance(value, list) else [value]
+                if not values or not all(isinstance(t, str) for t in values):
+                    raise UnsupportedFrame("@type must list IRIs")
+                types = [self._expand(t) for t in values]
+                if any(not _ABSOLUTE_IRI.match(t) or t.startswith("_:") for t in types):
+                    raise UnsupportedFrame("@type must list IRIs")
+            elif expanded in KEYWORDS:
+                raise UnsupportedFrame(f"frame keyword {expanded}")
+            elif expanded in properties:
+                raise UnsupportedFrame(f"{key} is framed twice")
+            else:
+                properties[expanded] = self._compile_frame(value)
+        return _Frame(embed, explicit, types, dict(sorted(properties.items())))
+
+    def _embed(
+        self, state: _FrameState, id_: str, frame: _Frame, parent: Any, prop: Optional[str],
+    ) -> None:
+        """pyld's _match_frame for one subject."""
+        node = state.graph[id_]
+        if not frame.matches(node):
+            return
+        output: Dict[str, Any] = {"@id": id_}
+        if id_.startswith("_:"):
+            state.bnodes.setdefault(id_, []).append(output)
+        if prop is None:
+            state.embeds = set()
+        elif (
+            frame.embed == "@never"
+            or id_ in state.stack[:-1]
+            or (frame.embed == "@once" and id_ in state.embeds)
+        ):
+            parent.setdefault(prop, []).append(output)
+            return
+        state.embeds.add(id_)
+        state.stack.append(id_)
+
+        for key in sorted(node):
+            values = node[key]
+            if key in KEYWORDS:
+                output[key] = values
+                continue
+            subframe = frame.properties.get(key)
+            if subframe is None:
+                if frame.explicit:
+                    continue
+                subframe = frame.implicit()
+            for value in values:
+                if "@id" in value:
+                    self._embed(state, value["@id"], subframe, output, key)
+                else:
+                    output.setdefault(key, []).append(value)
+
+        for key in frame.properties:
+            if key not in output:
+                output[key] = ["@null"]
+
+        if prop is None:
+            parent.append(output)
+        else:
+            parent.setdefault(prop, []).append(output)
+        state.stack.pop()
+
+    # -- compaction ------------------------------------------------------
+
+    def _id_is_term(self, id_: str) -> bool:
+        if id_ not in self._term_iris:
+            return False
+        term = self._compact_iri(id_, None, vocab=True)
+        mapping = self._mappings.get(term)
+        return bool(mapping) and mapping["@id"] == id_
+
+    def _select_term(self, iri: str, value: Any) -> Optional[str]:
+        """pyld's term selection for a value that is not a list, graph or
+        indexed, in a context without default language."""
+        is_object = isinstance(value, dict)
+        is_value = is_object and "@value" in value
+        containers: List[str] = []
+        if is_object and not is_value:
+            containers.extend(["@id", "@id@set", "@type", "@set@type"])
+        type_or_language, type_or_language_value = "@language", "@null"
+        if is_value:
+            if "@language" in value:
+                containers.extend(["@language", "@language@set"])
+                type_or_language_value = value["@language"]
+            elif "@type" in value:
+                type_or_language, type_or_language_value = "@type", value["@type"]
+        else:
+            type_or_language, type_or_language_value = "@type", "@id"
+        containers.extend(["@set", "@none"])
+        if is_object:
+            containers.extend(["@index", "@index@set"])
+        if is_value and len(value) == 1:
+            containers.extend(["@language", "@language@set"])
+
+        if type_or_language_value == "@id" and is_object and "@id" in value:
+            prefs = ["@vocab", "@id"] if self._id_is_term(value["@id"]) else ["@id", "@vocab"]
+        else:
+            prefs = [type_or_language_value]
+            if "_" in type_or_language_value:
+                prefs.append("_" + type_or_language_value.split("_")[-1])
+        prefs.append("@none")
+
+        container_map = self._inverse[iri]
+        for container in containers:
+            if container not in container_map:
+                continue
+            options = container_map[container][type_or_language]
+            for pref in prefs:
+                if pref in options:
+                    return options[pref]
+        return None
+
+    def _compact_iri(self, iri: str, value: Any = None, vocab: bool = False) -> str:
+        """pyld's _compact_iri, with an empty base."""
+        if iri in KEYWORDS:
+            alias = self._inverse.get(iri, {}).get("@none", {}).get("@type", {}).get("@none")
+            if alias:
+                return alias
+            vocab = True
+        if vocab and iri in self._inverse:
+            term = self._select_term(iri, value)
+            if term is not None:
+                return term
+        if vocab and self._vocab is not None:
+            if iri.startswith(self._vocab) and iri != self._vocab:
+                suffix = iri[len(self._vocab):]
+                if suffix not in self._mappings:
+                    return suffix
+        candidate = None
+        for term, term_iri in self._prefix_candidates:
+            if term_iri == iri or not iri.startswith(term_iri):
+                continue
+            curie = term + ":" + iri[len(term_iri):]
+            usable = (self._mappings[term]["_prefix"] and curie not in self._mappings) or (
+                value is None and self._mappings.get(curie, {}).get("@id") == iri
+            )
+            if usable and (candidate is None or (len(curie), curie) < (len(candidate), candidate)):
+                candidate = curie
+        if candidate is not None:
+            return candidate
+        for term in self._prefix_terms:
+            if iri.startswith(term + ":"):
+                raise UnsupportedFrame(f"IRI {iri} confused with prefix {term}")
+        return iri
+
+    def _property_term(self, iri: str, value: Any) -> str:
+        """Key under which `value` of property `iri` is compacted; cached by
+        the features of the value term selection looks at."""
+        if isinstance(value, dict):
+            if "@value" in value:
+                signature = ("value", value.get("@language"), value.get("@type"), len(value))
+            else:
+                signature = ("node", "@id" in value and self._id_is_term(value["@id"]))
+        else:
+            signature = ("null",)
+        key = (iri, signature)
+        term = self._term_cache.get(key)
+        if term is None:
+            term = self._term_cache[key] = self._compact_iri(iri, value, vocab=True)
+        return term
+
+    def _compact_value(self, term: str, value: Dict[str, Any]) -> Any:
+        """pyld's _compact_value for a value object: the bare @value where
+        the term's @type or @language matches, else an object."""
+        key = (term, value.get("@type"), value.get("@language"), len(value))
+        if key in self._value_cache:
+            plan = self._value_cache[key]
+        else:
+            mapping = self._mappings.get(term) or {}
+            if ("@type" in value and value["@type"] == mapping.get("@type")) or (
+                "@language" in value and value["@language"] == mapping.get("@language")
+            ) or len(value) == 1:
+                plan = None
+            elif "@type" in value:
+                plan = (self._aliases["@type"], self._compact_iri(value["@type"], None, vocab=True))
+            else:
+                plan = (self._aliases["@language"], value["@language"])
+            self._value_cache[key] = plan
+        if plan is None:
+            return value["@value"]
+        return {plan[0]: plan[1], self._aliases["@value"]: value["@value"]}
+
+    def _compact_item(self, term: str, item: Any) -> Any:
+        if not isinstance(item, dict):
+            return item
+        if "@value" in item:
+            return self._compact_value(term, item)
+        if len(item) == 1 and "@id" in item:
+            type_ = (self._mappings.get(term) or {}).get("@type")
+            compacted = self._compact_iri(item["@id"], None, vocab=type_ == "@vocab")
+            if type_ in ("@id", "@vocab"):
+                return compacted
+            return {self._aliases["@id"]: compacted}
+        return self._compact_node(item)
+
+    def _compact_node(self, element: Dict[str, Any]) -> Dict[str, Any]:
+        rval: Dict[str, Any] = {}
+        for key in sorted(element):
+            values = element[key]
+            if key == "@id":
+                rval[self._aliases["@id"]] = self._compact_iri(values)
+                continue
+            if key == "@type":
+                types = [self._compact_iri(t, None, vocab=True) for t in values]
+                rval[self._aliases["@type"]] = types[0] if len(types) == 1 else types
+                continue
+            for item in values:
+                term = self._property_term(key, item)
+                compacted = self._compact_item(term, item)
+                if term in rval:
+                    existing = rval[term]
+                    if not isinstance(existing, list):
+                        existing = rval[term] = [existing]
+                    existing.append(compacted)
+                else:
+                    rval[term] = [compacted] if self._container(term) else compacted
+        return rval
+
+    @classmethod
+    def _cleanup_null(cls, value: Any) -> Any:
+        if isinstance(value, list):
+            cleaned = (cls._cleanup_null(v) for v in value)
+            return [v for v in cleaned if v is not None]
+        if isinstance(value, dict):
+            for k, v in value.items():
+                value[k] = cls._cleanup_null(v)
+            return value
+        return None if value == "@null" else value
+
+    # -- entry point -----------------------------------------------------
+
+    def frame(self, nt: str) -> Dict[str, Any]:
+        """Frame N-Triples; the same document as
+        `jsonld.frame(jsonld.from_rdf(nt, {"useNativeTypes": True}), frame)`."""
+        graph = node_map(nt)
+        state = _FrameState(graph)
+        framed: List[Dict[str, Any]] = []
+        for id_ in sorted(graph):
+            self._embed(state, id_, self.root, framed, None)
+        for outputs in state.bnodes.values():
+            if len(outputs) == 1:
+                outputs[0].pop("@id")
+
+        compacted = [self._cleanup_null(self._compact_node(node)) for node in framed]
+        document: Dict[str, Any] = {"@context": copy.deepcopy(self.context)}
+        if len(compacted) == 1:
+            document.update(compacted[0])
+        elif compacted:
+            document[self._aliases["@graph"]] = compacted
+        return document
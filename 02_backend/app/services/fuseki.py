@@ -1,5 +1,5 @@
 import logging
-from typing import Optional, Tuple
+from typing import IO, Iterable, Iterator, List, Optional, Tuple, Union
 
 import requests
 
@@ -35,23 +35,15 @@ def query_url() -> str:
     return f"{FUSEKI_URL}/{FUSEKI_DATASET_NAME}/sparql"
 
 
-def replace_subject_in_graph(
+def _replace_subject_update(
     graph_uri: str,
     subject_uri: str,
     triples_nt: str,
     *,
     alias_uri: Optional[str] = None,
     alias_replace: Optional[bool] = False,
-    session: Optional[requests.Session] = None,
-    timeout: int = 60,
-) -> bool:
-    """DELETE the subject + up to 3 levels of blank-node descendants in <graph_uri>,
-    plus each elm:learningOpportunity instance the subject points to and its own
-    3 levels of blank-node descendants; then INSERT the provided N-Triples in the
-    same graph, in a single SPARQL Update.
-
-    Returns True on success.
-    """
+) -> str:
+    """Build the DELETE/INSERT DATA update used by `replace_subject_in_graph`."""
 
     if alias_uri and alias_uri != subject_uri:
         alias_nt = f"<{alias_uri}> owl:sameAs <{subject_uri}> ."
@@ -65,7 +57,7 @@ def replace_subject_in_graph(
         alias_delete = ""
         alias_where = ""
 
-    sparql = f"""
+    return f"""
 PREFIX owl: <{OWL}>
 PREFIX elm: <{ELM}>
 
@@ -127,14 +119,46 @@ INSERT DATA {{
   }}
 }}
 """
+
+
+def _post_update(
+    sparql: str,
+    *,
+    session: Optional[requests.Session] = None,
+    timeout: int = 60,
+) -> requests.Response:
     http = session or requests
-    response = http.post(
+    return http.post(
         _update_url(),
-        data=sparql,
-        headers={"Content-Type": "application/sparql-update"},
+        data=sparql.encode("utf-8"),
+        headers={"Content-Type": "application/sparql-update; charset=utf-8"},
         auth=fuseki_auth(),
         timeout=timeout,
     )
+
+
+def replace_subject_in_graph(
+    graph_uri: str,
+    subject_uri: str,
+    triples_nt: str,
+    *,
+    alias_uri: Optional[str] = None,
+    alias_replace: Optional[bool] = False,
+    session: Optional[requests.Session] = None,
+    timeout: int = 60,
+) -> bool:
+    """DELETE the subject + up to 3 levels of blank-node descendants in <graph_uri>,
+    plus each elm:learningOpportunity instance the subject points to and its own
+    3 levels of blank-node descendants; then INSERT the provided N-Triples in the
+    same graph, in a single SPARQL Update.
+
+    Returns True on success.
+    """
+    sparql = _replace_subject_update(
+        graph_uri, subject_uri, triples_nt,
+        alias_uri=alias_uri, alias_replace=alias_replace,
+    )
+    response = _post_update(sparql, session=session, timeout=timeout)
     if response.status_code not in (200, 204):
         logger.error(
             "SPARQL update failed for <%s> in <%s>: %s %s",
@@ -144,32 +168,205 @@ INSERT DATA {{
     return True
 
 
-def upload_turtle(
+def replace_subjects_in_graph(
     graph_uri: str,
-    turtle: str,
+    items: Iterable[Tuple[str, str, Optional[str]]],
     *,
+    alias_replace: Optional[bool] = False,
+    batch_size: int = 100,
     session: Optional[requests.Session] = None,
-    timeout: int = 60,
+    timeout: int = 300,
+) -> Tuple[int, int]:
+    """Batched `replace_subject_in_graph`.
+
+    `items` yields (subject_uri, triples_nt, alias_uri) tuples; up to
+    `batch_size` replacements are sent as one SPARQL Update request (one
+    transaction in Fuseki). Returns (succeeded, failed) subject counts — a
+    rejected request counts its whole batch as failed.
+    """
+    succeeded = failed = 0
+    batch: List[Tuple[str, str, Optional[str]]] = []
+
+    def _flush() -> None:
+        nonlocal succeeded, failed
+        if not batch:
+            return
+        sparql = " ;\n".join(
+            _replace_subject_update(
+                graph_uri, subject_uri, triples_nt,
+                alias_uri=alias_uri, alias_replace=alias_replace,
+            )
+            for subject_uri, triples_nt, alias_uri in batch
+        )
+        try:
+            response = _post_update(sparql, session=session, timeout=timeout)
+            ok = response.status_code in (200, 204)
+            if not ok:
+                logger.error(
+                    "Batched SPARQL update of %s subject(s) in <%s> failed: %s %s",
+                    len(batch), graph_uri, response.status_code, response.text[:200],
+                )
+        except requests.RequestException as e:
+            ok = False
+            logger.error(
+                "Batched SPARQL update of %s subject(s) in <%s> failed: %s",
+                len(batch), graph_uri, e,
+            )
+        if ok:
+            succeeded += len(batch)
+        else:
+            failed += len(batch)
+        batch.clear()
+
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            _flush()
+    _flush()
+    return succeeded, failed
+
+
+def drop_graph(
+    graph_uri: str, *, session: Optional[requests.Session] = None, timeout: int = 300,
 ) -> bool:
-    """POST Turtle to the /data endpoint, adding to the named graph contents."""
+    """DROP SILENT a named graph. Returns True on success."""
+    return drop_graphs([graph_uri], session=session, timeout=timeout)
+
+
+def drop_graphs(
+    graph_uris: Iterable[str], *, session: Optional[requests.Session] = None, timeout: int = 300,
+) -> bool:
+    """DROP SILENT several named graphs in one update request."""
+    graph_uris = list(graph_uris)
+    if not graph_uris:
+        return True
+    sparql = " ;\n".join(f"DROP SILENT GRAPH <{g}>" for g in graph_uris)
+    response = _post_update(sparql, session=session, timeout=timeout)
+    if response.status_code not in (200, 204):
+        logger.error(
+            "Dropping %s graph(s) (<%s>...) failed: %s %s",
+            len(graph_uris), graph_uris[0], response.status_code, response.text[:200],
+        )
+        return False
+    return True
+
+
+def move_graph(
+    source_uri: str,
+    target_uri: str,
+    *,
+    session: Optional[requests.Session] = None,
+    timeout: int = 600,
+) -> bool:
+    """MOVE one named graph onto another in a single update (the target's
+    previous content is dropped). Used to swap a fully built shadow graph in.
+    """
+    response = _post_update(
+        f"MOVE SILENT GRAPH <{source_uri}> TO GRAPH <{target_uri}>",
+        session=session, timeout=timeout,
+    )
+    if response.status_code not in (200, 204):
+        logger.error(
+            "Moving <%s> to <%s> failed: %s %s",
+            source_uri, target_uri, response.status_code, response.text[:200],
+        )
+        return False
+    return True
+
+
+def store_graph(
+    graph_uri: str,
+    data: Union[bytes, str, Iterable[bytes], IO[bytes]],
+    *,
+    replace: bool = False,
+    content_type: str = "application/n-triples",
+    session: Optional[requests.Session] = None,
+    timeout: int = 600,
+) -> bool:
+    """Graph Store Protocol upload to a named graph.
+
+    POST adds to the graph; with `replace=True` a PUT swaps the graph's whole
+    content in one request. `data` may be a generator or file object, in which
+    case requests streams it with chunked transfer encoding.
+    """
     http = session or requests
-    response = http.post(
+    method = http.put if replace else http.post
+    response = method(
         _data_url(),
         params={"graph": graph_uri},
-        data=turtle.encode("utf-8") if isinstance(turtle, str) else turtle,
-        headers={"Content-Type": "text/turtle; charset=utf-8"},
+        data=data.encode("utf-8") if isinstance(data, str) else data,
+        headers={"Content-Type": f"{content_type}; charset=utf-8"},
         auth=fuseki_auth(),
         timeout=timeout,
     )
     if response.status_code not in (200, 201, 204):
         logger.error(
-            "Turtle upload to <%s> failed: %s %s",
+            "Graph store %s to <%s> failed: %s %s",
+            "PUT" if replace else "POST",
             graph_uri, response.status_code, response.text[:200],
         )
         return False
     return True
 
 
+def ntriples_to_nquads(nt: Union[bytes, str], graph_uri: str) -> Iterator[bytes]:
+    """Turn N-Triples into N-Quads lines placed in `graph_uri`, for
+    `store_dataset` or an offline `tdb2.tdbloader` input."""
+    if isinstance(nt, str):
+        nt = nt.encode("utf-8")
+    suffix = f" <{graph_uri}> .\n".encode("utf-8")
+    for line in nt.splitlines():
+        line = line.strip()
+        if line and not line.startswith(b"#") and line.endswith(b"."):
+            yield line[:-1].rstrip() + suffix
+
+
+def store_dataset(
+    data: Union[bytes, Iterable[bytes], IO[bytes]],
+    *,
+    content_type: str = "application/n-quads",
+    session: Optional[requests.Session] = None,
+    timeout: int = 1800,
+) -> bool:
+    """POST quads to the dataset's Graph Store endpoint; each quad lands in the
+    named graph it names. Adds only — drop the target graphs first to replace.
+    """
+    http = session or requests
+    response = http.post(
+        _data_url(),
+        data=data,
+        headers={"Content-Type": f"{content_type}; charset=utf-8"},
+        auth=fuseki_auth(),
+        timeout=timeout,
+    )
+    if response.status_code not in (200, 201, 204):
+        logger.error(
+            "Dataset load failed: %s %s", response.status_code, response.text[:200],
+        )
+        return False
+    return True
+
+
+def fetch_graph(
+    graph_uri: str, *, session: Optional[requests.Session] = None, timeout: int = 300,
+) -> Optional[bytes]:
+    """GET a named graph's content as N-Triples (None on error)."""
+    http = session or requests
+    try:
+        response = http.get(
+            _data_url(),
+            params={"graph": graph_uri},
+            headers={"Accept": "application/n-triples"},
+            auth=fuseki_auth(),
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        return response.content
+    except Exception as e:
+        logger.warning("Fetching graph <%s> failed: %s", graph_uri, e)
+        return None
+
+
 def sparql_select(query: str, *, session: Optional[requests.Session] = None, timeout: int = 30) -> list:
     """Run a SPARQL SELECT query and return the bindings list (empty on error)."""
     http = session or requests
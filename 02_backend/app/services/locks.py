@@ -10,7 +10,7 @@ explicitly; connection death is the belt-and-braces backstop.
 
 import logging
 from contextlib import contextmanager
-from typing import Iterator
+from typing import Iterable, Iterator, Set, Tuple
 
 from sqlalchemy import text
 from sqlalchemy.orm import Session
@@ -100,3 +100,31 @@ def is_locked(db: Session, namespace: int, key: str) -> bool:
         {"ns": namespace, "key": key},
     ).fetchone()
     return bool(row and row[0])
+
+
+def locked_keys(db: Session, keys: Iterable[Tuple[int, str]]) -> Set[Tuple[int, str]]:
+    """The subset of (namespace, key) pairs whose advisory lock is currently
+    held by any session — `is_locked` for many keys with a single scan of
+    pg_locks.
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return set()
+    rows = db.execute(
+        text("""
+            WITH held AS MATERIALIZED (
+                SELECT classid, objid FROM pg_locks
+                WHERE locktype = 'advisory'
+                  AND objsubid = 2
+            )
+            SELECT k.ns, k.key
+            FROM unnest(CAST(:ns AS int[]), CAST(:keys AS text[])) AS k(ns, key)
+            WHERE EXISTS (
+                SELECT 1 FROM held
+                WHERE held.classid = k.ns
+                  AND held.objid = hashtext(k.key)::int
+            )
+        """),
+        {"ns": [ns for ns, _ in keys], "keys": [key for _, key in keys]},
+    ).fetchall()
+    return {(row[0], row[1]) for row in rows}
@@ -20,6 +20,7 @@ import uuid as uuid_lib
 from datetime import date
 
 from services.locks import NS_PULL_MANIFEST, advisory_lock
+from services.providers import refresh_provider_summary
 
 logger = logging.getLogger(__name__)
 
@@ -148,6 +149,9 @@ def pull_manifest(provider_uuid: str, metadata: Dict, db: Session) -> Dict[str,
         {"manifest_json": json.dumps(test_combinations), "provider_uuid": str(provider_uuid)},
     )
 
+    if new_source_version_created:
+        refresh_provider_summary(db, provider_uuid)
+
     db.commit()
 
     return {
@@ -216,10 +220,73 @@ def _normalise_source_auth(
     return source_auth
 
 
+def _source_keys(source_id: Optional[str], path: Optional[str], source_type: Optional[str]) -> List[Tuple[str, ...]]:
+    """Natural keys identifying a source across manifest versions, strongest
+    first: the manifest `id`, then type plus normalised path (scheme and host
+    lower-cased, trailing slash and fragment dropped)."""
+    keys: List[Tuple[str, ...]] = []
+    if source_id not in (None, ""):
+        keys.append(("id", str(source_id).strip()))
+    if path and source_type:
+        parsed = urlparse(str(path).strip())
+        normalised = parsed._replace(
+            scheme=parsed.scheme.lower(),
+            netloc=parsed.netloc.lower(),
+            path=parsed.path.rstrip("/"),
+            fragment="",
+        ).geturl()
+        keys.append(("path", str(source_type).strip().lower(), normalised))
+    return keys
+
+
+def _match_source_uuids(db: Session, provider_uuid: str, sources: List[Dict]) -> List[str]:
+    """A source_uuid per manifest source: the UUID of the provider's existing
+    source with the same natural key (see `_source_keys`) — preferring the
+    most recent version — or a fresh one. Each existing UUID is used at most
+    once, so bronze lineage, the ledger and last-pushed state survive
+    reordering and unrelated edits of the manifest."""
+    rows = db.execute(
+        text("""
+            SELECT s.source_uuid, s.source_id, s.source_path, s.source_type
+            FROM source s
+            JOIN source_version sv ON sv.source_version_uuid = s.source_version_uuid
+            WHERE sv.provider_uuid = :provider_uuid
+            ORDER BY sv.version_date DESC, sv.version_id DESC
+        """),
+        {"provider_uuid": provider_uuid},
+    ).fetchall()
+
+    existing: Dict[Tuple[str, ...], str] = {}
+    for row in rows:
+        for key in _source_keys(row[1], row[2], row[3]):
+            existing.setdefault(key, str(row[0]))
+
+    taken: set = set()
+    matched: List[Optional[str]] = [None] * len(sources)
+    # Match by id for every source first, so an id match is never lost to
+    # another source that only shares the path.
+    for rank in ("id", "path"):
+        for i, source in enumerate(sources):
+            if matched[i] is not None or not isinstance(source, dict):
+                continue
+            for key in _source_keys(source.get("id"), source.get("path"), source.get("type")):
+                if key[0] != rank:
+                    continue
+                candidate = existing.get(key)
+                if candidate and candidate not in taken:
+                    matched[i] = candidate
+                    taken.add(candidate)
+    return [uuid or str(uuid_lib.uuid4()) for uuid in matched]
+
+
 def process_manifest(provider_uuid: str, manifest_data: Dict, db: Session) -> Tuple[bool, bool]:
     """
     Process manifest_data and update DB accordingly
 
+    Sources keep their source_uuid across versions when they can be matched
+    to an earlier one (see `_match_source_uuids`); their row is moved to the
+    new version rather than replaced.
+
     Return: has a valid list of sources?, new version created?
     """
     sources_processed = False
@@ -249,8 +316,8 @@ def process_manifest(provider_uuid: str, manifest_data: Dict, db: Session) -> Tu
                     version_id = latest_version[2] + 1
 
                 source_uuid_json = [
-                    {**source, "source_uuid": str(uuid_lib.uuid4())}
-                    for source in sources
+                    {**source, "source_uuid": source_uuid}
+                    for source, source_uuid in zip(sources, _match_source_uuids(db, provider_uuid, sources))
                 ]
 
                 new_version_result = db.execute(
@@ -304,10 +371,36 @@ def process_manifest(provider_uuid: str, manifest_data: Dict, db: Session) -> Tu
                             (source_uuid, source_version_uuid, source_id, source_path, source_type, source_version, source_name, source_refresh, source_auth, source_headers, source_parameters, source_other)
                             VALUES
                             (:source_uuid, :source_version_uuid, :source_id, :source_path, :source_type, :source_version, :source_name, :source_refresh, CAST(:source_auth AS jsonb), CAST(:source_headers AS jsonb), CAST(:source_parameters AS jsonb), CAST(:source_other AS jsonb) )
+                            ON CONFLICT (source_uuid) DO UPDATE SET
+                                source_version_uuid = EXCLUDED.source_version_uuid,
+                                source_id = EXCLUDED.source_id,
+                                source_path = EXCLUDED.source_path,
+                                source_type = EXCLUDED.source_type,
+                                source_version = EXCLUDED.source_version,
+                                source_name = EXCLUDED.source_name,
+                                source_refresh = EXCLUDED.source_refresh,
+                                source_auth = EXCLUDED.source_auth,
+                                source_headers = EXCLUDED.source_headers,
+                                source_parameters = EXCLUDED.source_parameters,
+                                source_other = EXCLUDED.source_other,
+                                updated_at = NOW()
                         """),
                         source_records,
                     )
 
+                db.execute(
+                    text("""
+                        UPDATE provider
+                        SET has_sources = EXISTS (
+                            SELECT 1 FROM source_version sv
+                            JOIN source s ON s.source_version_uuid = sv.source_version_uuid
+                            WHERE sv.provider_uuid = provider.provider_uuid
+                        )
+                        WHERE provider_uuid = :provider_uuid
+                    """),
+                    {"provider_uuid": provider_uuid},
+                )
+
                 new_source_version_created = True
 
     return sources_processed, new_source_version_created
@@ -0,0 +1,139 @@
+"""Minimal Meilisearch client.
+
+Writes are asynchronous on the Meilisearch side: a request returns the uid
+of an enqueued task, not a result. `wait_for_task` polls a task until it
+has been processed.
+"""
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+
+from config import MEILISEARCH_API_KEY, MEILISEARCH_INDEX, MEILISEARCH_URL
+
+logger = logging.getLogger(__name__)
+
+# Documents per add/delete request.
+BATCH_SIZE = 500
+
+TASK_POLL_SECONDS = 0.5
+
+
+class MeilisearchError(RuntimeError):
+    pass
+
+
+def documents_url(index: Optional[str] = None) -> str:
+    return f"{MEILISEARCH_URL}/indexes/{index or MEILISEARCH_INDEX}/documents"
+
+
+def headers() -> Dict[str, str]:
+    headers = {"Content-Type": "application/json"}
+    if MEILISEARCH_API_KEY:
+        headers["Authorization"] = f"Bearer {MEILISEARCH_API_KEY}"
+    return headers
+
+
+def _enqueue(
+    session: requests.Session, method: str, url: str, *, json: Any = None, timeout: int = 60,
+) -> int:
+    """Send a write request and return the uid of the task it enqueued."""
+    r = session.request(method, url, headers=headers(), json=json, timeout=timeout)
+    r.raise_for_status()
+    return r.json()["taskUid"]
+
+
+def add_documents(
+    session: requests.Session,
+    documents: List[Dict[str, Any]],
+    *,
+    index: Optional[str] = None,
+    timeout: int = 60,
+) -> Optional[int]:
+    """Add or replace documents (by `id`) in one request. Returns the task
+    uid, or None if the request failed."""
+    if not documents:
+        return None
+    try:
+        return _enqueue(session, "POST", documents_url(index), json=documents, timeout=timeout)
+    except Exception as e:
+        logger.warning("Meilisearch upload of %s document(s) failed: %s", len(documents), e)
+        return None
+
+
+def delete_documents(
+    session: requests.Session,
+    ids: Iterable[str],
+    *,
+    index: Optional[str] = None,
+    timeout: int = 60,
+) -> Optional[int]:
+    """Delete documents by id in one request. Returns the task uid, or None
+    if the request failed."""
+    ids = list(ids)
+    if not ids:
+        return None
+    try:
+        return _enqueue(session, "POST", f"{documents_url(index)}/delete-batch", json=ids, timeout=timeout)
+    except Exception as e:
+        logger.warning("Meilisearch delete of %s document(s) failed: %s", len(ids), e)
+        return None
+
+
+def wait_for_task(session: requests.Session, task_uid: int, *, timeout: float = 3600) -> Dict[str, Any]:
+    """Poll a task until it succeeded; raise MeilisearchError if it failed,
+    was canceled, or is still pending after `timeout` seconds."""
+    deadline = time.monotonic() + timeout
+    while True:
+        r = session.get(f"{MEILISEARCH_URL}/tasks/{task_uid}", headers=headers(), timeout=30)
+        r.raise_for_status()
+        task = r.json()
+        if task["status"] == "succeeded":
+            return task
+        if task["status"] in ("failed", "canceled"):
+            error = (task.get("error") or {}).get("message") or task["status"]
+            raise MeilisearchError(f"task {task_uid} ({task.get('type')}) {task['status']}: {error}")
+        if time.monotonic() > deadline:
+            raise MeilisearchError(f"task {task_uid} still {task['status']} after {timeout}s")
+        time.sleep(TASK_POLL_SECONDS)
+
+
+def get_index(session: requests.Session, index: str) -> Optional[Dict[str, Any]]:
+    r = session.get(f"{MEILISEARCH_URL}/indexes/{index}", headers=headers(), timeout=30)
+    if r.status_code == 404:
+        return None
+    r.raise_for_status()
+    return r.json()
+
+
+def create_index(session: requests.Session, index: str, *, primary_key: str = "id") -> None:
+    wait_for_task(session, _enqueue(
+        session, "POST", f"{MEILISEARCH_URL}/indexes", json={"uid": index, "primaryKey": primary_key},
+    ))
+
+
+def delete_index(session: requests.Session, index: str) -> None:
+    """Delete an index; a missing index is not an error."""
+    if get_index(session, index) is None:
+        return
+    wait_for_task(session, _enqueue(session, "DELETE", f"{MEILISEARCH_URL}/indexes/{index}"))
+
+
+def get_settings(session: requests.Session, index: str) -> Dict[str, Any]:
+    r = session.get(f"{MEILISEARCH_URL}/indexes/{index}/settings", headers=headers(), timeout=30)
+    r.raise_for_status()
+    return r.json()
+
+
+def update_settings(session: requests.Session, index: str, settings: Dict[str, Any]) -> None:
+    wait_for_task(session, _enqueue(
+        session, "PATCH", f"{MEILISEARCH_URL}/indexes/{index}/settings", json=settings,
+    ))
+
+
+def swap_indexes(session: requests.Session, index_a: str, index_b: str) -> None:
+    """Atomically exchange the contents of two existing indexes."""
+    wait_for_task(session, _enqueue(
+        session, "POST", f"{MEILISEARCH_URL}/swap-indexes", json=[{"indexes": [index_a, index_b]}],
+    ))
@@ -1,10 +1,49 @@
-from typing import Any, Dict, Optional
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import UUID
 
 from fastapi import HTTPException, status
 from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from config import PROVIDER_COUNT_EXACT_LIMIT
+
+
+def _encode_cursor(values: List[Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        values = None
+    if not isinstance(values, list) or len(values) != 2:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return values
+
+
+def _count_providers(db: Session, where_clause: str, params: dict) -> Tuple[int, bool]:
+    """Number of providers matching `where_clause`, and whether it is an
+    estimate: counted exactly up to PROVIDER_COUNT_EXACT_LIMIT, past that
+    taken from the planner's row estimate."""
+    capped = db.execute(
+        text(f"SELECT COUNT(*) FROM (SELECT 1 FROM provider {where_clause} LIMIT :count_limit) t"),
+        {**params, "count_limit": PROVIDER_COUNT_EXACT_LIMIT + 1},
+    ).scalar() or 0
+    if capped <= PROVIDER_COUNT_EXACT_LIMIT:
+        return capped, False
+
+    plan = db.execute(
+        text(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM provider {where_clause}"), params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    estimate = int(plan[0]["Plan"]["Plan Rows"])
+    return max(estimate, capped), True
+
 
 def list_providers(
     db: Session,
@@ -12,48 +51,99 @@ def list_providers(
     with_data: bool = False,
     page: int = 1,
     page_size: int = 10,
+    cursor: Optional[str] = None,
 ) -> Dict[str, Any]:
+    """
+    List providers, optionally filtered by a search term and to those with sources.
+
+    A search matches names by substring or trigram word similarity, and ETER
+    and DEQAR ids by prefix; results are ranked with id matches first, then
+    by similarity. Without a search, providers are ordered by ETER id.
+
+    Pages by OFFSET from `page`, or by keyset when `cursor` is given: the
+    `next_cursor` of the previous page, which costs the same however deep.
+    `total` is exact up to PROVIDER_COUNT_EXACT_LIMIT and an estimate beyond
+    it (`total_approximate`).
+    """
     clauses = []
     params: dict = {}
 
     if search:
         clauses.append(
-            "(name_concat ILIKE :search_term OR eter_id LIKE :search_id OR deqar_id LIKE :search_id)"
+            "(name_concat ILIKE :search_term OR :search <% name_concat "
+            "OR eter_id LIKE :search_id OR deqar_id LIKE :search_id)"
         )
+        params["search"] = search
         params["search_term"] = f"%{search.lower()}%"
         params["search_id"] = f"{search.upper()}%"
 
     if with_data:
-        clauses.append(
-            "EXISTS (SELECT 1 FROM source_version sv "
-            "JOIN source s ON s.source_version_uuid = sv.source_version_uuid "
-            "WHERE sv.provider_uuid = provider.provider_uuid)"
-        )
+        clauses.append("has_sources")
 
     where_clause = f"WHERE {' AND '.join(clauses)}" if clauses else ""
 
-    total_records = db.execute(
-        text(f"SELECT COUNT(*) FROM provider {where_clause}"), params
-    ).scalar() or 0
+    total_records, total_approximate = _count_providers(db, where_clause, params)
     total_pages = (total_records + page_size - 1) // page_size
 
+    if search:
+        sort_key = (
+            "CAST((CASE WHEN eter_id LIKE :search_id OR deqar_id LIKE :search_id THEN 1 ELSE 0 END)"
+            " + COALESCE(word_similarity(:search, name_concat), 0) AS real)"
+        )
+        order_by = "sort_key DESC, provider_uuid"
+        keyset = (
+            "(sort_key < CAST(:after_key AS real)"
+            " OR (sort_key = CAST(:after_key AS real) AND provider_uuid > :after_uuid))"
+        )
+    else:
+        sort_key = "eter_id"
+        order_by = "eter_id, provider_uuid"
+        keyset = "(eter_id, provider_uuid) > (:after_key, :after_uuid)"
+
     params["limit"] = page_size
-    params["offset"] = (page - 1) * page_size
+    selected = f"""
+        SELECT provider_uuid, deqar_id, eter_id, provider_name,
+               last_manifest_pull, has_sources, {sort_key} AS sort_key
+        FROM provider
+        {where_clause}
+    """
 
-    rows = db.execute(
-        text(f"""
-            SELECT provider_uuid, deqar_id, eter_id, provider_name,
-                   last_manifest_pull,
-                   EXISTS (SELECT 1 FROM source_version sv
-                           JOIN source s ON s.source_version_uuid = sv.source_version_uuid
-                           WHERE sv.provider_uuid = provider.provider_uuid) AS has_sources
-            FROM provider
-            {where_clause}
-            ORDER BY eter_id
-            LIMIT :limit OFFSET :offset
-        """),
-        params,
-    ).fetchall()
+    if not cursor:
+        params["offset"] = (page - 1) * page_size
+        query = f"SELECT * FROM ({selected}) p ORDER BY {order_by} LIMIT :limit OFFSET :offset"
+    else:
+        after_key, after_uuid = _decode_cursor(cursor)
+        params["after_uuid"] = after_uuid
+        if after_key is not None:
+            params["after_key"] = after_key
+        if search:
+            query = f"SELECT * FROM ({selected}) p WHERE {keyset} ORDER BY {order_by} LIMIT :limit"
+        elif after_key is None:
+            query = (
+                f"SELECT * FROM ({selected}) p WHERE eter_id IS NULL AND provider_uuid > :after_uuid "
+                "ORDER BY provider_uuid LIMIT :limit"
+            )
+        else:
+            # ETER ids sort NULLS LAST: the page continues the ETER id range
+            # and then the providers without one. Two ranges rather than an
+            # OR, which would keep either from using the index.
+            query = f"""
+                SELECT * FROM (
+                    (SELECT * FROM ({selected}) p WHERE {keyset}
+                     ORDER BY {order_by} LIMIT :limit)
+                    UNION ALL
+                    (SELECT * FROM ({selected}) p WHERE eter_id IS NULL
+                     ORDER BY provider_uuid LIMIT :limit)
+                ) p
+                ORDER BY {order_by}
+                LIMIT :limit
+            """
+
+    rows = db.execute(text(query), params).fetchall()
+
+    next_cursor = None
+    if len(rows) == page_size:
+        next_cursor = _encode_cursor([rows[-1][6], str(rows[-1][0])])
 
     return {
         "response": [
@@ -68,9 +158,11 @@ def list_providers(
             for row in rows
         ],
         "total": total_records,
+        "total_approximate": total_approximate,
         "page": page,
         "page_size": page_size,
         "total_pages": total_pages,
+        "next_cursor": next_cursor,
     }
 
 
@@ -78,7 +170,8 @@ def get_provider(db: Session, provider_uuid: UUID) -> Dict[str, Any]:
     provider_result = db.execute(
         text("""
             SELECT provider_uuid, deqar_id, eter_id, metadata, manifest_json, name_concat,
-                   provider_name, last_deqar_pull, last_manifest_pull, created_at, updated_at
+                   provider_name, last_deqar_pull, last_manifest_pull, created_at, updated_at,
+                   course_count
             FROM provider
             WHERE provider_uuid = :provider_uuid
         """),
@@ -113,6 +206,7 @@ def get_provider(db: Session, provider_uuid: UUID) -> Dict[str, Any]:
             "last_manifest_pull": provider_result[8].isoformat() if provider_result[8] else None,
             "created_at": provider_result[9].isoformat() if provider_result[9] else None,
             "updated_at": provider_result[10].isoformat() if provider_result[10] else None,
+            "course_count": provider_result[11],
         },
         "source_version": None,
         "sources": [],
@@ -155,6 +249,176 @@ def get_provider(db: Session, provider_uuid: UUID) -> Dict[str, Any]:
     return response
 
 
+async def list_providers_async(
+    db: AsyncSession,
+    search: Optional[str] = None,
+    with_data: bool = False,
+    page: int = 1,
+    page_size: int = 10,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """`list_providers` on an AsyncSession: the same queries, awaited on
+    asyncpg instead of blocking the event loop."""
+    return await db.run_sync(
+        list_providers, search=search, with_data=with_data, page=page, page_size=page_size,
+        cursor=cursor,
+    )
+
+
+async def get_provider_async(db: AsyncSession, provider_uuid: UUID) -> Dict[str, Any]:
+    return await db.run_sync(get_provider, provider_uuid)
+
+
+def refresh_provider_summary(db: Session, provider_uuid: UUID) -> None:
+    """Recompute the provider's `provider_summary` row from its latest source
+    version, the sources' runs in the transaction ledger and the course table.
+
+    A source's failure streak is the number of failed runs since its last
+    successful one; runs still in progress are not counted. Does not commit.
+
+    Concurrent refreshes of one provider (its sources run in parallel) are
+    serialised on the provider row, locked until the caller commits. The
+    lock is taken in its own statement so the upsert's snapshot is taken
+    after it is held and cannot overwrite a newer refresh with older data.
+    """
+    db.execute(
+        text("SELECT 1 FROM provider WHERE provider_uuid = :provider_uuid FOR NO KEY UPDATE"),
+        {"provider_uuid": str(provider_uuid)},
+    )
+    db.execute(
+        text("""
+            WITH latest AS (
+                SELECT source_version_uuid, version_date, version_id
+                FROM source_version
+                WHERE provider_uuid = :provider_uuid
+                ORDER BY version_date DESC, version_id DESC
+                LIMIT 1
+            ),
+            runs AS (
+                SELECT t.source_uuid, t.status, t.error_message, t.course_count,
+                       COALESCE(t.finished_at, t.started_at, t.created_at_date_time) AS run_at,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY t.source_uuid
+                           ORDER BY t.created_at_date_time DESC, t.run_number DESC
+                       ) AS rn
+                FROM transaction t
+                WHERE t.provider_uuid = :provider_uuid AND t.source_uuid IS NOT NULL
+            ),
+            run_stats AS (
+                SELECT source_uuid,
+                       MAX(run_at) FILTER (WHERE status = 'success') AS last_success_at,
+                       MIN(rn) FILTER (WHERE status = 'success') AS last_success_rn
+                FROM runs
+                GROUP BY source_uuid
+            ),
+            per_source AS (
+                SELECT s.source_uuid, s.source_id, s.source_name, s.source_type, s.source_path,
+                       s.last_file_pushed_date,
+                       r.status AS last_status, r.run_at AS last_run_at,
+                       r.error_message AS last_error, rs.last_success_at,
+                       (SELECT COUNT(*) FROM runs f
+                        WHERE f.source_uuid = s.source_uuid AND f.status = 'failed'
+                          AND (rs.last_success_rn IS NULL OR f.rn < rs.last_success_rn)) AS failure_streak,
+                       (SELECT COUNT(*) FROM course c WHERE c.source_uuid = s.source_uuid) AS course_count
+                FROM latest
+                JOIN source s ON s.source_version_uuid = latest.source_version_uuid
+                LEFT JOIN runs r ON r.source_uuid = s.source_uuid AND r.rn = 1
+                LEFT JOIN run_stats rs ON rs.source_uuid = s.source_uuid
+            )
+            INSERT INTO provider_summary
+                (provider_uuid, source_version_uuid, version_date, version_id,
+                 source_count, course_count, running_sources, failing_sources,
+                 max_failure_streak, last_run_at, last_success_at, sources, refreshed_at)
+            SELECT :provider_uuid, latest.source_version_uuid, latest.version_date, latest.version_id,
+                   (SELECT COUNT(*) FROM per_source),
+                   COALESCE((SELECT SUM(course_count) FROM per_source), 0),
+                   (SELECT COUNT(*) FROM per_source WHERE last_status = 'running'),
+                   (SELECT COUNT(*) FROM per_source WHERE last_status = 'failed'),
+                   COALESCE((SELECT MAX(failure_streak) FROM per_source), 0),
+                   (SELECT MAX(last_run_at) FROM per_source),
+                   (SELECT MAX(last_success_at) FROM per_source),
+                   COALESCE(
+                       (SELECT jsonb_agg(to_jsonb(ps) ORDER BY ps.source_name, ps.source_uuid)
+                        FROM per_source ps),
+                       '[]'::jsonb
+                   ),
+                   NOW()
+            FROM (SELECT 1) one
+            LEFT JOIN latest ON TRUE
+            WHERE EXISTS (SELECT 1 FROM provider WHERE provider_uuid = :provider_uuid)
+            ON CONFLICT (provider_uuid) DO UPDATE SET
+                source_version_uuid = EXCLUDED.source_version_uuid,
+                version_date = EXCLUDED.version_date,
+                version_id = EXCLUDED.version_id,
+                source_count = EXCLUDED.source_count,
+                course_count = EXCLUDED.course_count,
+                running_sources = EXCLUDED.running_sources,
+                failing_sources = EXCLUDED.failing_sources,
+                max_failure_streak = EXCLUDED.max_failure_streak,
+                last_run_at = EXCLUDED.last_run_at,
+                last_success_at = EXCLUDED.last_success_at,
+                sources = EXCLUDED.sources,
+                refreshed_at = EXCLUDED.refreshed_at
+        """),
+        {"provider_uuid": str(provider_uuid)},
+    )
+
+
+def get_provider_summary(db: Session, provider_uuid: UUID) -> Dict[str, Any]:
+    """The provider with its `provider_summary` row: latest version, per-source
+    run status, last success, failure streaks and course totals. A provider
+    without a summary yet (not run since the table was added) gets one now."""
+    query = text("""
+        SELECT p.provider_uuid, p.deqar_id, p.eter_id, p.provider_name,
+               p.last_manifest_pull, p.has_sources,
+               ps.source_version_uuid, ps.version_date, ps.version_id,
+               ps.source_count, ps.course_count, ps.running_sources,
+               ps.failing_sources, ps.max_failure_streak, ps.last_run_at,
+               ps.last_success_at, ps.sources, ps.refreshed_at
+        FROM provider p
+        LEFT JOIN provider_summary ps ON ps.provider_uuid = p.provider_uuid
+        WHERE p.provider_uuid = :provider_uuid
+    """)
+    row = db.execute(query, {"provider_uuid": provider_uuid}).fetchone()
+
+    if not row:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Provider not found")
+
+    if row[17] is None:
+        refresh_provider_summary(db, provider_uuid)
+        db.commit()
+        row = db.execute(query, {"provider_uuid": provider_uuid}).fetchone()
+
+    return {
+        "provider": {
+            "provider_uuid": str(row[0]),
+            "deqar_id": row[1],
+            "eter_id": row[2],
+            "provider_name": row[3],
+            "last_manifest_pull": row[4].isoformat() if row[4] else None,
+            "has_sources": row[5],
+        },
+        "source_version": {
+            "source_version_uuid": str(row[6]),
+            "version_date": row[7].isoformat() if row[7] else None,
+            "version_id": row[8],
+        } if row[6] else None,
+        "source_count": row[9],
+        "course_count": row[10],
+        "running_sources": row[11],
+        "failing_sources": row[12],
+        "max_failure_streak": row[13],
+        "last_run_at": row[14].isoformat() if row[14] else None,
+        "last_success_at": row[15].isoformat() if row[15] else None,
+        "sources": row[16],
+        "refreshed_at": row[17].isoformat() if row[17] else None,
+    }
+
+
+async def get_provider_summary_async(db: AsyncSession, provider_uuid: UUID) -> Dict[str, Any]:
+    return await db.run_sync(get_provider_summary, provider_uuid)
+
+
 def resolve_provider_uuid(db: Session, value: str) -> UUID:
     """Accept a UUID string or an ETER/DEQAR id and return the provider UUID."""
     rows = db.execute(
@@ -0,0 +1,277 @@
+"""Retention policy for bronze files and run logs in the datalake.
+
+Every course-fetch run leaves a bronze object, a silver snapshot and a
+`_log.txt` in MinIO.
+`prune_bronze` walks the transaction ledger per source and thins old runs
+out by age:
+
+- younger than `keep_all_days`: every run is kept;
+- younger than `daily_days`: one run per day;
+- older: one run per calendar month, for `monthly_months` months
+  (0 keeps the monthly runs forever).
+
+Within a day or month the newest successful run is the one kept (the newest
+run of any status if none succeeded). The file recorded in
+`source.last_file_pushed_path` and the newest successful run of each source
+are never pruned. Objects of pruned runs are removed with MinIO multi-object
+delete, and their ledger rows are kept but marked `archived_at`. Objects a
+kept run shares with a pruned one (silver-only runs reuse the bronze file
+and snapshot of the run they re-ran) are left in place, and the pruned run
+stays unarchived until they are no longer shared.
+"""
+import logging
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+from uuid import UUID
+
+from minio import Minio
+from minio.deleteobjects import DeleteObject
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import (
+    BRONZE_RETENTION_DAILY_DAYS,
+    BRONZE_RETENTION_KEEP_ALL_DAYS,
+    BRONZE_RETENTION_MONTHLY_MONTHS,
+    MINIO_BUCKET_NAME,
+)
+from services.locks import NS_COURSE_FETCH, advisory_lock
+
+logger = logging.getLogger(__name__)
+
+# S3 multi-object delete accepts at most 1000 keys per request.
+DELETE_BATCH_SIZE = 1000
+
+
+@dataclass
+class RetentionPolicy:
+    keep_all_days: int = BRONZE_RETENTION_KEEP_ALL_DAYS
+    daily_days: int = BRONZE_RETENTION_DAILY_DAYS
+    monthly_months: int = BRONZE_RETENTION_MONTHLY_MONTHS
+
+
+@dataclass
+class PruneStats:
+    sources: int = 0
+    busy_sources: int = 0
+    runs: int = 0
+    kept: int = 0
+    pruned: int = 0
+    objects_deleted: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+def _months_between(earlier: date, later: date) -> int:
+    return (later.year - earlier.year) * 12 + later.month - earlier.month
+
+
+def _bucket_key(run_date: date, today: date, policy: RetentionPolicy) -> Optional[Any]:
+    """Group a run falls in for thinning: None = keep unconditionally,
+    "drop" = past the monthly horizon, else a day or month key."""
+    age = (today - run_date).days
+    if age < policy.keep_all_days:
+        return None
+    if age < policy.daily_days:
+        return ("day", run_date)
+    if policy.monthly_months and _months_between(run_date, today) >= policy.monthly_months:
+        return "drop"
+    return ("month", run_date.year, run_date.month)
+
+
+def select_prunable(
+    runs: List[Dict[str, Any]],
+    protected_paths: Set[str],
+    policy: RetentionPolicy,
+    today: date,
+) -> List[Dict[str, Any]]:
+    """Runs of one source that the policy does not keep. `runs` must be
+    ordered newest first."""
+    latest_success = next((r for r in runs if r["status"] == "success"), None)
+
+    keep: Set[Any] = set()
+    if latest_success is not None:
+        keep.add(latest_success["trans_uuid"])
+    for run in runs:
+        if run["bronze_file_path"] in protected_paths:
+            keep.add(run["trans_uuid"])
+
+    # Newest successful run per bucket, else newest run of any status.
+    chosen: Dict[Any, Dict[str, Any]] = {}
+    for run in runs:
+        key = _bucket_key(run["created_at_date"], today, policy)
+        if key is None:
+            keep.add(run["trans_uuid"])
+            continue
+        if key == "drop":
+            continue
+        current = chosen.get(key)
+        if current is None or (current["status"] != "success" and run["status"] == "success"):
+            chosen[key] = run
+    keep.update(run["trans_uuid"] for run in chosen.values())
+
+    return [run for run in runs if run["trans_uuid"] not in keep]
+
+
+def _source_runs(db: Session, source_uuid: str) -> List[Dict[str, Any]]:
+    rows = db.execute(
+        text("""
+            SELECT trans_uuid, created_at_date, run_number, status,
+                   bronze_file_path, silver_file_path, log_file_path
+            FROM transaction
+            WHERE source_uuid = :s
+              AND archived_at IS NULL
+              AND status <> 'running'
+            ORDER BY created_at_date DESC, run_number DESC
+        """),
+        {"s": source_uuid},
+    ).fetchall()
+    return [
+        {
+            "trans_uuid": r[0],
+            "created_at_date": r[1],
+            "run_number": r[2],
+            "status": r[3],
+            "bronze_file_path": r[4],
+            "silver_file_path": r[5],
+            "log_file_path": r[6],
+        }
+        for r in rows
+    ]
+
+
+def _run_objects(run: Dict[str, Any]) -> Iterator[str]:
+    for key in ("bronze_file_path", "silver_file_path", "log_file_path"):
+        if run.get(key):
+            yield run[key]
+
+
+def _delete_objects(minio_client: Minio, names: Iterable[str]) -> Set[str]:
+    """Multi-delete `names` in batches; return the names that failed."""
+    failed: Set[str] = set()
+    batch: List[str] = []
+
+    def _flush() -> None:
+        # remove_objects is lazy: errors only surface while iterating.
+        for error in minio_client.remove_objects(
+            MINIO_BUCKET_NAME, [DeleteObject(name) for name in batch],
+        ):
+            if error.code != "NoSuchKey":
+                logger.warning("Deleting %s failed: %s", error.name, error.message)
+                failed.add(error.name)
+        batch.clear()
+
+    for name in names:
+        batch.append(name)
+        if len(batch) >= DELETE_BATCH_SIZE:
+            _flush()
+    if batch:
+        _flush()
+    return failed
+
+
+def _sources(
+    db: Session, provider_uuid: Optional[UUID], source_uuid: Optional[UUID],
+) -> List[Dict[str, Any]]:
+    params: Dict[str, Any] = {}
+    where = ["t.archived_at IS NULL"]
+    if provider_uuid is not None:
+        where.append("t.provider_uuid = :p")
+        params["p"] = str(provider_uuid)
+    if source_uuid is not None:
+        where.append("t.source_uuid = :s")
+        params["s"] = str(source_uuid)
+    rows = db.execute(
+        text(f"""
+            SELECT DISTINCT t.source_uuid, s.last_file_pushed_path
+            FROM transaction t
+            JOIN source s ON s.source_uuid = t.source_uuid
+            WHERE {" AND ".join(where)}
+        """),
+        params,
+    ).fetchall()
+    return [{"source_uuid": str(r[0]), "last_file_pushed_path": r[1]} for r in rows]
+
+
+def prune_bronze(
+    db: Session,
+    minio_client: Minio,
+    *,
+    policy: Optional[RetentionPolicy] = None,
+    provider_uuid: Optional[UUID] = None,
+    source_uuid: Optional[UUID] = None,
+    dry_run: bool = False,
+    today: Optional[date] = None,
+) -> PruneStats:
+    """Apply the retention policy to every source (or one provider / source).
+
+    Each source is pruned under its course-fetch advisory lock, so a run
+    that is writing new objects is never raced; busy sources are skipped.
+    With `dry_run`, nothing is deleted and `pruned` counts what would be.
+    """
+    policy = policy or RetentionPolicy()
+    today = today or date.today()
+    stats = PruneStats()
+
+    for source in _sources(db, provider_uuid, source_uuid):
+        with advisory_lock(db, NS_COURSE_FETCH, source["source_uuid"]) as acquired:
+            if not acquired:
+                stats.busy_sources += 1
+                logger.info("Retention: source %s busy — skipped", source["source_uuid"])
+                continue
+            stats.sources += 1
+
+            runs = _source_runs(db, source["source_uuid"])
+            protected = {source["last_file_pushed_path"]} - {None}
+            prunable = select_prunable(runs, protected, policy, today)
+            stats.runs += len(runs)
+            stats.kept += len(runs) - len(prunable)
+            if not prunable:
+                continue
+
+            # Silver-only runs reuse the bronze file (and --from-snapshot runs
+            # the silver snapshot) of an earlier run: an object a kept run
+            # still points at is not deleted, and a run is only archived once
+            # none of its objects is shared with one.
+            prunable_ids = {run["trans_uuid"] for run in prunable}
+            in_use = set(protected)
+            for run in runs:
+                if run["trans_uuid"] not in prunable_ids:
+                    in_use.update(_run_objects(run))
+            releasable = [run for run in prunable if not in_use.intersection(_run_objects(run))]
+
+            if dry_run:
+                stats.pruned += len(releasable)
+                stats.kept += len(prunable) - len(releasable)
+                continue
+
+            names = sorted({name for run in prunable for name in _run_objects(run)} - in_use)
+            try:
+                failed = _delete_objects(minio_client, names)
+            except Exception as e:
+                logger.error("Retention: deleting objects of source %s failed: %s", source["source_uuid"], e)
+                stats.errors.append(f"{source['source_uuid']}: {e}")
+                stats.kept += len(prunable)
+                continue
+
+            archived = [
+                run["trans_uuid"] for run in releasable
+                if not failed.intersection(_run_objects(run))
+            ]
+            stats.objects_deleted += len(names) - len(failed)
+            stats.pruned += len(archived)
+            stats.kept += len(prunable) - len(archived)
+            if failed:
+                stats.errors.append(f"{source['source_uuid']}: {len(failed)} object(s) not deleted")
+            if archived:
+                db.execute(
+                    text("UPDATE transaction SET archived_at = NOW() WHERE trans_uuid = ANY(CAST(:ids AS uuid[]))"),
+                    {"ids": [str(t) for t in archived]},
+                )
+                db.commit()
+            logger.info(
+                "Retention: source %s — %s run(s) archived, %s kept",
+                source["source_uuid"], len(archived), len(runs) - len(archived),
+            )
+
+    return stats
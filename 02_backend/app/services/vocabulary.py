@@ -1,20 +1,31 @@
+import hashlib
 import logging
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Mapping, Optional, Tuple, Union
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+from urllib.parse import urlsplit
 
 import requests
 from rdflib import Graph, Literal, URIRef
 from rdflib.namespace import RDF, SKOS
 from rdflib.term import Identifier
+from sqlalchemy import text
+from sqlalchemy.orm import Session
 
-from config import GRAPH_VOCABULARY
+from config import DEFAULT_VOCABULARIES, GRAPH_VOCABULARY
 from services import fuseki
 
 logger = logging.getLogger(__name__)
 
 EU_SPARQL_ENDPOINT = "https://publications.europa.eu/webapi/rdf/sparql"
 
+# Rows per request against the EU endpoint; larger schemes are paged.
+EU_PAGE_SIZE = 10000
+
 EU_LANGUAGE_SCHEME = "http://publications.europa.eu/resource/authority/language"
+ISCED_F_SCHEME = "http://data.europa.eu/snb/isced-f/25831c2"
+LEARNING_OPPORTUNITY_SCHEME = "http://data.europa.eu/snb/learning-opportunity/25831c2"
 
 _EUVOC_NS = "http://publications.europa.eu/ontology/euvoc#"
 _ISO_639_DATATYPES = (
@@ -24,21 +35,44 @@ _ISO_639_DATATYPES = (
     f"{_EUVOC_NS}ISO_639_3",
 )
 
-_LANGUAGE_INDEX: Optional[Dict[str, URIRef]] = None
-
 VocabSpec = Union[str, Mapping[str, object]]
 
 
 @dataclass
 class VocabStats:
     scheme_uri: str
+    graph_uri: str = ""
     concepts: int = 0
     extra_triples: int = 0
     bytes_uploaded: int = 0
+    content_hash: str = ""
+    unchanged: bool = False
     success: bool = False
     error: str = ""
 
 
+def scheme_graph_uri(scheme_uri: str) -> str:
+    """Named graph holding one scheme's concepts, under GRAPH_VOCABULARY.
+
+    e.g. http://data.europa.eu/snb/eqf/25831c2 →
+    <GRAPH_VOCABULARY>/data-europa-eu-snb-eqf-25831c2
+    """
+    parts = urlsplit(scheme_uri)
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", f"{parts.netloc}{parts.path}").strip("-")
+    return f"{GRAPH_VOCABULARY}/{slug}"
+
+
+def vocabulary_graph_uris() -> List[str]:
+    """Named graphs of every scheme in DEFAULT_VOCABULARIES."""
+    return [scheme_graph_uri(_normalize_spec(spec)[0]) for spec in DEFAULT_VOCABULARIES]
+
+
+def vocabulary_from_clauses() -> str:
+    """`FROM <...>` lines covering every configured vocabulary graph, for
+    queries that need vocabulary labels merged into their default graph."""
+    return "\n".join(f"FROM <{g}>" for g in vocabulary_graph_uris())
+
+
 def _normalize_spec(spec: VocabSpec) -> Tuple[str, List[str]]:
     """Accept a bare scheme URI or a {"scheme": ..., "properties": [...]} dict."""
     if isinstance(spec, str):
@@ -52,8 +86,9 @@ def _normalize_spec(spec: VocabSpec) -> Tuple[str, List[str]]:
     return scheme, [str(p) for p in props]
 
 
-def _run_select(query: str, *, timeout: int) -> list:
-    response = requests.get(
+def _run_select(query: str, *, timeout: int, session: Optional[requests.Session] = None) -> list:
+    http = session or requests
+    response = http.get(
         EU_SPARQL_ENDPOINT,
         params={
             "query": query,
@@ -66,7 +101,29 @@ def _run_select(query: str, *, timeout: int) -> list:
     return response.json().get("results", {}).get("bindings", [])
 
 
-def fetch_skos_concepts(scheme_uri: str, *, timeout: int = 60) -> List[dict]:
+def _run_paged_select(
+    query: str, *, timeout: int, page_size: int, session: Optional[requests.Session] = None,
+) -> Iterator[dict]:
+    """Run an ORDER BY query in LIMIT/OFFSET pages until a short page is returned."""
+    offset = 0
+    while True:
+        bindings = _run_select(
+            f"{query}LIMIT {int(page_size)} OFFSET {int(offset)}\n",
+            timeout=timeout, session=session,
+        )
+        yield from bindings
+        if len(bindings) < page_size:
+            return
+        offset += page_size
+
+
+def fetch_skos_concepts(
+    scheme_uri: str,
+    *,
+    timeout: int = 60,
+    page_size: int = EU_PAGE_SIZE,
+    session: Optional[requests.Session] = None,
+) -> List[dict]:
     query = f"""PREFIX skos: <{SKOS}>
 
 SELECT DISTINCT ?concept_uri ?label_en
@@ -76,11 +133,10 @@ WHERE {{
   ?concept_uri skos:prefLabel ?label_en .
   FILTER(lang(?label_en) = "en")
 }}
+ORDER BY ?concept_uri ?label_en
 """
-    bindings = _run_select(query, timeout=timeout)
-
     concepts = []
-    for b in bindings:
+    for b in _run_paged_select(query, timeout=timeout, page_size=page_size, session=session):
         concept_uri = (b.get("concept_uri") or {}).get("value")
         label_en = (b.get("label_en") or {}).get("value")
         if concept_uri and label_en:
@@ -95,6 +151,8 @@ def fetch_extra_triples(
     properties: Iterable[str],
     *,
     timeout: int = 60,
+    page_size: int = EU_PAGE_SIZE,
+    session: Optional[requests.Session] = None,
 ) -> List[Tuple[str, str, Identifier]]:
     """Fetch (concept_uri, property_uri, value) for the requested extra properties.
 
@@ -117,12 +175,11 @@ WHERE {{
                ?p ?o .
   FILTER(!isLiteral(?o) || lang(?o) = "" || langMatches(lang(?o), "en"))
 }}
+ORDER BY ?concept_uri ?p ?o
 """
-    bindings = _run_select(query, timeout=timeout)
-
     triples: List[Tuple[str, str, Identifier]] = []
     skipped_bnodes = 0
-    for b in bindings:
+    for b in _run_paged_select(query, timeout=timeout, page_size=page_size, session=session):
         s = (b.get("concept_uri") or {}).get("value")
         p = (b.get("p") or {}).get("value")
         o = b.get("o") or {}
@@ -161,11 +218,11 @@ def _to_rdflib_node(b: dict) -> Optional[Identifier]:
     return Literal(v)
 
 
-def build_skos_turtle(
+def build_skos_graph(
     concepts: List[dict],
     scheme_uri: str,
     extras: Optional[List[Tuple[str, str, Identifier]]] = None,
-) -> str:
+) -> Graph:
     scheme = URIRef(scheme_uri)
     graph = Graph()
     graph.bind("skos", SKOS)
@@ -188,36 +245,14 @@ def build_skos_turtle(
             known_concepts.add(s)
         graph.add((URIRef(s), URIRef(p), o))
 
-    return graph.serialize(format="turtle")
+    return graph
 
 
-def _load_language_index() -> Dict[str, URIRef]:
-    """Query the local vocabulary graph for ISO 639 notations on language concepts."""
-    datatype_list = ", ".join(f"<{dt}>" for dt in _ISO_639_DATATYPES)
-    query = f"""PREFIX skos: <{SKOS}>
-
-SELECT ?concept ?notation
-FROM <{GRAPH_VOCABULARY}>
-WHERE {{
-  ?concept skos:inScheme <{EU_LANGUAGE_SCHEME}> ;
-           skos:notation ?notation .
-  FILTER(datatype(?notation) IN ({datatype_list}))
-}}
-"""
-    bindings = fuseki.sparql_select(query)
-    index: Dict[str, URIRef] = {}
-    for b in bindings:
-        concept = (b.get("concept") or {}).get("value")
-        notation = (b.get("notation") or {}).get("value")
-        if concept and notation:
-            index[notation.strip().lower()] = URIRef(concept)
-    logger.info("Language index loaded: %s notation(s)", len(index))
-    return index
-
-
-def _clear_language_cache() -> None:
-    global _LANGUAGE_INDEX
-    _LANGUAGE_INDEX = None
+def canonical_ntriples(graph: Graph) -> bytes:
+    """Serialize to N-Triples with lines sorted, so equal graphs (without
+    blank nodes) give byte-identical output and a stable hash."""
+    lines = graph.serialize(format="nt", encoding="utf-8").splitlines()
+    return b"\n".join(sorted(line for line in lines if line.strip())) + b"\n"
 
 
 def language_tag_to_uri(tag: str) -> Optional[URIRef]:
@@ -227,7 +262,8 @@ def language_tag_to_uri(tag: str) -> Optional[URIRef]:
     region / script / variant subtags are ignored. Matches case-insensitively
     against ``skos:notation`` values typed as ``euvoc:ISO_639_1``,
     ``ISO_639_2B``, ``ISO_639_2T`` or ``ISO_639_3`` in the local vocabulary
-    graph. Returns ``None`` (and logs a warning) if no match is found.
+    graph, via the shared concept index. Returns ``None`` (and logs a warning)
+    if no match is found.
     """
     if not isinstance(tag, str):
         return None
@@ -235,33 +271,124 @@ def language_tag_to_uri(tag: str) -> Optional[URIRef]:
     if not primary:
         return None
 
-    global _LANGUAGE_INDEX
-    if _LANGUAGE_INDEX is None:
-        _LANGUAGE_INDEX = _load_language_index()
+    # Deferred: concept_index imports this module.
+    from services import concept_index
 
-    uri = _LANGUAGE_INDEX.get(primary)
+    uri = concept_index.notation_to_uri(EU_LANGUAGE_SCHEME, primary, _ISO_639_DATATYPES)
     if uri is None:
         logger.warning("No EU language URI for tag %r (primary subtag %r)", tag, primary)
     return uri
 
 
-def refresh_vocabulary(vocab: VocabSpec) -> VocabStats:
+def _stored_hashes(db: Session) -> Dict[str, str]:
+    rows = db.execute(
+        text("SELECT scheme_uri, content_hash FROM vocabulary_scheme")
+    ).fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+def _record_refresh(db: Session, stats: VocabStats) -> None:
+    db.execute(
+        text("""
+            INSERT INTO vocabulary_scheme
+                (scheme_uri, graph_uri, content_hash, concept_count, extra_triple_count, refreshed_at)
+            VALUES (:scheme_uri, :graph_uri, :content_hash, :concepts, :extras, NOW())
+            ON CONFLICT (scheme_uri) DO UPDATE
+            SET graph_uri = EXCLUDED.graph_uri,
+                content_hash = EXCLUDED.content_hash,
+                concept_count = EXCLUDED.concept_count,
+                extra_triple_count = EXCLUDED.extra_triple_count,
+                refreshed_at = NOW()
+        """),
+        {
+            "scheme_uri": stats.scheme_uri,
+            "graph_uri": stats.graph_uri,
+            "content_hash": stats.content_hash,
+            "concepts": stats.concepts,
+            "extras": stats.extra_triples,
+        },
+    )
+    db.commit()
+
+
+def _refresh_scheme(vocab: VocabSpec, stored_hash: Optional[str], force: bool) -> VocabStats:
+    """Fetch one scheme, hash it, and PUT it into its own named graph unless
+    the hash matches `stored_hash`. Touches no database session, so it can
+    run on a worker thread."""
     scheme_uri, extra_properties = _normalize_spec(vocab)
-    stats = VocabStats(scheme_uri=scheme_uri)
+    stats = VocabStats(scheme_uri=scheme_uri, graph_uri=scheme_graph_uri(scheme_uri))
     try:
-        concepts = fetch_skos_concepts(scheme_uri)
-        stats.concepts = len(concepts)
-        extras = fetch_extra_triples(scheme_uri, extra_properties) if extra_properties else []
+        with requests.Session() as session:
+            concepts = fetch_skos_concepts(scheme_uri, session=session)
+            stats.concepts = len(concepts)
+            extras = (
+                fetch_extra_triples(scheme_uri, extra_properties, session=session)
+                if extra_properties else []
+            )
         stats.extra_triples = len(extras)
         if not concepts and not extras:
             stats.error = "no concepts returned"
             return stats
-        turtle = build_skos_turtle(concepts, scheme_uri, extras=extras)
-        stats.bytes_uploaded = len(turtle)
-        stats.success = fuseki.upload_turtle(GRAPH_VOCABULARY, turtle)
+
+        nt = canonical_ntriples(build_skos_graph(concepts, scheme_uri, extras=extras))
+        stats.content_hash = hashlib.sha256(nt).hexdigest()
+        if not force and stats.content_hash == stored_hash:
+            logger.info("Vocabulary %s unchanged (%s) — skipping upload", scheme_uri, stats.content_hash[:12])
+            stats.unchanged = True
+            stats.success = True
+            return stats
+
+        stats.bytes_uploaded = len(nt)
+        stats.success = fuseki.store_graph(stats.graph_uri, nt, replace=True)
         if not stats.success:
             stats.error = "fuseki upload failed"
     except Exception as e:
         logger.exception("refresh_vocabulary failed for %s", scheme_uri)
         stats.error = str(e)
     return stats
+
+
+def refresh_vocabularies(
+    db: Session,
+    vocabs: Iterable[VocabSpec],
+    *,
+    max_workers: int = 4,
+    force: bool = False,
+) -> Iterator[VocabStats]:
+    """Refresh several schemes concurrently, yielding stats as each finishes.
+
+    Every scheme lives in its own named graph (`scheme_graph_uri`) and is
+    replaced atomically with a Graph Store PUT, so concepts that disappeared
+    upstream are dropped. A scheme whose fetched content hashes to the value
+    recorded in `vocabulary_scheme` is not re-uploaded unless `force` is set.
+    The in-process concept index of every changed scheme is invalidated.
+    """
+    from services import concept_index
+
+    stored = _stored_hashes(db)
+    specs = list(vocabs)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = [
+            pool.submit(_refresh_scheme, spec, stored.get(_normalize_spec(spec)[0]), force)
+            for spec in specs
+        ]
+        for future in as_completed(futures):
+            stats = future.result()
+            if stats.success and not stats.unchanged:
+                try:
+                    _record_refresh(db, stats)
+                except Exception as e:
+                    db.rollback()
+                    logger.warning("Recording vocabulary hash for %s failed: %s", stats.scheme_uri, e)
+                concept_index.invalidate(stats.scheme_uri)
+            yield stats
+
+
+def refresh_vocabulary(db: Session, vocab: VocabSpec, *, force: bool = False) -> VocabStats:
+    return next(refresh_vocabularies(db, [vocab], max_workers=1, force=force))
+
+
+def drop_legacy_vocabulary_graph() -> bool:
+    """Remove the single shared vocabulary graph older versions appended to;
+    its content now lives in the per-scheme graphs."""
+    return fuseki.drop_graph(GRAPH_VOCABULARY)
@@ -0,0 +1,275 @@
+"""Versioned offline bundles of the controlled vocabularies.
+
+A snapshot is a directory (on disk, or a prefix in the MinIO bucket) named
+after its UTC creation time:
+
+    {version}/manifest.json
+    {version}/{scheme-slug}.nt.gz     # sorted N-Triples of one scheme graph
+
+The manifest lists, per scheme, the graph it belongs in, the file and the
+same content hash `refresh_vocabularies` records, so loading a snapshot
+leaves Fuseki and `vocabulary_scheme` exactly as a live refresh would.
+Snapshots let new environments and test runs bootstrap without reaching
+publications.europa.eu, and in-process lookups can read them directly
+(see VOCABULARY_SNAPSHOT_DIR).
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from minio import Minio
+from minio.error import S3Error
+from rdflib import Graph
+from rdflib.namespace import RDF, SKOS
+from sqlalchemy.orm import Session
+
+from config import DEFAULT_VOCABULARIES, MINIO_BUCKET_NAME
+from services import concept_index, fuseki
+from services.vocabulary import (
+    VocabStats,
+    _normalize_spec,
+    _record_refresh,
+    canonical_ntriples,
+    scheme_graph_uri,
+)
+
+logger = logging.getLogger(__name__)
+
+MINIO_PREFIX = "vocabulary/snapshots"
+MANIFEST_NAME = "manifest.json"
+
+
+class SnapshotStore:
+    """Where snapshots live. Names are relative to the store root."""
+
+    def write(self, name: str, data: bytes, content_type: str) -> None:
+        raise NotImplementedError
+
+    def read(self, name: str) -> bytes:
+        raise NotImplementedError
+
+    def versions(self) -> List[str]:
+        raise NotImplementedError
+
+    def latest_version(self) -> Optional[str]:
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+
+class DiskSnapshotStore(SnapshotStore):
+    def __init__(self, root: os.PathLike):
+        self.root = Path(root)
+
+    def write(self, name: str, data: bytes, content_type: str) -> None:
+        path = self.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+    def read(self, name: str) -> bytes:
+        return (self.root / name).read_bytes()
+
+    def versions(self) -> List[str]:
+        if not self.root.is_dir():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if (p / MANIFEST_NAME).is_file())
+
+    def __str__(self) -> str:
+        return str(self.root)
+
+
+class MinioSnapshotStore(SnapshotStore):
+    def __init__(self, client: Minio, bucket: str = MINIO_BUCKET_NAME, prefix: str = MINIO_PREFIX):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.rstrip("/")
+
+    def write(self, name: str, data: bytes, content_type: str) -> None:
+        if not self.client.bucket_exists(self.bucket):
+            self.client.make_bucket(self.bucket)
+        self.client.put_object(
+            self.bucket, f"{self.prefix}/{name}",
+            BytesIO(data), length=len(data),
+            content_type=content_type,
+        )
+
+    def read(self, name: str) -> bytes:
+        response = self.client.get_object(self.bucket, f"{self.prefix}/{name}")
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    def versions(self) -> List[str]:
+        try:
+            objects = self.client.list_objects(self.bucket, prefix=f"{self.prefix}/")
+            return sorted(o.object_name.rstrip("/").rsplit("/", 1)[-1] for o in objects if o.is_dir)
+        except S3Error as e:
+            logger.warning("Listing vocabulary snapshots failed: %s", e)
+            return []
+
+    def __str__(self) -> str:
+        return f"minio://{self.bucket}/{self.prefix}"
+
+
+@dataclass
+class SnapshotResult:
+    version: str
+    schemes: List[Dict[str, Any]] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+
+
+def _file_name(graph_uri: str) -> str:
+    return f"{graph_uri.rsplit('/', 1)[-1]}.nt.gz"
+
+
+def create_snapshot(
+    store: SnapshotStore, vocabs: Iterable = DEFAULT_VOCABULARIES,
+) -> SnapshotResult:
+    """Export each scheme graph from Fuseki into a new snapshot version.
+
+    The manifest is written last, so an interrupted export never shows up in
+    `store.versions()`.
+    """
+    result = SnapshotResult(version=datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S"))
+    for spec in vocabs:
+        scheme_uri, _ = _normalize_spec(spec)
+        graph_uri = scheme_graph_uri(scheme_uri)
+        nt = fuseki.fetch_graph(graph_uri)
+        if not nt or not nt.strip():
+            logger.warning("Snapshot: graph <%s> is empty or unavailable — skipped", graph_uri)
+            result.missing.append(scheme_uri)
+            continue
+
+        # Re-serialize through rdflib so the hash matches the one a live
+        # refresh computes for the same triples.
+        graph = Graph()
+        graph.parse(data=nt, format="nt")
+        canonical = canonical_ntriples(graph)
+        concepts = sum(1 for _ in graph.subjects(RDF.type, SKOS.Concept))
+        file_name = _file_name(graph_uri)
+        store.write(
+            f"{result.version}/{file_name}",
+            gzip.compress(canonical, mtime=0),
+            "application/gzip",
+        )
+        result.schemes.append({
+            "scheme_uri": scheme_uri,
+            "graph_uri": graph_uri,
+            "file": file_name,
+            "content_hash": hashlib.sha256(canonical).hexdigest(),
+            "concepts": concepts,
+            "triples": len(graph),
+        })
+        logger.info("Snapshot %s: %s (%s triples)", result.version, scheme_uri, len(graph))
+
+    if result.schemes:
+        manifest = {
+            "version": result.version,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "schemes": result.schemes,
+        }
+        store.write(
+            f"{result.version}/{MANIFEST_NAME}",
+            json.dumps(manifest, indent=2).encode("utf-8"),
+            "application/json",
+        )
+    return result
+
+
+def read_manifest(store: SnapshotStore, version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Manifest of `version` (default: the newest one), or None if there is none."""
+    version = version or store.latest_version()
+    if not version:
+        return None
+    return json.loads(store.read(f"{version}/{MANIFEST_NAME}"))
+
+
+def read_scheme_ntriples(
+    store: SnapshotStore, manifest: Dict[str, Any], scheme_uri: str,
+) -> Optional[bytes]:
+    for entry in manifest.get("schemes", []):
+        if entry["scheme_uri"] == scheme_uri:
+            return gzip.decompress(store.read(f"{manifest['version']}/{entry['file']}"))
+    return None
+
+
+def read_scheme_graph(
+    store: SnapshotStore, scheme_uri: str, version: Optional[str] = None,
+) -> Optional[Graph]:
+    """Parse one scheme from a snapshot into an in-memory rdflib Graph, for
+    lookups that should not depend on Fuseki."""
+    manifest = read_manifest(store, version)
+    if not manifest:
+        return None
+    nt = read_scheme_ntriples(store, manifest, scheme_uri)
+    if nt is None:
+        return None
+    graph = Graph()
+    graph.parse(data=nt, format="nt")
+    return graph
+
+
+def _shadow_graph_uri(graph_uri: str) -> str:
+    return f"{graph_uri}/shadow"
+
+
+def load_snapshot(
+    store: SnapshotStore,
+    version: Optional[str] = None,
+    *,
+    db: Optional[Session] = None,
+) -> Optional[SnapshotResult]:
+    """Replace every scheme graph in the snapshot with its content.
+
+    The schemes are loaded into shadow graphs with a single N-Quads POST and
+    each is then moved onto its graph, so a failed load leaves the current
+    vocabulary graphs untouched. With `db`, the manifest hashes are recorded in
+    `vocabulary_scheme` so the next live refresh skips unchanged schemes.
+    Returns None if the store holds no snapshot.
+    """
+    manifest = read_manifest(store, version)
+    if not manifest:
+        return None
+    result = SnapshotResult(version=manifest["version"], schemes=manifest.get("schemes", []))
+
+    shadows = {entry["graph_uri"]: _shadow_graph_uri(entry["graph_uri"]) for entry in result.schemes}
+
+    def _quads() -> Iterator[bytes]:
+        for entry in result.schemes:
+            nt = gzip.decompress(store.read(f"{result.version}/{entry['file']}"))
+            yield from fuseki.ntriples_to_nquads(nt, shadows[entry["graph_uri"]])
+
+    if not fuseki.drop_graphs(shadows.values()):
+        raise RuntimeError("could not clear vocabulary shadow graphs before loading the snapshot")
+    try:
+        loaded = fuseki.store_dataset(_quads())
+    except Exception:
+        fuseki.drop_graphs(shadows.values())
+        raise
+    if not loaded:
+        fuseki.drop_graphs(shadows.values())
+        raise RuntimeError(f"loading vocabulary snapshot {result.version} into Fuseki failed")
+    failed = [g for g, shadow in shadows.items() if not fuseki.move_graph(shadow, g)]
+    if failed:
+        fuseki.drop_graphs(shadows.values())
+        raise RuntimeError(f"could not move {len(failed)} vocabulary graph(s) into place, e.g. <{failed[0]}>")
+    concept_index.invalidate()
+    logger.info("Loaded vocabulary snapshot %s (%s schemes)", result.version, len(result.schemes))
+
+    if db is not None:
+        for entry in result.schemes:
+            _record_refresh(db, VocabStats(
+                scheme_uri=entry["scheme_uri"],
+                graph_uri=entry["graph_uri"],
+                content_hash=entry["content_hash"],
+                concepts=entry.get("concepts", 0),
+            ))
+    return result
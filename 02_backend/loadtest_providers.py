@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Load check for the provider endpoints.
+
+Fires `--searches` provider searches (GET /get_all_providers) together with
+`--lookups` provider lookups (GET /get_provider) per search, all at once,
+against a running backend, and reports the wall time and per-endpoint
+latency percentiles. A search that blocks the worker shows up as lookup
+latency close to the wall time.
+
+    python loadtest_providers.py --base-url http://localhost:8000
+
+The database latency of a deployment (Postgres on another host) can be
+reproduced locally with `--db-proxy`, which only relays a local port to
+Postgres, holding each reply back by `--db-delay-ms`, until interrupted.
+Start it first, then the backend with DB_PORT set to the relay's port:
+
+    python loadtest_providers.py --db-proxy 5433:localhost:5432 --db-delay-ms 50
+    DB_HOST=localhost DB_PORT=5433 uvicorn main:app --app-dir app
+    python loadtest_providers.py
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _serve_delay_proxy(spec: str, delay: float) -> None:
+    """Relay LISTEN_PORT to HOST:PORT until interrupted, delaying every chunk
+    sent back to the client by `delay` seconds."""
+    listen_port, host, port = spec.split(":")
+
+    async def pipe(reader, writer, pause: float) -> None:
+        try:
+            while data := await reader.read(65536):
+                if pause:
+                    await asyncio.sleep(pause)
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle(client_reader, client_writer) -> None:
+        try:
+            server_reader, server_writer = await asyncio.open_connection(host, int(port))
+        except OSError as e:
+            print(f"Cannot reach {host}:{port}: {e}", file=sys.stderr)
+            client_writer.close()
+            return
+        await asyncio.gather(
+            pipe(client_reader, server_writer, 0),
+            pipe(server_reader, client_writer, delay),
+        )
+
+    async def serve() -> None:
+        server = await asyncio.start_server(handle, "127.0.0.1", int(listen_port))
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+def _timed_get(session: requests.Session, url: str, params: Dict[str, str], timeout: float) -> Tuple[float, bool]:
+    start = time.perf_counter()
+    try:
+        ok = session.get(url, params=params, timeout=timeout).status_code == 200
+    except requests.RequestException:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def run(
+    base_url: str,
+    provider_uuid: Optional[str],
+    searches: int,
+    lookups: int,
+    search_term: str,
+    timeout: float,
+) -> int:
+    base_url = base_url.rstrip("/")
+    with requests.Session() as session:
+        if not provider_uuid:
+            listing = session.get(f"{base_url}/get_all_providers", params={"page_size": 1}, timeout=timeout)
+            listing.raise_for_status()
+            providers = listing.json()["response"]
+            if not providers:
+                print("No providers in the database; pass --provider", file=sys.stderr)
+                return 1
+            provider_uuid = providers[0]["provider_uuid"]
+        # Warm-up, so connection setup is not counted.
+        session.get(f"{base_url}/get_provider", params={"provider_uuid": provider_uuid}, timeout=timeout)
+
+    calls: List[Tuple[str, str, Dict[str, str]]] = []
+    for i in range(searches):
+        calls.append(("search", "/get_all_providers", {"search_provider": f"{search_term}{i}"}))
+        calls.extend(("lookup", "/get_provider", {"provider_uuid": provider_uuid}) for _ in range(lookups))
+
+    local = threading.local()
+
+    def call(item: Tuple[str, str, Dict[str, str]]) -> Tuple[str, float, bool]:
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        kind, path, params = item
+        elapsed, ok = _timed_get(local.session, f"{base_url}{path}", params, timeout)
+        return kind, elapsed, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+        results = list(pool.map(call, calls))
+    wall = time.perf_counter() - start
+
+    print(f"{len(calls)} requests against {base_url}: wall {wall:.2f}s")
+    failed = 0
+    for kind in ("search", "lookup"):
+        times = [elapsed for k, elapsed, _ in results if k == kind]
+        errors = sum(1 for k, _, ok in results if k == kind and not ok)
+        failed += errors
+        if times:
+            print(
+                f"  {kind:<6} n={len(times):<4} p50 {statistics.median(times) * 1000:.0f}ms"
+                f"  p99 {_percentile(times, 0.99) * 1000:.0f}ms"
+                f"  max {max(times) * 1000:.0f}ms  errors {errors}"
+            )
+    return 1 if failed else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000", help="Backend to load")
+    parser.add_argument("--provider", help="Provider UUID for the lookups (default: the first listed)")
+    parser.add_argument("--searches", type=int, default=8, help="Concurrent provider searches")
+    parser.add_argument("--lookups", type=int, default=10, help="Concurrent provider lookups per search")
+    parser.add_argument("--search-term", default="univ", help="Search prefix; the search index is appended")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout in seconds")
+    parser.add_argument(
+        "--db-proxy", metavar="LISTEN_PORT:HOST:PORT",
+        help="Instead of loading, relay a local port to Postgres with a delay until interrupted",
+    )
+    parser.add_argument("--db-delay-ms", type=float, default=50, help="Delay added per reply by --db-proxy")
+    args = parser.parse_args()
+
+    if args.db_proxy:
+        print(f"Relaying {args.db_proxy} with {args.db_delay_ms:.0f}ms per reply; Ctrl-C to stop")
+        _serve_delay_proxy(args.db_proxy, args.db_delay_ms / 1000)
+        return 0
+
+    return run(
+        args.base_url, args.provider, args.searches, args.lookups, args.search_term, args.timeout,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())